@@ -0,0 +1,137 @@
+import numpy as np
+from datetime import datetime
+from config import ALERT_MULTIPLIERS
+
+# Gain thresholds with their own pump_<n>_time column (percent)
+PUMP_MILESTONES = (10, 20, 30, 40, 50, 60, 70, 80, 90, 100)
+
+_MILESTONE_LEVELS = np.array(PUMP_MILESTONES, dtype=float)
+_ALERT_LEVELS = np.array(sorted(ALERT_MULTIPLIERS), dtype=float)
+
+
+def clean_numeric_value(value):
+    """Clean and convert numeric value from sheets (handles $, commas, etc)"""
+    if value is None or value == '':
+        return 0.0
+
+    # If already a number, return it
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    # If string, clean it
+    if isinstance(value, str):
+        # Remove $, commas, spaces, and other non-numeric chars (except . and -)
+        cleaned = value.replace('$', '').replace(',', '').replace(' ', '').strip()
+        if cleaned == '' or cleaned == '-':
+            return 0.0
+        try:
+            return float(cleaned)
+        except ValueError:
+            return 0.0
+
+    return 0.0
+
+
+def evaluate_live_updates(items, timestamp=None):
+    """Evaluate one tracker tick for many signals in a single NumPy pass
+
+    Computes gain/multiplier, newly crossed pump milestones, new ATHs, new
+    peaks and newly reached alert multipliers for every (signal, price_data)
+    pair, with the same rules the per-signal code used.
+
+    Args:
+        items: List of (signal record, DexScreener price_data) with price data present
+        timestamp: Time text written to the *_time columns (default: now)
+
+    Returns:
+        (changes, events): changes is [(row_index, fields)], one merged cell
+        update per signal for the sheet writer; events is a list of dicts
+        ('milestone', 'ath', 'peak', 'alert') for logging.
+    """
+    if not items:
+        return [], []
+    now_text = timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    signals = [signal for signal, _ in items]
+
+    # Gather the columns once (store values may still be sheet strings)
+    entry_values = [clean_numeric_value(signal.get('mc_entry', 0)) for signal in signals]
+    current_price = np.array([price_data.get('price', 0) for _, price_data in items], dtype=float)
+    current_mc = np.array([price_data.get('market_cap', 0) for _, price_data in items], dtype=float)
+    entry_mc = np.array(entry_values, dtype=float)
+    peak_mc = np.array([clean_numeric_value(signal.get('peak_mc', entry))
+                        for signal, entry in zip(signals, entry_values)], dtype=float)
+    ath_mc = np.array([clean_numeric_value(signal.get('ath_mc', entry))
+                       for signal, entry in zip(signals, entry_values)], dtype=float)
+    alert_last = np.array([int(clean_numeric_value(signal.get('alert_history_last', 0)))
+                           for signal in signals], dtype=float)
+    update_count = [int(clean_numeric_value(signal.get('update_count', 0))) + 1 for signal in signals]
+    milestones_hit = np.array([[bool(signal.get(f'pump_{milestone}_time', '')) for milestone in PUMP_MILESTONES]
+                               for signal in signals], dtype=bool)
+
+    # Vectorized evaluation
+    has_entry = entry_mc > 0
+    safe_entry = np.where(has_entry, entry_mc, 1.0)
+    gain = np.where(has_entry, (current_mc - entry_mc) / safe_entry * 100, 0.0)
+    multiplier = np.where(has_entry, current_mc / safe_entry, 0.0)
+
+    new_milestones = (gain[:, None] >= _MILESTONE_LEVELS[None, :]) & ~milestones_hit
+    new_ath = current_mc > ath_mc
+    new_peak = current_mc > peak_mc
+    # Alerts only fire on a new peak, for every level above the last recorded alert
+    new_alerts = (new_peak[:, None] & (multiplier[:, None] >= _ALERT_LEVELS[None, :])
+                  & (alert_last[:, None] < _ALERT_LEVELS[None, :]))
+    alert_after = np.where(new_alerts.any(axis=1),
+                           np.where(new_alerts, _ALERT_LEVELS[None, :], 0).max(axis=1, initial=0), alert_last)
+
+    # Build one merged field dict per signal
+    changes = []
+    events = []
+    prices = current_price.tolist()
+    mcs = current_mc.tolist()
+    gains = gain.tolist()
+    multipliers = multiplier.tolist()
+    for i, signal in enumerate(signals):
+        row_index = signal['row_index']
+        token_name = signal.get('token_name', 'Unknown')
+        fields = {
+            'last_update_time': now_text,
+            'update_count': update_count[i],
+            'current_price_live': prices[i],
+            'current_mc_live': mcs[i],
+            'current_gain_live': f"{gains[i]:.2f}%"
+        }
+
+        for j in np.flatnonzero(new_milestones[i]):
+            milestone = PUMP_MILESTONES[j]
+            fields[f'pump_{milestone}_time'] = now_text
+            events.append({'type': 'milestone', 'row_index': row_index, 'token_name': token_name,
+                           'milestone': milestone, 'gain_percent': gains[i]})
+
+        if new_ath[i]:
+            fields.update({
+                'ath_price': prices[i],
+                'ath_mc': mcs[i],
+                'ath_gain_percent': f"{gains[i]:.2f}%",
+                'ath_time': now_text
+            })
+            events.append({'type': 'ath', 'row_index': row_index, 'token_name': token_name,
+                           'market_cap': mcs[i], 'gain_percent': gains[i]})
+
+        if new_peak[i]:
+            fields.update({
+                'peak_mc': mcs[i],
+                'peak_multiplier': multipliers[i],
+                'alert_history_last': int(alert_after[i])
+            })
+            events.append({'type': 'peak', 'row_index': row_index, 'token_name': token_name,
+                           'market_cap': mcs[i], 'multiplier': multipliers[i]})
+            for j in np.flatnonzero(new_alerts[i]):
+                alert_mult = int(_ALERT_LEVELS[j])
+                if alert_mult in (2, 3, 5, 10):  # levels with a timestamp column
+                    fields[f'alert_{alert_mult}x_time'] = now_text
+                events.append({'type': 'alert', 'row_index': row_index, 'token_name': token_name,
+                               'multiplier': alert_mult})
+
+        changes.append((row_index, fields))
+
+    return changes, events
@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark (price tracker ticks + Telegram message ingestion)
+Runs offline: an in-process fake gspread worksheet and a local fake DexScreener
+HTTP server stand in for the real services, with configurable latency, error
+rates and 429 responses
+
+Usage: python benchmark_bot.py [--signals N] [--ticks N] [--messages N] [--channels N]
+                               [--sheets-latency S] [--sheets-error-rate P] [--sheets-429-rate P]
+                               [--api-latency S] [--api-error-rate P] [--api-429-rate P]
+                               [--real-limits] [--json] [--output FILE]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from aiohttp import web
+
+SAMPLE_CA_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+FIRST_CHANNEL_ID = -1009000000000
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def random_ca(rng):
+    return ''.join(rng.choice(SAMPLE_CA_ALPHABET) for _ in range(40)) + 'pump'
+
+
+class FakeResponse:
+    """Just enough of requests.Response for gspread.exceptions.APIError"""
+
+    def __init__(self, code):
+        self.status_code = code
+        self.text = f"fake error {code}"
+        self._error = {'code': code, 'message': self.text,
+                       'status': 'RESOURCE_EXHAUSTED' if code == 429 else 'INTERNAL'}
+
+    def json(self):
+        return {'error': self._error}
+
+
+class FakeWorksheet:
+    """In-process stand-in for the gspread.Worksheet methods the bot uses
+
+    Every call sleeps `latency` seconds and fails with a 429 or 500 APIError at
+    the configured rates. Cell values are kept in memory as Python values.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, rate_limit_rate=0.0, seed=1):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rows = []  # row 1 is rows[0]
+        self.calls = Counter()
+        self.failures = Counter()
+        self.cells_written = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _call(self, name):
+        from gspread.exceptions import APIError
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls[name] += 1
+            roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            self.failures['429'] += 1
+            raise APIError(FakeResponse(429))
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.failures['500'] += 1
+            raise APIError(FakeResponse(500))
+
+    def _set(self, row_index, col, value):
+        while len(self.rows) < row_index:
+            self.rows.append([])
+        row = self.rows[row_index - 1]
+        while len(row) < col:
+            row.append('')
+        row[col - 1] = value
+
+    def row_values(self, row_index):
+        self._call('row_values')
+        with self._lock:
+            return list(self.rows[row_index - 1]) if row_index <= len(self.rows) else []
+
+    def insert_row(self, values, index=1):
+        self._call('insert_row')
+        with self._lock:
+            self.rows.insert(index - 1, list(values))
+
+    def get_all_values(self):
+        self._call('get_all_values')
+        with self._lock:
+            return [list(row) for row in self.rows]
+
+    def get_all_records(self, expected_headers=None):
+        self._call('get_all_records')
+        with self._lock:
+            if not self.rows:
+                return []
+            headers = self.rows[0]
+            return [{header: (row[col] if col < len(row) else '') for col, header in enumerate(headers)}
+                    for row in self.rows[1:]]
+
+    def col_values(self, col):
+        self._call('col_values')
+        with self._lock:
+            return [row[col - 1] if col <= len(row) else '' for row in self.rows]
+
+    def batch_get(self, ranges):
+        from gspread.utils import a1_range_to_grid_range
+        self._call('batch_get')
+        results = []
+        with self._lock:
+            for name in ranges:
+                grid = a1_range_to_grid_range(name)
+                rows = self.rows[grid.get('startRowIndex', 0):grid.get('endRowIndex', len(self.rows))]
+                values = [row[grid.get('startColumnIndex', 0):grid.get('endColumnIndex')] for row in rows]
+                # Like the API: trailing empty cells and rows are left out
+                values = [row[:max((i + 1 for i, value in enumerate(row) if value != ''), default=0)] for row in values]
+                while values and not values[-1]:
+                    values.pop()
+                results.append(values)
+        return results
+
+    def cell(self, row_index, col):
+        self._call('cell')
+        with self._lock:
+            row = self.rows[row_index - 1] if row_index <= len(self.rows) else []
+            return SimpleNamespace(value=row[col - 1] if col <= len(row) else '')
+
+    def batch_update(self, data):
+        from gspread.utils import a1_to_rowcol
+        self._call('batch_update')
+        with self._lock:
+            for entry in data:
+                start = entry['range'].split(':')[0]
+                row_index, col = a1_to_rowcol(start)
+                for offset, value in enumerate(entry['values'][0]):
+                    self._set(row_index, col + offset, value)
+                    self.cells_written += 1
+
+    def total_calls(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+    def stats(self):
+        return {
+            'calls': dict(self.calls),
+            'failures': dict(self.failures),
+            'cells_written': self.cells_written,
+            'rows': len(self.rows)
+        }
+
+
+class FakeDexScreener:
+    """Local DexScreener /tokens server on its own thread and event loop
+
+    Each requested CA gets one pair whose price follows a random walk, so
+    gains, peaks, ATHs and alerts happen as they would live.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, rate_limit_rate=0.0, seed=1):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.requests = 0
+        self.addresses = 0
+        self.failures = Counter()
+        self.port = None
+        self._random = random.Random(seed)
+        self._prices = {}
+        self._loop = None
+        self._runner = None
+        self._ready = threading.Event()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}/latest/dex"
+
+    def start(self):
+        thread = threading.Thread(target=self._serve, name='fake-dexscreener', daemon=True)
+        thread.start()
+        self._ready.wait(10)
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get('/latest/dex/tokens/{addresses}', self._handle_tokens)
+        self._runner = web.AppRunner(app, access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        self._loop.run_until_complete(site.start())
+        self.port = self._runner.addresses[0][1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _handle_tokens(self, request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            self.failures['429'] += 1
+            return web.json_response({'error': 'rate limited'}, status=429)
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.failures['500'] += 1
+            return web.json_response({'error': 'internal'}, status=500)
+
+        cas = request.match_info['addresses'].split(',')
+        self.addresses += len(cas)
+        return web.json_response({'pairs': [self._pair(ca) for ca in cas]})
+
+    def _pair(self, ca):
+        price = self._prices.get(ca) or self._random.uniform(0.00001, 0.001)
+        price *= self._random.lognormvariate(0.01, 0.08)
+        self._prices[ca] = price
+        return {
+            'chainId': 'solana',
+            'baseToken': {'address': ca, 'name': f"Token {ca[:4]}", 'symbol': ca[:4].upper()},
+            'priceUsd': f"{price:.10f}",
+            'fdv': price * 1_000_000_000,
+            'liquidity': {'usd': self._random.uniform(10_000, 200_000)},
+            'volume': {'h24': self._random.uniform(50_000, 2_000_000)}
+        }
+
+    def stats(self):
+        return {'requests': self.requests, 'addresses': self.addresses, 'failures': dict(self.failures)}
+
+
+class FakeEvent:
+    """Telethon NewMessage event stand-in (the attributes the pipeline reads)"""
+
+    def __init__(self, chat_id, title, message_id, text, reply_to_msg_id=None):
+        self.chat_id = chat_id
+        self.message = SimpleNamespace(message=text, id=message_id, reply_to_msg_id=reply_to_msg_id)
+        self._chat = SimpleNamespace(title=title)
+
+    async def get_chat(self):
+        return self._chat
+
+
+def configure_environment(args, workdir, dexscreener):
+    """Settings read by config.py; must be set before any bot module is imported"""
+    channel_ids = [str(FIRST_CHANNEL_ID - i) for i in range(args.channels)]
+    settings = {
+        'TELEGRAM_API_ID': '0',
+        'TELEGRAM_API_HASH': 'benchmark',
+        'CHANNEL_IDS': ','.join(channel_ids),
+        'DEXSCREENER_API_BASE': dexscreener.base_url,
+        'SHEETS_WAL_PATH': os.path.join(workdir, 'sheet_writes.db'),
+        'TICK_HISTORY_DIR': os.path.join(workdir, 'ticks'),
+        'PRICE_CACHE_TTL': '0',  # every tick goes to the (fake) API
+        'SIGNAL_STORE_RECONCILE_INTERVAL': '86400',
+        'RATE_LIMIT_BACKOFF': str(args.backoff),
+    }
+    if not args.real_limits:
+        # Measure the bot, not the production quotas
+        for name in ('DEXSCREENER', 'SHEETS_READ', 'SHEETS_WRITE'):
+            settings[f'{name}_RATE_LIMIT'] = '1000000'
+            settings[f'{name}_RATE_BURST'] = '100000'
+    os.environ.update(settings)
+
+
+def quiet_console(verbose, json_output):
+    """Keep the console readable (clean for --json): bot logs still go to the log files"""
+    if verbose:
+        return
+    from logger import logger
+    logger.console_handler.setLevel(logging.CRITICAL if json_output else logging.ERROR)
+
+
+def seed_signals(sheet, handler_class, count, rng):
+    """Header row plus `count` active signals of mixed age"""
+    headers = handler_class._get_expected_headers(None)
+    sheet.rows = [list(headers)]
+    now = datetime.now()
+    for number in range(1, count + 1):
+        mc_entry = rng.uniform(20_000, 500_000)
+        received = now - timedelta(minutes=rng.uniform(0, 2 * 24 * 60))
+        row = handler_class._build_row(None, number, {
+            'timestamp_received': received.strftime('%Y-%m-%d %H:%M:%S'),
+            'channel_id': FIRST_CHANNEL_ID,
+            'channel_name': 'Seed Channel',
+            'message_id': number,
+            'ca': random_ca(rng),
+            'token_name': f"SEED{number}",
+            'chain': 'Solana',
+            'price_entry': mc_entry / 1_000_000_000,
+            'mc_entry': mc_entry,
+            'current_status': 'active'
+        })
+        sheet.rows.append(row)
+
+
+def build_messages(args, compiled_formats, rng):
+    """Synthetic signal posts over all channels, with some alert replies"""
+    channel_formats = {}
+    formats = list(compiled_formats)
+    messages = []
+    signals_by_channel = {}
+    for number in range(1, args.messages + 1):
+        channel_id = FIRST_CHANNEL_ID - (number % args.channels)
+        format_key = channel_formats.setdefault(channel_id, formats[len(channel_formats) % len(formats)])
+        earlier = signals_by_channel.get(channel_id)
+        if earlier and rng.random() < args.alert_ratio:
+            text = (f"🚨 {rng.choice([2, 3, 5])}x ALERT\n🪙 Token\nEntry MC: $50K\n"
+                    f"Current MC: $150K\nGain: 3.0x")
+            messages.append(FakeEvent(channel_id, f"Channel {channel_id}", 1_000_000 + number, text,
+                                      reply_to_msg_id=rng.choice(earlier)))
+            continue
+        text = compiled_formats[format_key].config['example'].replace('ABC123...XYZ789', random_ca(rng))
+        message_id = 1_000_000 + number
+        messages.append(FakeEvent(channel_id, f"Channel {channel_id}", message_id, text))
+        signals_by_channel.setdefault(channel_id, []).append(message_id)
+    return messages, channel_formats
+
+
+async def run_tracker(args, handler, sheet, dexscreener):
+    from price_tracker import PriceTracker
+
+    tracker = PriceTracker(handler)
+    tracker.sync_schedule()
+    latencies = []
+    api_calls = []
+    sheets_calls = []
+    updates = 0
+
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        # Every active signal is due on every benchmark tick
+        now = time.monotonic()
+        for key in tracker.scheduler.keys():
+            tracker.scheduler.schedule(key, now)
+        due_signals = tracker.collect_due_signals()
+
+        api_before = dexscreener.requests
+        sheets_before = sheet.total_calls()
+        tick_start = time.perf_counter()
+        await tracker.run_tick(due_signals)
+        # Count the tick's cell writes as part of the tick
+        await asyncio.to_thread(handler.flush_writes)
+        latencies.append(time.perf_counter() - tick_start)
+        api_calls.append(dexscreener.requests - api_before)
+        sheets_calls.append(sheet.total_calls() - sheets_before)
+        updates += len(due_signals)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'signals': len(handler.get_active_signals()),
+        'ticks': args.ticks,
+        'signal_updates': updates,
+        'elapsed_sec': round(elapsed, 3),
+        'ticks_per_sec': round(args.ticks / elapsed, 2) if elapsed else 0,
+        'signal_updates_per_sec': round(updates / elapsed, 1) if elapsed else 0,
+        'api_calls_per_tick': round(sum(api_calls) / max(1, len(api_calls)), 2),
+        'sheets_calls_per_tick': round(sum(sheets_calls) / max(1, len(sheets_calls)), 2),
+        'latency_p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'latency_p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'deadline_misses': tracker.deadline_misses
+    }
+
+
+async def run_ingestion(args, handler, sheet, dexscreener, rng):
+    """Feed synthetic messages through the same pipeline main.py's handler submits to"""
+    import config
+    from channel_formats import COMPILED_FORMATS
+    from ingestion_pipeline import IngestionPipeline
+
+    messages, channel_formats = build_messages(args, COMPILED_FORMATS, rng)
+    config.CHANNEL_FORMAT_MAPPING.update(channel_formats)
+
+    submitted_at = {}
+    written_at = {}
+    original_append = handler.append_signals
+
+    def timed_append(signals):
+        numbers = original_append(signals)
+        done = time.perf_counter()
+        for data, number in zip(signals, numbers):
+            if number is not None:
+                written_at[data['message_id']] = done
+        return numbers
+
+    handler.append_signals = timed_append
+    pipeline = IngestionPipeline(handler)
+    pipeline.start()
+
+    api_before = dexscreener.requests
+    sheets_before = sheet.total_calls()
+    started = time.perf_counter()
+    for event in messages:
+        submitted_at[event.message.id] = time.perf_counter()
+        await pipeline.submit(event)
+    await pipeline.close(timeout=args.timeout)
+    await asyncio.to_thread(handler.flush_writes)
+    elapsed = time.perf_counter() - started
+    handler.append_signals = original_append
+
+    latencies = [written_at[message_id] - submitted_at[message_id] for message_id in written_at]
+    return {
+        'messages': len(messages),
+        'channels': args.channels,
+        'signals_written': len(written_at),
+        'elapsed_sec': round(elapsed, 3),
+        'messages_per_sec': round(len(messages) / elapsed, 1) if elapsed else 0,
+        'api_calls': dexscreener.requests - api_before,
+        'sheets_calls': sheet.total_calls() - sheets_before,
+        'latency_p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'latency_p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'backpressure_waits': pipeline.backpressure_waits,
+        'pipeline': pipeline.stats()
+    }
+
+
+async def run(args, workdir, dexscreener):
+    from sheets_handler import SheetsHandler
+    from http_client import close_http_client
+
+    rng = random.Random(args.seed)
+    sheet = FakeWorksheet(args.sheets_latency, args.sheets_error_rate, args.sheets_429_rate, args.seed)
+    seed_signals(sheet, SheetsHandler, args.signals, rng)
+
+    class BenchSheetsHandler(SheetsHandler):
+        def _open_sheet(self):
+            return sheet
+
+    handler = BenchSheetsHandler()
+    flusher = asyncio.create_task(handler.run_write_flusher())
+    try:
+        tracker_results = await run_tracker(args, handler, sheet, dexscreener) if args.ticks else None
+        ingestion_results = await run_ingestion(args, handler, sheet, dexscreener, rng) if args.messages else None
+    finally:
+        flusher.cancel()
+        await asyncio.gather(flusher, return_exceptions=True)
+        await close_http_client()
+
+    return {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'config': vars(args),
+        'tracker': tracker_results,
+        'ingestion': ingestion_results,
+        'fake_sheets': sheet.stats(),
+        'fake_dexscreener': dexscreener.stats()
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline end-to-end bot benchmark against fake Sheets/DexScreener")
+    parser.add_argument('--signals', type=int, default=300, help="Active signals seeded in the fake sheet")
+    parser.add_argument('--ticks', type=int, default=20, help="Tracker ticks (every signal due each tick)")
+    parser.add_argument('--messages', type=int, default=500, help="Synthetic Telegram messages to ingest")
+    parser.add_argument('--channels', type=int, default=5)
+    parser.add_argument('--alert-ratio', type=float, default=0.1, help="Share of messages that are alert replies")
+    parser.add_argument('--sheets-latency', type=float, default=0.05, help="Seconds per fake Sheets call")
+    parser.add_argument('--sheets-error-rate', type=float, default=0.0)
+    parser.add_argument('--sheets-429-rate', type=float, default=0.0)
+    parser.add_argument('--api-latency', type=float, default=0.05, help="Seconds per fake DexScreener request")
+    parser.add_argument('--api-error-rate', type=float, default=0.0)
+    parser.add_argument('--api-429-rate', type=float, default=0.0)
+    parser.add_argument('--backoff', type=float, default=0.5, help="RATE_LIMIT_BACKOFF after a 429 (seconds)")
+    parser.add_argument('--real-limits', action='store_true', help="Keep the production rate limits")
+    parser.add_argument('--timeout', type=float, default=120, help="Max seconds to drain the ingestion pipeline")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    parser.add_argument('--output', help="Also write the JSON results to this file")
+    parser.add_argument('--verbose', action='store_true', help="Show bot logs on the console")
+    return parser.parse_args()
+
+
+def print_report(results):
+    print("=" * 70)
+    print("⏱️  BOT BENCHMARK (fake Sheets + fake DexScreener)")
+    print("=" * 70)
+    tracker = results['tracker']
+    if tracker:
+        print(f"Tracker:   {tracker['signals']} signals x {tracker['ticks']} ticks")
+        print(f"   • {tracker['ticks_per_sec']} ticks/sec, {tracker['signal_updates_per_sec']} signal updates/sec")
+        print(f"   • {tracker['api_calls_per_tick']} API calls/tick, {tracker['sheets_calls_per_tick']} Sheets calls/tick")
+        print(f"   • latency p50 {tracker['latency_p50_ms']}ms, p99 {tracker['latency_p99_ms']}ms, "
+              f"{tracker['deadline_misses']} deadline misses")
+    ingestion = results['ingestion']
+    if ingestion:
+        print(f"Ingestion: {ingestion['messages']} messages over {ingestion['channels']} channels")
+        print(f"   • {ingestion['messages_per_sec']} messages/sec, {ingestion['signals_written']} signals written")
+        print(f"   • {ingestion['api_calls']} API calls, {ingestion['sheets_calls']} Sheets calls")
+        print(f"   • latency p50 {ingestion['latency_p50_ms']}ms, p99 {ingestion['latency_p99_ms']}ms, "
+              f"{ingestion['backpressure_waits']} backpressure waits")
+
+
+def main():
+    args = parse_args()
+    dexscreener = FakeDexScreener(args.api_latency, args.api_error_rate, args.api_429_rate, args.seed).start()
+    try:
+        with tempfile.TemporaryDirectory(prefix='bot-benchmark-') as workdir:
+            configure_environment(args, workdir, dexscreener)
+            from logger import setup_logging
+            setup_logging()
+            quiet_console(args.verbose, args.json)
+            results = asyncio.run(run(args, workdir, dexscreener))
+    finally:
+        dexscreener.stop()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Parser throughput benchmark (messages/sec per channel format)
+Runs offline: no Telegram, Sheets or DexScreener access needed
+
+Usage: python benchmark_parser.py [--iterations N] [--json]
+"""
+
+import argparse
+import json
+import re
+import time
+from channel_formats import CHANNEL_FORMATS, COMPILED_FORMATS
+from signal_parser import extract_signal_fields, classify_message
+
+SAMPLE_CA = '73toJFpdDpRQiXihBJYL5XK7TxqAiMh9Vg2yuZ1Xpump'
+
+
+def sample_message(format_config):
+    """Use the format's own example, with a valid-length CA"""
+    return format_config['example'].replace('ABC123...XYZ789', SAMPLE_CA)
+
+
+def legacy_parse(message_text, format_config):
+    """Reference: the previous parser (raw pattern strings, per-field re.search, classify twice)"""
+    re.search(r'\d+x\s+ALERT', message_text, re.IGNORECASE)
+    any(keyword in message_text for keyword in ['Contract:', 'Market Cap:', 'Chain:', 'Confidence:'])
+
+    patterns = format_config['patterns']
+    data = {}
+    token_match = re.search(patterns.get('token_name', r'([A-Z][A-Za-z0-9\s\-]+)'), message_text, re.MULTILINE)
+    data['token_name'] = re.sub(r'[^\w\s\-]', '', token_match.group(1)).strip() if token_match else 'Unknown'
+
+    chain_match = re.search(patterns['chain'], message_text, re.IGNORECASE | re.MULTILINE) if 'chain' in patterns else None
+    data['chain'] = chain_match.group(1) if chain_match else ''
+    price_match = re.search(patterns['price'], message_text, re.IGNORECASE) if 'price' in patterns else None
+    data['price_entry'] = float(price_match.group(1)) if price_match else 0
+
+    for field, key in (('market_cap', 'mc_entry'), ('liquidity', 'liquidity'), ('volume_24h', 'volume_24h')):
+        match = re.search(patterns[field], message_text, re.IGNORECASE) if field in patterns else None
+        if match:
+            unit = match.group(2).upper() if len(match.groups()) > 1 else ''
+            multipliers = {'K': 1000, 'M': 1000000, 'B': 1000000000}
+            data[key] = float(match.group(1)) * multipliers.get(unit, 1)
+        else:
+            data[key] = 0
+
+    for field, key in (('bundles', 'bundles_percent'), ('snipers', 'snipers_percent'),
+                       ('dev', 'dev_percent'), ('confidence', 'confidence_score')):
+        match = re.search(patterns[field], message_text, re.IGNORECASE) if field in patterns else None
+        data[key] = int(match.group(1)) if match else 0
+
+    ca_match = re.search(patterns['ca'], message_text, re.IGNORECASE) if 'ca' in patterns else None
+    data['ca'] = ca_match.group(1) if ca_match else ''
+    return data
+
+
+def measure(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed if elapsed else float('inf')
+
+
+def run(iterations):
+    results = {}
+    for key, format_config in CHANNEL_FORMATS.items():
+        message = sample_message(format_config)
+        compiled = COMPILED_FORMATS[key]
+
+        def precompiled():
+            classify_message(message)
+            extract_signal_fields(message, compiled)
+
+        results[key] = {
+            'precompiled_msgs_per_sec': round(measure(precompiled, iterations)),
+            'legacy_msgs_per_sec': round(measure(lambda: legacy_parse(message, format_config), iterations)),
+        }
+        results[key]['speedup'] = round(
+            results[key]['precompiled_msgs_per_sec'] / max(1, results[key]['legacy_msgs_per_sec']), 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark signal parser throughput per channel format")
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print("=" * 70)
+    print("⏱️  PARSER BENCHMARK (messages/sec, classify_message + per-field extract)")
+    print("=" * 70)
+    print(f"{'format':<14}{'precompiled':>16}{'legacy':>16}{'speedup':>10}")
+    for key, row in results.items():
+        print(f"{key:<14}{row['precompiled_msgs_per_sec']:>16,}{row['legacy_msgs_per_sec']:>16,}{row['speedup']:>9}x")
+
+
+if __name__ == '__main__':
+    main()
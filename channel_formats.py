@@ -3,6 +3,7 @@ Multi-format signal parser configurations
 Supports different channel formats
 """
 
+import re
 import config
 
 # Channel format definitions
@@ -175,7 +176,51 @@ CHANNEL_FORMAT_MAPPING = config.CHANNEL_FORMAT_MAPPING
 # Default format if channel not mapped (loaded from .env or defaults to 'standard')
 DEFAULT_FORMAT = config.DEFAULT_CHANNEL_FORMAT
 
+# Regex flags per field (same flags the parser always used); other fields are case-insensitive
+FIELD_FLAGS = {
+    'token_name': re.MULTILINE,
+    'chain': re.IGNORECASE | re.MULTILINE,
+}
+
+# Used when a format has no token_name pattern of its own
+DEFAULT_TOKEN_NAME_PATTERN = r'([A-Z][A-Za-z0-9\s\-]+)'
+
+
+class CompiledFormat:
+    """A channel format with its field patterns compiled once (one pattern per field)"""
+
+    def __init__(self, key, format_config):
+        self.key = key
+        self.name = format_config['name']
+        self.config = format_config
+        self.auto_fetch = format_config.get('auto_fetch', False)
+        patterns = dict(format_config['patterns'])
+        patterns.setdefault('token_name', DEFAULT_TOKEN_NAME_PATTERN)
+        self.patterns = {
+            field: re.compile(pattern, FIELD_FLAGS.get(field, re.IGNORECASE))
+            for field, pattern in patterns.items()
+        }
+
+
+COMPILED_FORMATS = {}
+
+
+def compile_formats():
+    """(Re)compile every entry of CHANNEL_FORMATS; call again after editing formats"""
+    global COMPILED_FORMATS
+    COMPILED_FORMATS = {key: CompiledFormat(key, fmt) for key, fmt in CHANNEL_FORMATS.items()}
+    return COMPILED_FORMATS
+
+
+def get_compiled_format_for_channel(channel_id):
+    """Get the precompiled format for a channel"""
+    format_key = CHANNEL_FORMAT_MAPPING.get(channel_id, DEFAULT_FORMAT)
+    return COMPILED_FORMATS.get(format_key, COMPILED_FORMATS['standard'])
+
+
 def get_format_for_channel(channel_id):
     """Get the appropriate format configuration for a channel"""
-    format_key = CHANNEL_FORMAT_MAPPING.get(channel_id, DEFAULT_FORMAT)
-    return CHANNEL_FORMATS.get(format_key, CHANNEL_FORMATS['standard'])
+    return get_compiled_format_for_channel(channel_id).config
+
+
+compile_formats()
@@ -14,7 +14,8 @@ GOOGLE_SHEET_ID = os.getenv('GOOGLE_SHEET_ID')
 GOOGLE_SERVICE_ACCOUNT_JSON = os.getenv('GOOGLE_SERVICE_ACCOUNT_JSON')
 
 # DexScreener API
-DEXSCREENER_API_BASE = "https://api.dexscreener.com/latest/dex"
+DEXSCREENER_API_BASE = os.getenv('DEXSCREENER_API_BASE', 'https://api.dexscreener.com/latest/dex')  # overridden by benchmarks
+DEXSCREENER_BATCH_SIZE = 30  # max comma-separated addresses per /tokens request
 
 # Tracking intervals in minutes
 TRACKING_INTERVALS = [5, 10, 15, 30, 60]
@@ -26,12 +27,44 @@ ALERT_MULTIPLIERS = [2, 3, 5, 10]
 HEARTBEAT_INTERVAL = 300  # 5 minutes
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
 ENABLE_DEBUG_LOGS = os.getenv('ENABLE_DEBUG_LOGS', 'False').lower() == 'true'
+# logs/bot.log rotates at LOG_FILE_MAX_BYTES, keeping LOG_FILE_BACKUP_COUNT old files
+# (gzipped in the background when LOG_COMPRESS_ROTATED is on).
+LOG_FILE_MAX_BYTES = int(os.getenv('LOG_FILE_MAX_BYTES', str(20 * 1024 * 1024)))
+LOG_FILE_BACKUP_COUNT = int(os.getenv('LOG_FILE_BACKUP_COUNT', '5'))
+LOG_COMPRESS_ROTATED = os.getenv('LOG_COMPRESS_ROTATED', 'True').lower() == 'true'
 
 # Bot Settings
 MAX_ERROR_LOG_LENGTH = 500
 API_TIMEOUT = 10
 TRACKING_DURATION = 4320  # minutes (3 days)
 
+# Rate limits (requests per minute + burst size), one token bucket per upstream quota.
+# Callers wait for capacity instead of failing. Defaults follow DexScreener's
+# 300/min on /tokens and Google Sheets' 60/min per-user read and write quotas.
+DEXSCREENER_RATE_LIMIT = float(os.getenv('DEXSCREENER_RATE_LIMIT', '300'))
+DEXSCREENER_RATE_BURST = int(os.getenv('DEXSCREENER_RATE_BURST', '20'))
+SHEETS_READ_RATE_LIMIT = float(os.getenv('SHEETS_READ_RATE_LIMIT', '60'))
+SHEETS_READ_RATE_BURST = int(os.getenv('SHEETS_READ_RATE_BURST', '10'))
+SHEETS_WRITE_RATE_LIMIT = float(os.getenv('SHEETS_WRITE_RATE_LIMIT', '60'))
+SHEETS_WRITE_RATE_BURST = int(os.getenv('SHEETS_WRITE_RATE_BURST', '10'))
+RATE_LIMIT_BACKOFF = float(os.getenv('RATE_LIMIT_BACKOFF', '30'))  # seconds to back off after a 429
+RATE_LIMIT_MAX_RETRIES = int(os.getenv('RATE_LIMIT_MAX_RETRIES', '3'))  # retries after a 429
+
+# Shared async HTTP client (keep-alive pool + DNS cache)
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '20'))  # max open connections
+HTTP_DNS_CACHE_TTL = int(os.getenv('HTTP_DNS_CACHE_TTL', '300'))  # seconds
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', '30'))  # seconds
+
+# DexScreener enrichment for auto-fetch formats and SPONSORED posts:
+#   await    - fetch first, then write the complete row (default)
+#   backfill - write the parsed row immediately, fill entry price/MC when the fetch returns
+SIGNAL_ENRICHMENT_MODE = os.getenv('SIGNAL_ENRICHMENT_MODE', 'await').strip().lower()
+
+# Per-CA price cache: one DexScreener lookup serves every row/caller for `TTL` seconds.
+# Keep the TTL below the fastest smart polling interval (30s) so ticks still see fresh prices.
+PRICE_CACHE_TTL = float(os.getenv('PRICE_CACHE_TTL', '10'))  # seconds, 0 disables caching
+PRICE_CACHE_MAX_SIZE = int(os.getenv('PRICE_CACHE_MAX_SIZE', '2000'))  # CAs kept (LRU eviction)
+
 # Smart Polling Settings (Realtime-like updates)
 # Age-based intervals for dynamic polling
 SMART_POLLING_INTERVALS = {
@@ -45,6 +78,90 @@ SMART_POLLING_INTERVALS = {
 # Thresholds for "hot" token detection
 HOT_GAIN_THRESHOLD = 20  # percent gain to be considered "hot"
 
+# Tracker settings
+# How many ticks (one bulk DexScreener fetch + evaluation of the signals due at that moment)
+# may run at once; signals that come due while every slot is busy join the next tick
+TRACKER_CONCURRENCY = int(os.getenv('TRACKER_CONCURRENCY', '4'))
+# A due signal that starts more than this many seconds late counts as a missed deadline
+TRACKER_DEADLINE_GRACE = float(os.getenv('TRACKER_DEADLINE_GRACE', '5'))
+
+# In-memory signal store
+# The tracker and heartbeat read active signals from memory; the full sheet is
+# only re-read every SIGNAL_STORE_RECONCILE_INTERVAL seconds to pick up manual edits
+SIGNAL_STORE_RECONCILE_INTERVAL = int(os.getenv('SIGNAL_STORE_RECONCILE_INTERVAL', '600'))
+# Projected reconcile: read the status/lookup columns of every row, then the other columns of
+# active rows only (no update_history/error_log); False reads the whole sheet with get_all_records
+SHEETS_PROJECTED_READS = os.getenv('SHEETS_PROJECTED_READS', 'True').lower() == 'true'
+# Incremental sync between full re-reads: every SIGNAL_STORE_SYNC_INTERVAL seconds compare a few
+# fingerprint columns (status, mc_entry, last_update_time, ...) and re-read only changed rows (0 disables)
+SIGNAL_STORE_SYNC_INTERVAL = float(os.getenv('SIGNAL_STORE_SYNC_INTERVAL', '15'))
+
+# Coalescing sheet writer
+# Cell updates from every row are buffered and sent as one batch request.
+# A flush happens at most SHEETS_WRITE_MAX_LATENCY seconds after the first
+# pending write, or as soon as SHEETS_WRITE_MAX_BATCH cells are pending.
+SHEETS_WRITE_MAX_LATENCY = float(os.getenv('SHEETS_WRITE_MAX_LATENCY', '2'))
+SHEETS_WRITE_MAX_BATCH = int(os.getenv('SHEETS_WRITE_MAX_BATCH', '5000'))
+# Write-ahead log for sheet writes: every cell write is committed here before it is
+# sent, and replayed after an outage or restart. Empty path disables it.
+# SHEETS_WAL_SYNC=FULL fsyncs each commit; NORMAL is faster but not power-loss safe.
+SHEETS_WAL_PATH = os.getenv('SHEETS_WAL_PATH', 'data/sheet_writes.db')
+SHEETS_WAL_SYNC = os.getenv('SHEETS_WAL_SYNC', 'FULL').strip().upper()
+# Signals already queued for the sheet writer are appended with one write
+# (at most SHEETS_APPEND_BATCH_MAX rows per write).
+SHEETS_APPEND_BATCH_MAX = int(os.getenv('SHEETS_APPEND_BATCH_MAX', '50'))
+
+# Ingestion pipeline: bounded queue between Telegram and each parser worker
+# (the handler waits when it is full) and number of parser/enrichment workers.
+# Every channel is handled by one worker, so its messages stay in order.
+INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', '1000'))
+INGEST_PARSER_WORKERS = int(os.getenv('INGEST_PARSER_WORKERS', '4'))
+
+# Tick history: every polled price (timestamp, price, MC, liquidity, volume) is appended
+# to a compact per-CA file in TICK_HISTORY_DIR (empty disables). Files not written to
+# for TICK_HISTORY_RETENTION_HOURS are deleted.
+TICK_HISTORY_DIR = os.getenv('TICK_HISTORY_DIR', 'data/ticks')
+TICK_HISTORY_RETENTION_HOURS = float(os.getenv('TICK_HISTORY_RETENTION_HOURS', '96'))
+TICK_HISTORY_OPEN_FILES = int(os.getenv('TICK_HISTORY_OPEN_FILES', '256'))  # append handles kept open
+
+# Storage backend:
+#   sheets - Google Sheets is the system of record (default)
+#   local  - SQLite at LOCAL_DB_PATH is the system of record; the sheet is a projection
+#            refreshed every SHEET_PROJECTION_INTERVAL seconds (or not at all when disabled)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sheets').strip().lower()
+LOCAL_DB_PATH = os.getenv('LOCAL_DB_PATH', 'data/signals.db')
+SHEET_PROJECTION_ENABLED = os.getenv('SHEET_PROJECTION_ENABLED', 'True').lower() == 'true'
+SHEET_PROJECTION_INTERVAL = float(os.getenv('SHEET_PROJECTION_INTERVAL', '60'))  # seconds
+
+# Metrics: Prometheus text on http://METRICS_HOST:METRICS_PORT/metrics (JSON on /metrics.json),
+# METRICS_PORT=0 disables the endpoint. METRICS_JSON_PATH (if set) gets a JSON dump every
+# METRICS_JSON_INTERVAL seconds.
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
+METRICS_JSON_PATH = os.getenv('METRICS_JSON_PATH', '')
+METRICS_JSON_INTERVAL = float(os.getenv('METRICS_JSON_INTERVAL', '60'))
+
+# Stage profiling of the tracking hot path (off by default, near-zero cost when off).
+# Toggle at runtime with `kill -USR1 <pid>`, `kill -USR2 <pid>` logs a report now.
+# While on, the top PROFILING_TOP_N slowest stages are logged every PROFILING_REPORT_INTERVAL
+# seconds; PROFILING_CPROFILE_PATH (if set) also gets a cProfile/pstats snapshot.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+PROFILING_REPORT_INTERVAL = float(os.getenv('PROFILING_REPORT_INTERVAL', '300'))
+PROFILING_TOP_N = int(os.getenv('PROFILING_TOP_N', '10'))
+PROFILING_CPROFILE_PATH = os.getenv('PROFILING_CPROFILE_PATH', '')
+
+# Archive rotation (Google Sheets backend): every ARCHIVE_INTERVAL seconds (0 disables), finished
+# rows (ARCHIVE_STATUSES) idle for ARCHIVE_MIN_AGE_HOURS are moved into monthly worksheets named
+# <ARCHIVE_WORKSHEET_PREFIX>YYYY_MM - in ARCHIVE_SPREADSHEET_ID if set, else the bot's spreadsheet -
+# and deleted from the hot sheet. A run waits for ARCHIVE_MIN_ROWS candidates, moves ARCHIVE_MAX_ROWS at most.
+ARCHIVE_INTERVAL = float(os.getenv('ARCHIVE_INTERVAL', '3600'))
+ARCHIVE_STATUSES = [s.strip() for s in os.getenv('ARCHIVE_STATUSES', 'stopped,no_pairs,invalid_ca').split(',') if s.strip()]
+ARCHIVE_MIN_AGE_HOURS = float(os.getenv('ARCHIVE_MIN_AGE_HOURS', '24'))
+ARCHIVE_MIN_ROWS = int(os.getenv('ARCHIVE_MIN_ROWS', '100'))
+ARCHIVE_MAX_ROWS = int(os.getenv('ARCHIVE_MAX_ROWS', '2000'))
+ARCHIVE_SPREADSHEET_ID = os.getenv('ARCHIVE_SPREADSHEET_ID', '')
+ARCHIVE_WORKSHEET_PREFIX = os.getenv('ARCHIVE_WORKSHEET_PREFIX', 'archive_')
+
 # Channel Format Mapping (from .env)
 # Format: CHANNEL_FORMATS=channel_id1:format1,channel_id2:format2
 # Example: CHANNEL_FORMATS=-1002031885122:ca_only,-1002026135487:narrative_ca
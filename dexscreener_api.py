@@ -0,0 +1,152 @@
+import asyncio
+import time
+import aiohttp
+from config import DEXSCREENER_API_BASE, DEXSCREENER_BATCH_SIZE, RATE_LIMIT_BACKOFF, RATE_LIMIT_MAX_RETRIES
+from logger import logger
+from http_client import get_http_client
+from rate_limiter import get_bucket
+from price_cache import get_price_cache
+from metrics import metrics
+
+DEXSCREENER_REQUESTS = metrics.counter('dexscreener_requests_total', 'DexScreener /tokens requests by HTTP status')
+DEXSCREENER_SECONDS = metrics.histogram('dexscreener_request_seconds', 'DexScreener /tokens request latency')
+
+
+def parse_pair(pair):
+    """Convert one DexScreener pair object into our price data dict"""
+    base_token = pair.get('baseToken', {})
+    chain_id = pair.get('chainId', 'solana')
+
+    return {
+        'token_name': base_token.get('name', 'Unknown'),
+        'token_symbol': base_token.get('symbol', ''),
+        'chain': chain_id.capitalize(),
+        'price': float(pair.get('priceUsd', 0) or 0),
+        'market_cap': float(pair.get('fdv', 0) or 0),  # Fully Diluted Valuation
+        'liquidity': float((pair.get('liquidity') or {}).get('usd', 0) or 0),
+        'volume_24h': float((pair.get('volume') or {}).get('h24', 0) or 0)
+    }
+
+
+def _pair_liquidity(pair):
+    try:
+        return float((pair.get('liquidity') or {}).get('usd', 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def demux_pairs(cas, pairs):
+    """Map each requested CA to its most liquid pair (CA is the pair's base token)
+
+    Solana addresses are case-sensitive, EVM ones are not, so an exact match
+    is preferred and a lowercase match is used as fallback.
+    """
+    best = {}
+    for pair in pairs or []:
+        address = (pair.get('baseToken') or {}).get('address', '')
+        if not address:
+            continue
+        current = best.get(address)
+        if current is None or _pair_liquidity(pair) > _pair_liquidity(current):
+            best[address] = pair
+
+    best_lower = {address.lower(): pair for address, pair in best.items()}
+    result = {}
+    for ca in cas:
+        pair = best.get(ca) or best_lower.get(ca.lower())
+        result[ca] = pair
+    return result
+
+
+async def fetch_tokens(cas, batch_size=DEXSCREENER_BATCH_SIZE, use_cache=True):
+    """Fetch price data for many CAs with one /tokens request per chunk
+
+    Returns {ca: price_data or None}. A CA maps to None when DexScreener answered
+    but has no trading pair for it; CAs whose chunk request failed (HTTP error,
+    429, timeout) are left out, so callers can tell "no pairs" from "try again".
+    With use_cache, fresh cached prices are reused and concurrent lookups of a
+    CA share one request.
+    """
+    unique_cas = list(dict.fromkeys(ca for ca in cas if ca and len(ca) >= 32))
+    if not unique_cas:
+        return {}
+
+    if use_cache:
+        return await get_price_cache().get_many(unique_cas, lambda missing: _fetch_uncached(missing, batch_size))
+    return await _fetch_uncached(unique_cas, batch_size)
+
+
+async def _fetch_uncached(unique_cas, batch_size):
+    chunks = [unique_cas[i:i + batch_size] for i in range(0, len(unique_cas), batch_size)]
+    results = await asyncio.gather(*(_fetch_chunk(chunk) for chunk in chunks))
+
+    prices = {}
+    for chunk_result in results:
+        prices.update(chunk_result)
+    return prices
+
+
+async def fetch_token(ca):
+    """Fetch price data for a single CA (or None)"""
+    prices = await fetch_tokens([ca])
+    return prices.get(ca)
+
+
+async def _get_tokens(url):
+    """GET one /tokens URL, recording request count and latency by status"""
+    start = time.perf_counter()
+    status = 'error'
+    try:
+        status, data = await get_http_client().get_json(url)
+        return status, data
+    finally:
+        DEXSCREENER_REQUESTS.inc(status=str(status))
+        DEXSCREENER_SECONDS.observe(time.perf_counter() - start, status=str(status))
+
+
+async def _fetch_chunk(cas):
+    """Fetch up to DEXSCREENER_BATCH_SIZE addresses in a single request ({} if it failed)"""
+    url = f"{DEXSCREENER_API_BASE}/tokens/{','.join(cas)}"
+    dexscreener_bucket = get_bucket('dexscreener')
+
+    try:
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            # Wait for capacity in the shared DexScreener bucket instead of hitting 429s
+            await dexscreener_bucket.acquire()
+            status, data = await _get_tokens(url)
+            if status != 429:
+                break
+            dexscreener_bucket.penalize(RATE_LIMIT_BACKOFF)
+
+        if status == 404:
+            # None of the addresses are known to the endpoint
+            logger.debug("DexScreener 404 for %d CA(s)", len(cas))
+            return {ca: None for ca in cas}
+        elif status != 200:
+            logger.api_error("DexScreener", f"HTTP {status} for {len(cas)} CA(s)")
+            return {}
+
+        pairs_by_ca = demux_pairs(cas, (data or {}).get('pairs'))
+        result = {}
+        for ca, pair in pairs_by_ca.items():
+            if pair is None:
+                # API returned OK but no trading pairs exist for this token
+                logger.debug("No trading pairs found for CA: %.8s...", ca)
+                result[ca] = None
+                continue
+            try:
+                result[ca] = parse_pair(pair)
+            except (KeyError, ValueError, TypeError) as e:
+                logger.debug("DexScreener data parsing error for %.8s...: %s", ca, e)
+                result[ca] = None
+
+        if logger.debug_enabled:
+            logger.debug("DexScreener bulk fetch: %d/%d CAs priced", sum(1 for v in result.values() if v), len(cas))
+        return result
+
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.debug("DexScreener request failed: %r", e)
+        return {}
+    except Exception as e:
+        logger.error(f"DexScreener unexpected error: {e}", exc_info=True)
+        return {}
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import aiohttp
+from config import API_TIMEOUT, HTTP_POOL_SIZE, HTTP_DNS_CACHE_TTL, HTTP_KEEPALIVE_TIMEOUT
+from logger import logger
+
+
+class AsyncHttpClient:
+    """Shared non-blocking HTTP client with keep-alive pooling and DNS caching
+
+    One aiohttp session is created lazily inside the running event loop and
+    reused by every caller, so DexScreener requests never block Telethon or
+    the tracker while a slow response is pending.
+    """
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, dns_cache_ttl=HTTP_DNS_CACHE_TTL,
+                 keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT, timeout=API_TIMEOUT):
+        self.pool_size = pool_size
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self._session = None
+        self._session_lock = None
+
+    async def _get_session(self):
+        if self._session is not None and not self._session.closed:
+            return self._session
+
+        if self._session_lock is None:
+            self._session_lock = asyncio.Lock()
+
+        async with self._session_lock:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.pool_size,
+                    ttl_dns_cache=self.dns_cache_ttl,
+                    use_dns_cache=True,
+                    keepalive_timeout=self.keepalive_timeout
+                )
+                self._session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=aiohttp.ClientTimeout(total=self.timeout)
+                )
+                logger.debug(f"HTTP session created (pool={self.pool_size}, dns_ttl={self.dns_cache_ttl}s)")
+        return self._session
+
+    async def get_json(self, url, timeout=None):
+        """GET a URL and return (status_code, parsed_json_or_None)
+
+        Network errors and timeouts propagate as aiohttp.ClientError /
+        asyncio.TimeoutError so callers can keep their own error handling.
+        """
+        session = await self._get_session()
+        request_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+
+        async with session.get(url, timeout=request_timeout) as response:
+            if response.status != 200:
+                return response.status, None
+            return response.status, await response.json(content_type=None)
+
+    async def close(self):
+        """Close the pooled session (call on shutdown)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# Shared client used by the tracker and the signal parser, created on first use
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """The shared AsyncHttpClient"""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = AsyncHttpClient()
+        return _http_client
+
+
+async def close_http_client():
+    """Close the shared client's session, if one was ever created (call on shutdown)"""
+    if _http_client is not None:
+        await _http_client.close()
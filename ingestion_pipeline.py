@@ -0,0 +1,301 @@
+import asyncio
+import time
+from config import (INGEST_QUEUE_SIZE, INGEST_PARSER_WORKERS, SHEETS_APPEND_BATCH_MAX,
+                    SIGNAL_ENRICHMENT_MODE)
+from logger import logger
+from metrics import metrics
+from signal_parser import parse_signal_message, enrich_signal, parse_alert_update, classify_message
+
+
+INGEST_STAGE_SECONDS = metrics.histogram('ingest_stage_seconds', 'Time from enqueue to done per ingestion stage')
+INGEST_QUEUE_DEPTH = metrics.gauge('ingest_queue_depth', 'Items waiting in the ingestion queues')
+
+
+class StageStats:
+    """Throughput and latency counters for one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.processed = 0
+        self.errors = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.last_latency = 0.0
+
+    def record(self, latency, error=False):
+        self.processed += 1
+        if error:
+            self.errors += 1
+        self.last_latency = latency
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        INGEST_STAGE_SECONDS.observe(latency, stage=self.name)
+
+    def avg_latency(self):
+        return self.latency_total / self.processed if self.processed else 0.0
+
+    def stats(self, depth=None):
+        return {
+            'name': self.name,
+            'depth': depth,
+            'processed': self.processed,
+            'errors': self.errors,
+            'avg_latency': round(self.avg_latency(), 4),
+            'max_latency': round(self.latency_max, 4),
+            'last_latency': round(self.last_latency, 4)
+        }
+
+    def summary(self, depth=None):
+        depth_text = f"depth {depth}, " if depth is not None else ""
+        return (f"{self.name}: {depth_text}{self.processed} processed, {self.errors} errors, "
+                f"avg {self.avg_latency() * 1000:.0f}ms, max {self.latency_max * 1000:.0f}ms")
+
+
+class IngestionPipeline:
+    """Telethon -> parser workers -> single sheet writer, joined by bounded queues
+
+    The Telegram handler only calls submit(). Parsing and DexScreener enrichment
+    run in a pool of workers, and every sheet write goes through one writer task,
+    which appends all signals queued at that moment with a single write.
+
+    Each channel is always handled by the same worker (sharded by chat id), so
+    an alert never reaches the writer before the signal it replies to, even
+    while that signal waits for enrichment.
+
+    The pipeline can start before storage is ready: messages are parsed right
+    away and writes wait until attach_storage() is called.
+    """
+
+    def __init__(self, sheets_handler=None, workers=INGEST_PARSER_WORKERS, queue_size=INGEST_QUEUE_SIZE):
+        self.sheets = None
+        self.workers = max(1, workers)
+        self.raw_queues = [asyncio.Queue(maxsize=queue_size) for _ in range(self.workers)]
+        self.write_queue = asyncio.Queue(maxsize=queue_size)
+        self._tasks = []
+        self._background_tasks = set()
+        self._storage_ready = asyncio.Event()
+
+        # Startup timing: first message submitted / first write done
+        self.first_received = asyncio.Event()
+        self.first_handled = asyncio.Event()
+
+        # Stats
+        self.submitted = 0
+        self.backpressure_waits = 0
+        self.parse_stats = StageStats('parse')
+        self.write_stats = StageStats('write')
+        metrics.add_collector(self._collect_metrics)
+        if sheets_handler is not None:
+            self.attach_storage(sheets_handler)
+
+    def attach_storage(self, sheets_handler):
+        """Set the storage handler and release writes queued until now"""
+        self.sheets = sheets_handler
+        self._storage_ready.set()
+        if self.write_queue.qsize():
+            logger.info(f"📥 Storage ready - writing {self.write_queue.qsize()} items queued during startup")
+
+    def start(self):
+        """Start the parser worker pool and the sheet writer"""
+        for worker_id in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._parse_worker(worker_id)))
+        self._tasks.append(asyncio.create_task(self._write_worker()))
+        logger.info(f"📥 Ingestion pipeline started ({self.workers} parser workers, "
+                    f"queue size {self.raw_queues[0].maxsize} per worker)")
+
+    async def submit(self, event):
+        """Enqueue a raw Telegram message event (waits only if the queue is full)"""
+        item = (time.monotonic(), event)
+        self.submitted += 1
+        self.first_received.set()
+        raw_queue = self.raw_queues[hash(event.chat_id) % self.workers]
+        try:
+            raw_queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Backpressure: this handler task waits, other Telegram updates keep flowing
+            self.backpressure_waits += 1
+            logger.warning(f"Ingestion queue full ({raw_queue.qsize()} messages) - waiting for parser workers")
+            await raw_queue.put(item)
+
+    def raw_depth(self):
+        """Messages waiting for a parser worker, across all workers"""
+        return sum(raw_queue.qsize() for raw_queue in self.raw_queues)
+
+    async def close(self, timeout=10):
+        """Let queued messages drain (up to timeout seconds), then stop the workers"""
+        try:
+            await asyncio.wait_for(self._drain(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Ingestion pipeline closed with {self.raw_depth()} raw / "
+                           f"{self.write_queue.qsize()} write items still queued")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _drain(self):
+        for raw_queue in self.raw_queues:
+            await raw_queue.join()
+        # Backfill tasks queue writes of their own, so they finish before the last join
+        while self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        await self.write_queue.join()
+
+    # ----- parser stage -----
+
+    async def _parse_worker(self, worker_id):
+        raw_queue = self.raw_queues[worker_id]
+        while True:
+            enqueued_at, event = await raw_queue.get()
+            error = False
+            try:
+                await self._handle_message(event)
+            except Exception as e:
+                error = True
+                logger.error(f"Error in parser worker {worker_id}: {e}", exc_info=True)
+            finally:
+                self.parse_stats.record(time.monotonic() - enqueued_at, error)
+                raw_queue.task_done()
+
+    async def _handle_message(self, event):
+        message_text = event.message.message or ''
+        channel_id = event.chat_id
+        message_id = event.message.id
+        reply_to_message_id = event.message.reply_to_msg_id
+
+        # Get channel name
+        chat = await event.get_chat()
+        channel_name = chat.title if hasattr(chat, 'title') else str(channel_id)
+
+        logger.debug("Message received from %s: %.100s...", channel_name, message_text)
+        logger.debug("Message ID: %s, Reply to: %s", message_id, reply_to_message_id)
+
+        # Classify once: alert update (usually a reply), new signal, or neither
+        message_type = classify_message(message_text)
+
+        if message_type == 'alert':
+            alert_data = parse_alert_update(message_text)
+            if not alert_data:
+                logger.warning(f"Failed to parse alert from {channel_name}")
+            elif reply_to_message_id or alert_data.get('ca'):
+                # Fallback to CA lookup (reply_to None) happens in the writer
+                await self.write_queue.put(('alert', time.monotonic(), (reply_to_message_id, alert_data, channel_id)))
+            else:
+                logger.warning(f"Alert message without reply_to or CA from {channel_name}")
+
+        elif message_type == 'signal':
+            # Parsing is pure CPU; DexScreener enrichment is a separate async stage
+            parsed = parse_signal_message(message_text, channel_id, channel_name, message_id)
+            if not parsed:
+                logger.warning(f"Failed to parse signal from {channel_name}")
+                return
+
+            signal_data, enrichment = parsed
+            backfill = enrichment is not None and SIGNAL_ENRICHMENT_MODE == 'backfill'
+            if enrichment and not backfill:
+                await enrich_signal(signal_data, enrichment)
+
+            await self.write_queue.put(('signal', time.monotonic(), (signal_data, channel_name)))
+
+            if backfill:
+                task = asyncio.create_task(self._backfill_signal(signal_data, enrichment))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+
+    async def _backfill_signal(self, signal_data, enrichment):
+        """Enrich an already queued signal and backfill its entry price/MC"""
+        try:
+            fields = await enrich_signal(signal_data, enrichment)
+            if fields:
+                await self.write_queue.put(('backfill', time.monotonic(), (signal_data, fields)))
+        except Exception as e:
+            logger.error(f"Error backfilling signal {signal_data.get('ca', '')[:8]}...: {e}", exc_info=True)
+
+    # ----- sheet writer stage -----
+
+    async def _write_worker(self):
+        await self._storage_ready.wait()
+        while True:
+            items = [await self.write_queue.get()]
+            # Take whatever else is already queued, so a burst becomes one append
+            while len(items) < SHEETS_APPEND_BATCH_MAX and not self.write_queue.empty():
+                items.append(self.write_queue.get_nowait())
+
+            try:
+                await self._write_items(items)
+            except Exception as e:
+                logger.error(f"Error in sheet writer stage: {e}", exc_info=True)
+            finally:
+                for _ in items:
+                    self.write_queue.task_done()
+
+    async def _write_items(self, items):
+        """Write items in queue order; consecutive signals share one append"""
+        signals = []
+        for item in items:
+            kind = item[0]
+            if kind == 'signal':
+                signals.append(item)
+                continue
+            await self._append(signals)
+            signals = []
+            await self._write_one(item)
+        await self._append(signals)
+
+    async def _append(self, items):
+        if not items:
+            return
+        signals = [signal_data for _, _, (signal_data, _) in items]
+        # Blocking gspread write (may wait on the rate limiter) runs off the event loop
+        numbers = await asyncio.to_thread(self.sheets.append_signals, signals)
+        now = time.monotonic()
+        for (_, enqueued_at, (signal_data, channel_name)), number in zip(items, numbers):
+            self.write_stats.record(now - enqueued_at, error=number is None)
+            if number is not None:
+                self.first_handled.set()
+                logger.signal_received(signal_data.get('token_name', 'Unknown'), channel_name)
+
+    async def _write_one(self, item):
+        kind, enqueued_at, payload = item
+        error = False
+        try:
+            if kind == 'alert':
+                reply_to_message_id, alert_data, channel_id = payload
+                await asyncio.to_thread(self.sheets.update_alert_from_message,
+                                        reply_to_message_id, alert_data, channel_id)
+                label = alert_data.get('token_name', 'Unknown') if reply_to_message_id else alert_data.get('ca', '')[:8]
+                logger.alert_triggered(f"{alert_data.get('multiplier')}x", label)
+            elif kind == 'backfill':
+                signal_data, fields = payload
+                await asyncio.to_thread(self.sheets.backfill_entry_data,
+                                        signal_data['channel_id'], signal_data['message_id'], fields)
+        except Exception as e:
+            error = True
+            logger.error(f"Error writing {kind} to sheet: {e}", exc_info=True)
+        finally:
+            self.write_stats.record(time.monotonic() - enqueued_at, error)
+            if not error:
+                self.first_handled.set()
+
+    # ----- stats -----
+
+    def _collect_metrics(self):
+        INGEST_QUEUE_DEPTH.set(self.raw_depth(), queue='raw')
+        INGEST_QUEUE_DEPTH.set(self.write_queue.qsize(), queue='write')
+        INGEST_QUEUE_DEPTH.set(len(self._background_tasks), queue='backfill')
+        metrics.export_stats('ingest', {'submitted': self.submitted, 'backpressure_waits': self.backpressure_waits})
+        for stage in (self.parse_stats, self.write_stats):
+            metrics.export_stats('ingest_stage', stage.stats(), stage=stage.name)
+
+    def stats(self):
+        return {
+            'submitted': self.submitted,
+            'backpressure_waits': self.backpressure_waits,
+            'parse': self.parse_stats.stats(depth=self.raw_depth()),
+            'write': self.write_stats.stats(depth=self.write_queue.qsize())
+        }
+
+    def summary(self):
+        return (f"{self.submitted} submitted, {self.backpressure_waits} backpressure waits | "
+                f"{self.parse_stats.summary(self.raw_depth())} | "
+                f"{self.write_stats.summary(self.write_queue.qsize())}")
@@ -0,0 +1,388 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from gspread.utils import rowcol_to_a1
+from config import (LOCAL_DB_PATH, SHEET_PROJECTION_ENABLED, SHEET_PROJECTION_INTERVAL,
+                    SHEETS_WRITE_MAX_BATCH)
+from logger import logger
+from signal_store import SignalStore
+from sheets_handler import SheetsHandler, SHEETS_METHOD_SECONDS, STORAGE_ROWS
+from rate_limiter import call_blocking
+from metrics import metrics
+from profiling import profiler
+
+UNSYNCED_ROWS = metrics.gauge('local_unsynced_rows', 'Local database rows not yet projected to the sheet')
+
+
+class LocalSignalDB:
+    """SQLite system of record: one row per signal, plus price history
+
+    Rows keep their sheet row index as primary key, so the Google Sheet
+    projection is a plain row-for-row copy. Every write bumps the row's
+    _version; rows with _version > _synced_version still need projecting.
+    """
+
+    def __init__(self, path, headers):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.path = path
+        self.headers = list(headers)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+        columns = ", ".join(f'"{header}"' for header in self.headers)
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS signals (
+                row_index INTEGER PRIMARY KEY,
+                {columns},
+                _version INTEGER NOT NULL DEFAULT 1,
+                _synced_version INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # Columns added to the header list after the table was created
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(signals)")}
+        for header in self.headers:
+            if header not in existing:
+                self._conn.execute(f'ALTER TABLE signals ADD COLUMN "{header}"')
+
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_signals_status ON signals(current_status)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_signals_ca ON signals(ca)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_signals_message ON signals(message_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_signals_channel_message ON signals(channel_id, message_id)")
+        self._conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_signals_unsynced ON signals(row_index)
+            WHERE _version > _synced_version
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS price_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                row_index INTEGER NOT NULL,
+                recorded_at TEXT NOT NULL,
+                price REAL,
+                market_cap REAL,
+                gain_percent REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_row ON price_history(row_index, id)")
+
+        self._select_columns = ", ".join(f'"{header}"' for header in self.headers)
+
+    def _transaction(self, statement, rows):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany(statement, rows)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def insert_rows(self, records):
+        """Insert or replace full rows ({row_index: record}) in one transaction"""
+        if not records:
+            return
+        placeholders = ", ".join("?" for _ in self.headers)
+        statement = (f"INSERT OR REPLACE INTO signals (row_index, {self._select_columns}, _version, _synced_version) "
+                     f"VALUES (?, {placeholders}, 1, 0)")
+        rows = [(row_index, *[record.get(header, '') for header in self.headers])
+                for row_index, record in records.items()]
+        with self._lock:
+            self._transaction(statement, rows)
+
+    def update(self, row_index, fields):
+        """Write some fields of a row; returns False if the row doesn't exist"""
+        fields = {field: value for field, value in fields.items() if field in self.headers}
+        if not fields:
+            return False
+        assignments = ", ".join(f'"{field}" = ?' for field in fields)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE signals SET {assignments}, _version = _version + 1 WHERE row_index = ?",
+                (*fields.values(), row_index))
+        return cursor.rowcount > 0
+
+    def get(self, row_index):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {self._select_columns} FROM signals WHERE row_index = ?", (row_index,)).fetchone()
+        if row is None:
+            return None
+        record = dict(zip(self.headers, row))
+        record['row_index'] = row_index
+        return record
+
+    def all_records(self):
+        """Every row as a record dict carrying its 'row_index', in row order"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT row_index, {self._select_columns} FROM signals ORDER BY row_index").fetchall()
+        records = []
+        for row in rows:
+            record = dict(zip(self.headers, row[1:]))
+            record['row_index'] = row[0]
+            records.append(record)
+        return records
+
+    def max_row_index(self):
+        """Highest row index in use (1 = header only)"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(row_index), 1) FROM signals").fetchone()[0]
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM signals").fetchone()[0]
+
+    def unsynced_rows(self, limit):
+        """Up to `limit` changed rows as (row_index, values, version)"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT row_index, {self._select_columns}, _version FROM signals "
+                f"WHERE _version > _synced_version ORDER BY row_index LIMIT ?", (limit,)).fetchall()
+        return [(row[0], list(row[1:-1]), row[-1]) for row in rows]
+
+    def unsynced_count(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM signals WHERE _version > _synced_version").fetchone()[0]
+
+    def mark_synced(self, versions):
+        """Record projected versions ([(row_index, version)]); later writes stay unsynced"""
+        with self._lock:
+            self._transaction("UPDATE signals SET _synced_version = ? WHERE row_index = ?",
+                              [(version, row_index) for row_index, version in versions])
+
+    def mark_all_synced(self):
+        with self._lock:
+            self._conn.execute("UPDATE signals SET _synced_version = _version")
+
+    def add_history(self, row_index, price, market_cap, gain_percent):
+        """Append one price sample for a row"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO price_history (row_index, recorded_at, price, market_cap, gain_percent) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (row_index, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), price, market_cap, gain_percent))
+
+    def history(self, row_index, limit=100):
+        """Latest price samples for a row, oldest first, as (recorded_at, price, mc, gain)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT recorded_at, price, market_cap, gain_percent FROM price_history "
+                "WHERE row_index = ? ORDER BY id DESC LIMIT ?", (row_index, limit)).fetchall()
+        return rows[::-1]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LocalSignalsHandler(SheetsHandler):
+    """SheetsHandler with SQLite as the system of record
+
+    Appends and cell updates are committed to the local database and the
+    in-memory store; the Google Sheet is only a projection, refreshed every
+    SHEET_PROJECTION_INTERVAL seconds with the rows that changed. The bot keeps
+    running (local-only) when the sheet is unreachable or projection is off.
+    """
+
+    # Rows live in SQLite (status-indexed); the projection mirrors them by row index
+    supports_archiving = False
+    # The database is the system of record; hand edits to the projection aren't read back
+    store_sync_interval = 0
+
+    def __init__(self, db_path=LOCAL_DB_PATH, project_to_sheet=SHEET_PROJECTION_ENABLED):
+        try:
+            self.db = LocalSignalDB(db_path, self._get_expected_headers())
+            self.sheet = None
+            self._projection_running = False
+            self.projected_rows = 0
+            self.projection_errors = 0
+
+            if project_to_sheet:
+                try:
+                    self.sheet = self._open_sheet()
+                    self._ensure_headers()
+                except Exception as e:
+                    logger.error(f"Google Sheet unavailable, running local-only: {e}", exc_info=True)
+                    self.sheet = None
+
+            self._append_lock = threading.Lock()
+            self._layout_generation = 0
+            self.store = SignalStore()
+
+            # First run: take over the rows already in the sheet
+            if self.db.count() == 0 and self.sheet is not None:
+                self.import_from_sheet()
+
+            self.reconcile_store()
+            metrics.add_collector(self._collect_metrics)
+            logger.success(f"Local signal database ready ({db_path}, {self.db.count()} rows)")
+        except Exception as e:
+            logger.error(f"Failed to initialize local signal database: {e}", exc_info=True)
+            raise
+
+    def import_from_sheet(self):
+        """Copy every sheet row into the (empty) local database"""
+        records = call_blocking('sheets_read', self.sheet.get_all_records,
+                                expected_headers=self._get_expected_headers())
+        self.db.insert_rows({row_index: record for row_index, record in enumerate(records, start=2)})
+        self.db.mark_all_synced()
+        logger.info(f"📥 Imported {len(records)} rows from Google Sheets into {self.db.path}")
+
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
+    def append_signals(self, signals):
+        """Append several signals to the local database in one transaction
+
+        Returns the signal numbers in input order, or None for each signal if
+        the rows could not be written.
+        """
+        if not signals:
+            return []
+        try:
+            headers = self._get_expected_headers()
+            with self._append_lock:
+                first_row_index = self.db.max_row_index() + 1
+                rows = [self._build_row(first_row_index + offset - 1, data)
+                        for offset, data in enumerate(signals)]
+                records = {first_row_index + offset: dict(zip(headers, row)) for offset, row in enumerate(rows)}
+                self.db.insert_rows(records)
+                for row_index, record in records.items():
+                    self.store.add(row_index, record)
+
+            for offset, data in enumerate(signals):
+                logger.success(f"Signal saved to local row {first_row_index + offset}: {data.get('token_name')} ({data.get('ca', '')[:8]}...)")
+            if len(rows) > 1:
+                logger.info(f"🧾 {len(rows)} signals appended in one transaction (rows {first_row_index}-{first_row_index + len(rows) - 1})")
+            return [row[0] for row in rows]
+
+        except Exception as e:
+            logger.error(f"Error appending signal to local database: {e}", exc_info=True)
+            return [None] * len(signals)
+
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
+    def reconcile_store(self):
+        """Reload the in-memory store from the local database"""
+        self._last_reconcile_attempt = time.monotonic()
+        try:
+            with self._append_lock:
+                records = self.db.all_records()
+                self.store.load(records)
+            logger.debug(f"Signal store reconciled: {len(records)} rows")
+            return True
+        except Exception as e:
+            logger.error(f"Error reconciling signal store: {e}", exc_info=True)
+            return False
+
+    def _write_fields(self, row_index, fields):
+        """Commit fields to the local database and apply them to the store"""
+        self.db.update(row_index, fields)
+        self.store.update(row_index, fields)
+
+    def update_live_data(self, row_index, price, mc, gain_percent, update_count):
+        """Update realtime live data columns and record a price history sample"""
+        super().update_live_data(row_index, price, mc, gain_percent, update_count)
+        try:
+            self.db.add_history(row_index, price, mc, gain_percent)
+        except Exception as e:
+            logger.error(f"Error recording price history: {e}", exc_info=True)
+
+    def apply_changes(self, changes):
+        """Apply cell changes and record a price history sample for each live update"""
+        super().apply_changes(changes)
+        for row_index, fields in changes:
+            if 'current_mc_live' not in fields:
+                continue
+            try:
+                gain_percent = float(str(fields.get('current_gain_live', '0')).rstrip('%') or 0)
+                self.db.add_history(row_index, fields.get('current_price_live'), fields['current_mc_live'], gain_percent)
+            except Exception as e:
+                logger.error(f"Error recording price history: {e}", exc_info=True)
+    
+    def _read_cell(self, row_index, field):
+        """Read a cell value from the store, falling back to the local database"""
+        record = self.store.get(row_index) or self.db.get(row_index)
+        return record.get(field, '') if record is not None else ''
+
+    # ----- Google Sheet projection -----
+
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
+    def sync_projection(self):
+        """Push rows changed since the last sync to the Google Sheet (blocking)
+
+        Each changed row is written whole, so the sheet converges on the
+        database even after missed syncs. Returns the number of rows pushed.
+        """
+        if self.sheet is None:
+            return 0
+        headers = self._get_expected_headers()
+        rows_per_request = max(1, SHEETS_WRITE_MAX_BATCH // len(headers))
+        pushed = 0
+        while True:
+            rows = self.db.unsynced_rows(rows_per_request)
+            if not rows:
+                break
+            data = [{
+                'range': f"A{row_index}:{rowcol_to_a1(row_index, len(headers))}",
+                'values': [['' if value is None else value for value in values]]
+            } for row_index, values, _ in rows]
+            call_blocking('sheets_write', self.sheet.batch_update, data)
+            self.db.mark_synced([(row_index, version) for row_index, _, version in rows])
+            pushed += len(rows)
+            if len(rows) < rows_per_request:
+                break
+
+        self.projected_rows += pushed
+        if pushed:
+            logger.debug(f"Sheet projection synced {pushed} rows")
+        return pushed
+
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
+    def flush_writes(self):
+        """Sync the sheet projection now (blocking); returns False if it failed"""
+        try:
+            self.sync_projection()
+            return True
+        except Exception as e:
+            self.projection_errors += 1
+            logger.error(f"Error syncing sheet projection: {e}", exc_info=True)
+            return False
+
+    def request_flush(self):
+        """Writes are already durable locally; the projection keeps its own interval"""
+        return self._projection_running
+
+    async def run_write_flusher(self):
+        """Background task that syncs the sheet projection every interval"""
+        if self.sheet is None:
+            logger.info("📴 Sheet projection disabled - signals are kept in the local database only")
+            return
+        self._projection_running = True
+        try:
+            while True:
+                await asyncio.sleep(SHEET_PROJECTION_INTERVAL)
+                # Failed rows stay unsynced in the database; the next interval retries them
+                await asyncio.to_thread(self.flush_writes)
+        finally:
+            self._projection_running = False
+
+    def _collect_metrics(self):
+        STORAGE_ROWS.set(len(self.store))
+        UNSYNCED_ROWS.set(self.db.unsynced_count())
+    
+    def describe_storage(self):
+        """One-line storage status for the hourly report"""
+        text = f"Local SQLite ({self.db.path}), {self.db.count()} rows"
+        if self.sheet is None:
+            return text + ", no sheet projection"
+        return (f"{text}, {self.db.unsynced_count()} rows awaiting sheet sync, "
+                f"{self.projected_rows} projected, {self.projection_errors} sync errors")
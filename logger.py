@@ -1,17 +1,115 @@
+import atexit
+import gzip
 import logging
-import colorlog
-from datetime import datetime
 import os
+import queue
+import shutil
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import colorlog
+from config import (LOG_LEVEL, ENABLE_DEBUG_LOGS, LOG_FILE_MAX_BYTES, LOG_FILE_BACKUP_COUNT,
+                    LOG_COMPRESS_ROTATED)
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """Size-rotated log file whose rotated files are gzipped on a background thread
+
+    The rollover itself is only a rename; the writing thread waits for a
+    compression only if the previous one is still running at the next rollover.
+    """
+
+    def __init__(self, filename, max_bytes, backup_count, compress=True, encoding='utf-8'):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.compress = compress
+        self._compressors = []
+        if compress:
+            self.namer = lambda name: name + '.gz'
+            self.rotator = self._rotate_compressed
+
+    def _rotate_compressed(self, source, dest):
+        if not os.path.exists(source):
+            return
+        pending = dest[:-len('.gz')]
+        os.replace(source, pending)
+        thread = threading.Thread(target=self._compress, args=(pending, dest),
+                                  name='log-compress', daemon=True)
+        self._compressors.append(thread)
+        thread.start()
+
+    def doRollover(self):
+        # Let the previous compression land before the .gz backups are renamed
+        self._join_compressors()
+        super().doRollover()
+
+    @staticmethod
+    def _compress(source, dest):
+        try:
+            with open(source, 'rb') as src, gzip.open(dest + '.tmp', 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(dest + '.tmp', dest)
+            os.remove(source)
+        except OSError:
+            # Drop the backup rather than leave an uncompressed file that
+            # later rollovers never rename or delete
+            for path in (dest + '.tmp', source):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _join_compressors(self):
+        for thread in self._compressors:
+            thread.join()
+        self._compressors = []
+
+    def close(self):
+        super().close()
+        self._join_compressors()
+
+class RawQueueHandler(QueueHandler):
+    """QueueHandler that enqueues the record as it is
+
+    The stock prepare() formats the message (msg % args) and any traceback on
+    the calling thread; here the listener's handlers do all of that. Log
+    arguments must therefore not be mutated after the call.
+    """
+
+    def prepare(self, record):
+        return record
 
 class BotLogger:
-    def __init__(self, name="CryptoSignalBot", log_file="bot.log"):
+    """Bot logger whose handlers run on a background thread
+
+    Calls only put the record on a queue; console output, file writes and log
+    rotation happen in a QueueListener thread, so a slow disk never stalls the
+    event loop. Debug records are dropped before any formatting unless
+    LOG_LEVEL=DEBUG or ENABLE_DEBUG_LOGS is set.
+    """
+
+    def __init__(self, name="CryptoSignalBot"):
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(logging.DEBUG)
+        self.console_handler = None
+        self.file_handler = None
+        self._listener = None
+    
+    def setup(self, log_file="bot.log"):
+        """Attach the console and rotating file handlers and start the listener thread
+        
+        Nothing is written until this runs (only warnings reach stderr, through
+        logging's last-resort handler). Calling it again does nothing.
+        """
+        if self._listener is not None:
+            return self
         
         # Prevent duplicate handlers
         if self.logger.handlers:
             self.logger.handlers.clear()
         
+        console_level = getattr(logging, LOG_LEVEL, logging.INFO)
+        file_level = logging.DEBUG if ENABLE_DEBUG_LOGS or console_level <= logging.DEBUG else logging.INFO
+        file_level = min(file_level, console_level)
+        self.logger.setLevel(min(console_level, file_level))
+        self.logger.propagate = False
+        
         # Create formatters
         console_formatter = colorlog.ColoredFormatter(
             "%(log_color)s%(asctime)s | %(levelname)-8s | %(message)s%(reset)s",
@@ -31,19 +129,42 @@ class BotLogger:
         )
         
         # Console handler
-        console_handler = colorlog.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(console_formatter)
-        self.logger.addHandler(console_handler)
+        self.console_handler = colorlog.StreamHandler()
+        self.console_handler.setLevel(console_level)
+        self.console_handler.setFormatter(console_formatter)
         
-        # File handler
+        # File handler (rotated by size, old files compressed in the background)
         if not os.path.exists("logs"):
             os.makedirs("logs")
         
-        file_handler = logging.FileHandler(f"logs/{log_file}", encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(file_formatter)
-        self.logger.addHandler(file_handler)
+        self.file_handler = CompressingRotatingFileHandler(
+            f"logs/{log_file}", LOG_FILE_MAX_BYTES, LOG_FILE_BACKUP_COUNT, compress=LOG_COMPRESS_ROTATED)
+        self.file_handler.setLevel(file_level)
+        self.file_handler.setFormatter(file_formatter)
+        
+        # Records go through an unbounded queue (never blocks the caller) to the listener thread
+        self._queue = queue.SimpleQueue()
+        self.logger.addHandler(RawQueueHandler(self._queue))
+        self._listener = QueueListener(self._queue, self.console_handler, self.file_handler,
+                                       respect_handler_level=True)
+        self._listener.start()
+        atexit.register(self.close)
+        return self
+    
+    @property
+    def debug_enabled(self):
+        """True when debug records are kept; guard costly debug arguments with it"""
+        return self.logger.isEnabledFor(logging.DEBUG)
+    
+    def close(self):
+        """Write out every queued record, then close the handlers"""
+        if self._listener is None:
+            return
+        self._listener.stop()
+        self._listener = None
+        self.logger.handlers.clear()
+        self.console_handler.close()
+        self.file_handler.close()
     
     def info(self, message, emoji="ℹ️"):
         self.logger.info(f"{emoji} {message}")
@@ -57,8 +178,10 @@ class BotLogger:
     def error(self, message, emoji="❌", exc_info=False):
         self.logger.error(f"{emoji} {message}", exc_info=exc_info)
     
-    def debug(self, message, emoji="🔍"):
-        self.logger.debug(f"{emoji} {message}")
+    def debug(self, message, *args, emoji="🔍"):
+        """Debug log; %-style args are only formatted if debug logging is on"""
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"{emoji} {message}", *args)
     
     def heartbeat(self, message="Bot is alive"):
         self.logger.info(f"💓 {message}")
@@ -81,5 +204,9 @@ class BotLogger:
     def stopped_tracking(self, token_name):
         self.logger.info(f"⏹️ Stopped tracking: {token_name}")
 
-# Create global logger instance
+def setup_logging(log_file="bot.log"):
+    """Start console and logs/<log_file> output; call once at startup, before logging"""
+    return logger.setup(log_file)
+
+# Global logger instance (no handlers until setup_logging())
 logger = BotLogger()
\ No newline at end of file
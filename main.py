@@ -1,64 +1,67 @@
 import asyncio
+import os
+import time
 from telethon import TelegramClient, events
-from config import TELEGRAM_API_ID, TELEGRAM_API_HASH, TELEGRAM_PHONE, CHANNEL_IDS
-from signal_parser import parse_new_signal, parse_alert_update, is_signal_message, is_alert_message
+from config import (TELEGRAM_API_ID, TELEGRAM_API_HASH, TELEGRAM_PHONE, CHANNEL_IDS, SIGNAL_ENRICHMENT_MODE,
+                    STORAGE_BACKEND)
 from sheets_handler import SheetsHandler
+from local_backend import LocalSignalsHandler
 from price_tracker import PriceTracker
-from logger import logger
+from sheet_archiver import SheetArchiver
+from logger import logger, setup_logging
+from http_client import close_http_client
+from rate_limiter import all_buckets
+from price_cache import get_price_cache
+from ingestion_pipeline import IngestionPipeline
+from tick_history import get_tick_history
+from metrics import metrics, start_metrics_server, dump_metrics_loop, monitor_event_loop
+from profiling import profiler
 
-# Initialize handlers
-sheets_handler = SheetsHandler()
-price_tracker = PriceTracker(sheets_handler)
+STARTUP_SECONDS = metrics.gauge('startup_seconds', 'Seconds from start of main() to each startup milestone')
 
-# Initialize Telethon client
-client = TelegramClient('crypto_signal_session', TELEGRAM_API_ID, TELEGRAM_API_HASH)
+def create_storage():
+    """Open the signal storage and load its initial state (blocking: auth, open, headers, first read)"""
+    # local: SQLite is the system of record, the sheet a synced projection
+    return LocalSignalsHandler() if STORAGE_BACKEND == 'local' else SheetsHandler()
 
-@client.on(events.NewMessage(chats=CHANNEL_IDS))
-async def handle_new_message(event):
-    """Handle incoming messages from tracked channels"""
-    try:
-        message_text = event.message.message
-        channel_id = event.chat_id
-        message_id = event.message.id
-        reply_to_message_id = event.message.reply_to_msg_id
-        
-        # Get channel name
-        chat = await event.get_chat()
-        channel_name = chat.title if hasattr(chat, 'title') else str(channel_id)
-        
-        logger.debug(f"Message received from {channel_name}: {message_text[:100]}...")
-        logger.debug(f"Message ID: {message_id}, Reply to: {reply_to_message_id}")
-        
-        # Check if it's an alert update (and it's a reply)
-        if is_alert_message(message_text):
-            alert_data = parse_alert_update(message_text)
-            if alert_data:
-                if reply_to_message_id:
-                    # Update existing signal row using reply_to_message_id
-                    sheets_handler.update_alert_from_message(reply_to_message_id, alert_data)
-                    logger.alert_triggered(f"{alert_data.get('multiplier')}x", alert_data.get('token_name', 'Unknown'))
-                elif alert_data.get('ca'):
-                    # Fallback: use CA if no reply
-                    sheets_handler.update_alert_from_message(None, alert_data)
-                    logger.alert_triggered(f"{alert_data.get('multiplier')}x", alert_data.get('ca', '')[:8])
-                else:
-                    logger.warning(f"Alert message without reply_to or CA from {channel_name}")
-            else:
-                logger.warning(f"Failed to parse alert from {channel_name}")
-        
-        # Check if it's a new signal
-        elif is_signal_message(message_text):
-            signal_data = parse_new_signal(message_text, channel_id, channel_name, message_id)
-            if signal_data:
-                sheets_handler.append_signal(signal_data)
-                logger.signal_received(signal_data.get('token_name', 'Unknown'), channel_name)
-            else:
-                logger.warning(f"Failed to parse signal from {channel_name}")
-    
-    except Exception as e:
-        logger.error(f"Error handling message from {channel_name if 'channel_name' in locals() else 'Unknown'}: {e}", exc_info=True)
+def create_client(pipeline):
+    """Telethon client whose message handler only enqueues into the ingestion pipeline"""
+    client = TelegramClient('crypto_signal_session', TELEGRAM_API_ID, TELEGRAM_API_HASH)
+
+    async def handle_new_message(event):
+        """Handle incoming messages from tracked channels (enqueue only, never blocks on I/O)"""
+        try:
+            await pipeline.submit(event)
+        except Exception as e:
+            logger.error(f"Error queueing message from {event.chat_id}: {e}", exc_info=True)
+
+    client.add_event_handler(handle_new_message, events.NewMessage(chats=CHANNEL_IDS))
+    return client
 
-async def heartbeat_loop():
+def record_startup(milestone, started):
+    """Log and export the seconds since started for one startup milestone"""
+    elapsed = time.monotonic() - started
+    STARTUP_SECONDS.set(round(elapsed, 3), milestone=milestone)
+    return elapsed
+
+async def connect_telegram(client, started):
+    await client.start(phone=TELEGRAM_PHONE)
+    logger.success(f"Telegram client connected ({record_startup('telegram_connected', started):.1f}s)")
+
+async def open_storage(started):
+    sheets_handler = await asyncio.to_thread(create_storage)
+    logger.success(f"Storage ready ({record_startup('storage_ready', started):.1f}s)")
+    return sheets_handler
+
+async def report_first_message(pipeline, started):
+    """Log time-to-first-message-handled once the first signal or alert is written"""
+    await pipeline.first_received.wait()
+    received = record_startup('first_message_received', started)
+    await pipeline.first_handled.wait()
+    handled = record_startup('first_message_handled', started)
+    logger.info(f"⏱️ First message handled {handled:.1f}s after start (received at {received:.1f}s)")
+
+async def heartbeat_loop(sheets_handler, pipeline, archiver):
     """Send periodic heartbeat to show bot is alive"""
     heartbeat_counter = 0
     while True:
@@ -66,7 +69,7 @@ async def heartbeat_loop():
             await asyncio.sleep(300)  # 5 minutes
             heartbeat_counter += 1
             
-            # Get some stats
+            # Get some stats (served from the in-memory signal store, no sheet read)
             active_signals = sheets_handler.get_active_signals()
             active_count = len(active_signals)
             
@@ -78,6 +81,15 @@ async def heartbeat_loop():
                 logger.info(f"   • Active signals: {active_count}")
                 logger.info(f"   • Monitored channels: {len(CHANNEL_IDS)}")
                 logger.info(f"   • Bot uptime: {heartbeat_counter * 5} minutes")
+                for bucket in all_buckets():
+                    logger.info(f"   • Rate limit {bucket.summary()}")
+                logger.info(f"   • Price cache: {get_price_cache().summary()}")
+                logger.info(f"   • Ingestion: {pipeline.summary()}")
+                logger.info(f"   • Storage: {sheets_handler.describe_storage()}")
+                tick_history = get_tick_history()
+                tick_history.prune()
+                logger.info(f"   • Tick history: {tick_history.summary()}")
+                logger.info(f"   • Archive: {archiver.summary()}")
                 
         except Exception as e:
             logger.error(f"Error in heartbeat loop: {e}", exc_info=True)
@@ -85,23 +97,60 @@ async def heartbeat_loop():
 
 async def main():
     """Main entry point"""
+    started = time.monotonic()
+    setup_logging()
     logger.startup("Starting Crypto Signal Tracker...")
     
+    # Staged ingestion: handler -> parser workers -> single sheet writer.
+    # Writes wait for storage, so messages arriving during startup are parsed and queued.
+    pipeline = IngestionPipeline()
+    client = create_client(pipeline)
+    sheets_handler = None
+    
     try:
-        # Start Telegram client
-        await client.start(phone=TELEGRAM_PHONE)
-        logger.success("Telegram client connected")
+        # Start parser workers and the sheet writer stage
+        pipeline.start()
+        asyncio.create_task(report_first_message(pipeline, started))
+        logger.success("Ingestion pipeline started")
+        
+        # Telegram connect and storage setup (auth, open, initial state load) run concurrently
+        sheets_handler, _ = await asyncio.gather(open_storage(started), connect_telegram(client, started))
+        pipeline.attach_storage(sheets_handler)
+        price_tracker = PriceTracker(sheets_handler)
+        archiver = SheetArchiver(sheets_handler, price_tracker)
+        
+        # Start coalescing sheet writer (one batch request per flush window)
+        asyncio.create_task(sheets_handler.run_write_flusher())
+        logger.success("Sheet write buffer started")
         
         # Start price tracking loop
         asyncio.create_task(price_tracker.track_prices())
         logger.success("Price tracker started")
         
+        # Move finished rows out of the hot sheet in the background
+        asyncio.create_task(archiver.run())
+        
         # Start heartbeat loop
-        asyncio.create_task(heartbeat_loop())
+        asyncio.create_task(heartbeat_loop(sheets_handler, pipeline, archiver))
         logger.success("Heartbeat monitor started")
         
+        # Metrics: event-loop lag probe, HTTP endpoint and optional JSON dump
+        asyncio.create_task(monitor_event_loop())
+        try:
+            await start_metrics_server()
+        except OSError as e:
+            logger.error(f"Metrics endpoint could not start: {e}")
+        asyncio.create_task(dump_metrics_loop())
+        
+        # Stage profiling: SIGUSR1 toggles, SIGUSR2 reports, periodic top-N while on
+        if profiler.install_signal_handlers(asyncio.get_running_loop()):
+            logger.info(f"🔬 Profiling {'on' if profiler.enabled else 'off'} (kill -USR1 {os.getpid()} to toggle)")
+        asyncio.create_task(profiler.report_loop())
+        
+        logger.info(f"🔍 Signal enrichment mode: {SIGNAL_ENRICHMENT_MODE}")
+        logger.info(f"🗄️ Storage: {sheets_handler.describe_storage()}")
         logger.info(f"� Listening to {len(CHANNEL_IDS)} channels...")
-        logger.info("🤖 Bot is now fully operational!")
+        logger.info(f"🤖 Bot is now fully operational! ({record_startup('operational', started):.1f}s)")
         
         # Keep running
         await client.run_until_disconnected()
@@ -111,6 +160,14 @@ async def main():
     except Exception as e:
         logger.error(f"Critical error in main: {e}", exc_info=True)
     finally:
+        # Don't lose queued messages or buffered cell writes on shutdown
+        await pipeline.close()
+        if sheets_handler is not None:
+            sheets_handler.flush_writes()
+        get_tick_history().close()
+        if profiler.enabled:
+            profiler.report()
+        await close_http_client()
         logger.info("👋 Bot shutting down...")
 
 if __name__ == '__main__':
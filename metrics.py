@@ -0,0 +1,271 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from functools import wraps
+from config import METRICS_HOST, METRICS_PORT, METRICS_JSON_PATH, METRICS_JSON_INTERVAL
+from logger import logger
+
+# Seconds; covers a parse (~50us) up to a rate-limited Sheets call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + (extra or [])
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base for a named metric with one series per label set"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._series = {}  # label key -> value
+        self._lock = threading.Lock()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+    def snapshot(self):
+        with self._lock:
+            return [{'labels': dict(key), 'value': value} for key, value in sorted(self._series.items())]
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Point-in-time value, usually set by a collector right before a scrape"""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._series[_label_key(labels)] = value
+
+    def clear(self):
+        with self._lock:
+            self._series = {}
+
+
+class Histogram(Metric):
+    """Latency distribution with cumulative buckets (Prometheus semantics)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def timed(self, func):
+        """Decorator: observe each call's duration, labelled method=<function name>"""
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.observe(time.perf_counter() - start, method=func.__name__)
+        return wrapper
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series['counts']):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', _format_value(float(bound)))])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series['sum']!r}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+    def snapshot(self):
+        with self._lock:
+            result = []
+            for key, series in sorted(self._series.items()):
+                result.append({
+                    'labels': dict(key),
+                    'count': series['count'],
+                    'sum': round(series['sum'], 6),
+                    'p50': self._quantile(series, 0.5),
+                    'p99': self._quantile(series, 0.99)
+                })
+            return result
+
+    def _quantile(self, series, q):
+        """Upper bucket bound containing the q-quantile (None when empty or beyond the last bucket)"""
+        if not series['count']:
+            return None
+        rank = q * series['count']
+        cumulative = 0
+        for bound, count in zip(self.buckets, series['counts']):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return None
+
+
+class MetricsRegistry:
+    """All bot metrics, plus collectors that refresh gauges before each export"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text):
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name, help_text):
+        return self._register(Gauge(name, help_text))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, buckets))
+
+    def export_stats(self, prefix, stats, **labels):
+        """Mirror the numeric values of a component's stats() dict as <prefix>_<key> gauges"""
+        for key, value in stats.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            self.gauge(f"{prefix}_{key}", f"{prefix.replace('_', ' ')} {key.replace('_', ' ')}").set(value, **labels)
+
+    def add_collector(self, callback):
+        """Register callback() that sets gauges; called before every export"""
+        self._collectors.append(callback)
+
+    def collect(self):
+        for callback in list(self._collectors):
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error in metrics collector {getattr(callback, '__qualname__', callback)}: {e}", exc_info=True)
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        self.collect()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """All metrics as a JSON-serializable dict"""
+        self.collect()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            'timestamp': time.time(),
+            'metrics': {metric.name: {'type': metric.kind, 'series': metric.snapshot()} for metric in metrics}
+        }
+
+
+# Global instance
+metrics = MetricsRegistry()
+
+# Shared metrics (component-specific ones live next to the code they measure)
+EVENT_LOOP_LAG = metrics.histogram('event_loop_lag_seconds', 'How late the event loop ran a scheduled wakeup')
+
+
+async def monitor_event_loop(interval=1.0):
+    """Measure event-loop lag: how much later than requested a sleep returns"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+
+
+async def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Serve /metrics (Prometheus text) and /metrics.json; returns the runner, or None if disabled"""
+    if not port:
+        return None
+    from aiohttp import web
+
+    async def prometheus_handler(request):
+        return web.Response(text=metrics.render_prometheus(), content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Type-Options': 'nosniff'})
+
+    async def json_handler(request):
+        return web.json_response(metrics.snapshot())
+
+    app = web.Application()
+    app.router.add_get('/metrics', prometheus_handler)
+    app.router.add_get('/metrics.json', json_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"📈 Metrics endpoint on http://{host}:{port}/metrics")
+    return runner
+
+
+async def dump_metrics_loop(path=METRICS_JSON_PATH, interval=METRICS_JSON_INTERVAL):
+    """Periodically write metrics.snapshot() to a JSON file (atomically replaced)"""
+    if not path:
+        return
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            snapshot = metrics.snapshot()
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.error(f"Error writing metrics dump: {e}", exc_info=True)
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from config import PRICE_CACHE_TTL, PRICE_CACHE_MAX_SIZE
+from metrics import metrics
+
+# In-flight result for a CA whose request failed (as opposed to None: no trading pairs)
+_FAILED = object()
+
+
+class PriceCache:
+    """Short-lived per-CA price cache with single-flight request coalescing
+
+    Entries expire after `ttl` seconds and the least recently used CA is evicted
+    once `max_size` is reached. While a CA is being fetched, other lookups for it
+    await the same in-flight future instead of sending their own request.
+    """
+
+    def __init__(self, ttl=PRICE_CACHE_TTL, max_size=PRICE_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self._entries = OrderedDict()  # ca -> (expires_at, price_data)
+        self._inflight = {}  # ca -> asyncio.Future shared by concurrent lookups
+        self._lock = threading.Lock()
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # lookups served by another caller's in-flight request
+        self.evictions = 0
+
+    def get(self, ca):
+        """Return fresh cached price data for a CA, or None"""
+        with self._lock:
+            entry = self._entries.get(ca)
+            if entry is None:
+                return None
+            expires_at, price_data = entry
+            if expires_at <= time.monotonic():
+                del self._entries[ca]
+                return None
+            self._entries.move_to_end(ca)
+            return price_data
+
+    def put(self, ca, price_data):
+        """Store price data for a CA (failed lookups are not cached)"""
+        if not self.ttl or price_data is None:
+            return
+        with self._lock:
+            self._entries[ca] = (time.monotonic() + self.ttl, price_data)
+            self._entries.move_to_end(ca)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def get_many(self, cas, fetcher):
+        """Resolve {ca: price_data or None} from cache, in-flight requests, or one fetcher call
+
+        CAs the fetcher left out (failed requests) are left out of the result too.
+
+        Args:
+            cas: Unique contract addresses to look up
+            fetcher: async callable taking a list of CAs and returning {ca: price_data}
+        """
+        loop = asyncio.get_running_loop()
+        results = {}
+        waiting = {}  # ca -> future owned by another caller
+        owned = {}  # ca -> future this call must resolve
+
+        for ca in cas:
+            cached = self.get(ca)
+            if cached is not None:
+                self.hits += 1
+                results[ca] = cached
+            elif ca in self._inflight:
+                self.coalesced += 1
+                waiting[ca] = self._inflight[ca]
+            else:
+                self.misses += 1
+                future = loop.create_future()
+                self._inflight[ca] = future
+                owned[ca] = future
+
+        if owned:
+            fetched = {}
+            try:
+                fetched = await fetcher(list(owned))
+            finally:
+                # Resolve every owned future, even on error/cancel, so waiters never hang
+                for ca, future in owned.items():
+                    price_data = fetched.get(ca, _FAILED)
+                    if price_data is not _FAILED:
+                        self.put(ca, price_data)
+                    if not future.done():
+                        future.set_result(price_data)
+                    if self._inflight.get(ca) is future:
+                        del self._inflight[ca]
+            for ca in owned:
+                if ca in fetched:
+                    results[ca] = fetched[ca]
+
+        for ca, future in waiting.items():
+            price_data = await asyncio.shield(future)
+            if price_data is not _FAILED:
+                results[ca] = price_data
+
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            'size': len(self),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'inflight': len(self._inflight),
+            'hit_rate': round(self.hit_rate(), 4)
+        }
+
+    def summary(self):
+        return (f"{len(self)}/{self.max_size} CAs cached, {self.hits} hits, {self.misses} misses, "
+                f"{self.coalesced} coalesced ({self.hit_rate() * 100:.1f}% hit rate)")
+
+
+# Global price cache, shared by the tracker and the parser; created on first use
+_price_cache = None
+_price_cache_lock = threading.Lock()
+
+
+def get_price_cache():
+    """The shared PriceCache (its stats are exported as metrics from then on)"""
+    global _price_cache
+    with _price_cache_lock:
+        if _price_cache is None:
+            _price_cache = PriceCache()
+            metrics.add_collector(lambda: metrics.export_stats('price_cache', _price_cache.stats()))
+        return _price_cache
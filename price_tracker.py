@@ -1,75 +1,262 @@
-import requests
 import asyncio
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
-from config import (DEXSCREENER_API_BASE, TRACKING_INTERVALS, ALERT_MULTIPLIERS,
-                    SMART_POLLING_INTERVALS, HOT_GAIN_THRESHOLD, TRACKING_DURATION)
+from config import (TRACKING_INTERVALS, ALERT_MULTIPLIERS, DEXSCREENER_BATCH_SIZE,
+                    SMART_POLLING_INTERVALS, HOT_GAIN_THRESHOLD, TRACKING_DURATION,
+                    TRACKER_CONCURRENCY, TRACKER_DEADLINE_GRACE)
 from logger import logger
+import dexscreener_api
+from signal_scheduler import SignalScheduler
+from tick_history import get_tick_history
+from metrics import metrics
+from profiling import profiler
+from batch_evaluator import evaluate_live_updates, clean_numeric_value
+
+SCHEDULE_LAG_SECONDS = metrics.histogram('tracker_schedule_lag_seconds', 'How late due signals start processing, per polling tier')
+DEADLINE_MISSES = metrics.counter('tracker_deadline_misses_total', 'Due signals started later than TRACKER_DEADLINE_GRACE, per polling tier')
+ACTIVE_SIGNALS = metrics.gauge('tracker_active_signals', 'Active signals per smart polling tier')
+TICK_SECONDS = metrics.histogram('tracker_tick_seconds', 'Duration of one tracker tick (fetch + evaluate + intervals)')
 
 class PriceTracker:
     def __init__(self, sheets_handler):
         self.sheets = sheets_handler
         self.last_heartbeat = datetime.now()
-        self.signal_last_update = {}  # Track last update time per signal
-    
-    @staticmethod
-    def clean_numeric_value(value):
-        """Clean and convert numeric value from sheets (handles $, commas, etc)"""
-        if value is None or value == '':
-            return 0.0
-        
-        # If already a number, return it
-        if isinstance(value, (int, float)):
-            return float(value)
+        self.scheduler = SignalScheduler()  # Next-due time per (row_index, ca)
+        self._scheduled_version = None
         
-        # If string, clean it
-        if isinstance(value, str):
-            # Remove $, commas, spaces, and other non-numeric chars (except . and -)
-            cleaned = value.replace('$', '').replace(',', '').replace(' ', '').strip()
-            if cleaned == '' or cleaned == '-':
-                return 0.0
-            try:
-                return float(cleaned)
-            except ValueError:
-                return 0.0
-        
-        return 0.0
+        # Ticks (one bulk price fetch plus evaluation each) run in the background, at most
+        # TRACKER_CONCURRENCY at once; a (row_index, ca) key is never in two ticks at once
+        self.max_ticks = max(1, TRACKER_CONCURRENCY)
+        self._in_flight = set()
+        self._tick_tasks = set()
+        self._ticks_held = False  # set while row indexes are being remapped
+        self.processed_count = 0
+        self.deadline_misses = 0
+        metrics.add_collector(self._collect_metrics)
+    
+    # Sheet values may be strings like '$1,234'; shared with the batch evaluator
+    clean_numeric_value = staticmethod(clean_numeric_value)
     
     async def track_prices(self):
-        """Main tracking loop with smart polling"""
-        logger.info("🔄 Price tracking loop started with SMART POLLING")
+        """Main tracking loop: sleep until the earliest signal deadline, then process only due signals"""
+        logger.info("🔄 Price tracking loop started with SMART POLLING (deadline scheduler)")
+        
+        # New signals and status changes wake the loop immediately
+        self.sheets.on_signals_changed(self.scheduler.wake)
+        logger.info(f"⚙️ Tracker concurrency: {self.max_ticks} ticks (bulk price fetches) at a time")
         
         while True:
             try:
-                active_signals = self.sheets.get_active_signals()
+                # Active signals come from the in-memory store; re-read the sheet only occasionally
+                if self.sheets.seconds_until_reconcile() <= 0:
+                    await asyncio.to_thread(self.sheets.maybe_reconcile_store)
+                # While ticks are held the store and the schedule may be mid-remap
+                if not self._ticks_held:
+                    self.sync_schedule()
                 
-                if active_signals:
-                    logger.debug(f"Processing {len(active_signals)} active signals...")
-                    
-                    for signal in active_signals:
-                        await self.process_signal_smart(signal)
-                        await asyncio.sleep(0.5)  # Small delay between signals
-                else:
-                    logger.debug("No active signals to track")
+                can_start = not self._ticks_held and len(self._tick_tasks) < self.max_ticks
+                due_signals = self.collect_due_signals() if can_start else []
+                if due_signals:
+                    logger.debug("Processing %d due signals (%d scheduled, %d in flight)...",
+                                 len(due_signals), len(self.scheduler), len(self._in_flight))
+                    # Run the tick in the background so later deadlines are served while it works
+                    task = asyncio.create_task(self.run_tick(due_signals))
+                    self._tick_tasks.add(task)
+                    task.add_done_callback(self._tick_done)
                 
                 # Heartbeat every 10 minutes in price tracker
                 now = datetime.now()
                 if (now - self.last_heartbeat).total_seconds() > 600:
-                    logger.debug(f"Price tracker heartbeat - processed {len(active_signals)} signals")
+                    logger.debug("Price tracker heartbeat - processed %d signal updates, "
+                                 "%d missed deadlines, %d scheduled",
+                                 self.processed_count, self.deadline_misses, len(self.scheduler))
                     self.last_heartbeat = now
                 
-                # Check every 10 seconds for new signals to update
-                await asyncio.sleep(10)
+                # Sleep exactly until the next deadline (or a new signal / reconcile); with every
+                # tick slot busy, due signals wait for a tick to finish (which wakes the scheduler)
+                can_start = not self._ticks_held and len(self._tick_tasks) < self.max_ticks
+                await self.scheduler.wait(max_sleep=self.sheets.seconds_until_reconcile(), deadlines=can_start)
                 
             except Exception as e:
                 logger.error(f"Error in tracking loop: {e}", exc_info=True)
                 await asyncio.sleep(60)
     
+    def _tick_done(self, task):
+        self._tick_tasks.discard(task)
+        # A tick slot is free again: start signals that came due meanwhile
+        self.scheduler.wake()
+    
+    def sync_schedule(self):
+        """Add newly active signals (due now) and drop inactive ones from the scheduler"""
+        version = self.sheets.signals_version()
+        if version == self._scheduled_version:
+            return
+        self._scheduled_version = version
+        
+        active_keys = {
+            (signal['row_index'], signal.get('ca', ''))
+            for signal in self.sheets.get_active_signals()
+        }
+        scheduled_keys = self.scheduler.keys()
+        now = time.monotonic()
+        
+        # Keys being processed right now are rescheduled when they finish
+        for key in active_keys - scheduled_keys - self._in_flight:
+            self.scheduler.schedule(key, now)
+        for key in scheduled_keys - active_keys:
+            self.scheduler.remove(key)
+    
+    @asynccontextmanager
+    async def hold_ticks(self):
+        """Start no new ticks and wait for running ones, so no signal dict with an old
+        row index is in flight (used while archived rows are removed from the sheet)"""
+        self._ticks_held = True
+        try:
+            while self._tick_tasks:
+                await asyncio.wait(set(self._tick_tasks))
+            yield
+        finally:
+            self._ticks_held = False
+            self.scheduler.wake()
+    
+    def remap_rows(self, mapping):
+        """Move scheduled deadlines to new row indexes ({old_row: new_row})"""
+        self.scheduler.rekey({
+            (row_index, ca): (mapping[row_index], ca)
+            for row_index, ca in self.scheduler.keys() if row_index in mapping
+        })
+        self._scheduled_version = None
+    
+    @profiler.profiled()
+    def collect_due_signals(self):
+        """Pop every signal whose deadline has passed -> [(signal, elapsed_minutes, due_at)]"""
+        due_signals = []
+        
+        for (row_index, ca), due_at in self.scheduler.pop_due():
+            if (row_index, ca) in self._in_flight:
+                continue  # Still being processed; rescheduled when it finishes
+            
+            signal = self.sheets.get_signal(row_index)
+            if not signal or signal.get('current_status') != 'active' or signal.get('ca', '') != ca:
+                continue  # Row changed since it was scheduled
+            
+            elapsed_minutes = self.check_signal_expiry(signal)
+            if elapsed_minutes is None:
+                self.reschedule(signal)
+                continue
+            
+            self._in_flight.add((row_index, ca))
+            due_signals.append((signal, elapsed_minutes, due_at))
+        
+        return due_signals
+    
+    @profiler.profiled()
+    async def run_tick(self, due_signals):
+        """Bulk-fetch prices for the due signals, apply them and reschedule the signals"""
+        tick_start = time.perf_counter()
+        try:
+            # One bulk request per 30 CAs instead of one request per signal
+            prices = await self.fetch_dexscreener_prices(
+                [signal.get('ca', '') for signal, _, _ in due_signals])
+        except Exception as e:
+            logger.error(f"Error fetching prices for tick: {e}", exc_info=True)
+            prices = {}
+        
+        # Live price, milestones, ATH, peak and alerts for the whole tick in one pass
+        await self.update_live_prices(
+            [(signal, prices.get(signal.get('ca', ''))) for signal, _, _ in due_signals])
+        
+        # Valid CAs missing from prices had a failed request: retried next tick, never "no pairs".
+        # Invalid CAs are never fetched, so they still go through (and get marked invalid_ca).
+        missed = await asyncio.gather(*(
+            self._process_slot(signal, elapsed_minutes, due_at, prices.get(signal.get('ca', '')),
+                               fetched=signal.get('ca', '') in prices or len(signal.get('ca', '')) < 32)
+            for signal, elapsed_minutes, due_at in due_signals
+        ))
+        
+        TICK_SECONDS.observe(time.perf_counter() - tick_start)
+        missed_count = sum(missed)
+        if missed_count:
+            logger.warning(f"{missed_count}/{len(due_signals)} due signals missed their deadline by more than {TRACKER_DEADLINE_GRACE}s")
+        
+        # Send this tick's cell changes as a single batch
+        self.sheets.request_flush()
+    
+    async def _process_slot(self, signal, elapsed_minutes, due_at, price_data, fetched=True):
+        """Apply the tick's price to one due signal's intervals; returns True on a missed deadline"""
+        key = (signal['row_index'], signal.get('ca', ''))
+        missed = False
+        # Attribute profiled stages below to this signal
+        profile_token = profiler.set_signal(signal['row_index'])
+        try:
+            lateness = time.monotonic() - due_at
+            tier = self.get_polling_tier(signal)
+            SCHEDULE_LAG_SECONDS.observe(max(0.0, lateness), tier=tier)
+            if lateness > TRACKER_DEADLINE_GRACE:
+                missed = True
+                self.deadline_misses += 1
+                DEADLINE_MISSES.inc(tier=tier)
+            
+            # Live data was already applied for the whole tick
+            if fetched:
+                await self.process_traditional_intervals(
+                    signal, signal['row_index'], signal.get('ca', ''), elapsed_minutes, price_data)
+            self.processed_count += 1
+        finally:
+            self._in_flight.discard(key)
+            self.reschedule(signal)
+            profiler.reset_signal(profile_token)
+        return missed
+    
+    def _collect_metrics(self):
+        tiers = dict.fromkeys(SMART_POLLING_INTERVALS, 0)
+        for signal in self.sheets.get_active_signals():
+            tiers[self.get_polling_tier(signal)] += 1
+        for tier, count in tiers.items():
+            ACTIVE_SIGNALS.set(count, tier=tier)
+        metrics.export_stats('tracker', {
+            'scheduled': len(self.scheduler),
+            'in_flight': len(self._in_flight),
+            'processed': self.processed_count
+        })
+    
+    def reschedule(self, signal):
+        """Schedule the next update of a signal from its (freshly updated) smart interval"""
+        row_index = signal['row_index']
+        current = self.sheets.get_signal(row_index) or signal
+        if current.get('current_status') != 'active':
+            return
+        
+        now = time.monotonic()
+        next_due = now + self.get_smart_interval(current)
+        
+        # Don't oversleep past the end of the tracking window
+        elapsed_minutes = self.get_elapsed_minutes(current)
+        if elapsed_minutes is not None:
+            next_due = min(next_due, now + (TRACKING_DURATION - elapsed_minutes) * 60 + 1)
+        
+        self.scheduler.schedule((row_index, current.get('ca', '')), next_due)
+    
+    @staticmethod
+    def get_elapsed_minutes(signal):
+        """Minutes since the signal was received, or None without a valid timestamp"""
+        try:
+            timestamp = datetime.strptime(signal.get('timestamp_received', ''), '%Y-%m-%d %H:%M:%S')
+        except (TypeError, ValueError):
+            return None
+        return (datetime.now() - timestamp).total_seconds() / 60
+    
     def get_smart_interval(self, signal):
         """Calculate dynamic update interval based on signal age and performance"""
+        return SMART_POLLING_INTERVALS[self.get_polling_tier(signal)]
+    
+    def get_polling_tier(self, signal):
+        """Smart polling tier (a SMART_POLLING_INTERVALS key) from signal age and performance"""
         try:
             timestamp_str = signal.get('timestamp_received', '')
             if not timestamp_str:
-                return SMART_POLLING_INTERVALS['normal']
+                return 'normal'
             
             timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
             age_minutes = (datetime.now() - timestamp).total_seconds() / 60
@@ -83,73 +270,68 @@ class PriceTracker:
             else:
                 gain_percent = 0
             
-            # Determine interval based on age and performance
+            # Determine tier based on age and performance
             if age_minutes < 5:
                 # Fresh signal (0-5 min): aggressive 30 seconds
-                return SMART_POLLING_INTERVALS['fresh']
+                return 'fresh'
             elif age_minutes < 60 or gain_percent > HOT_GAIN_THRESHOLD:
                 # Hot signal (<1 hour OR pumping >20%): every 1 minute
-                return SMART_POLLING_INTERVALS['hot']
+                return 'hot'
             elif age_minutes < 1440:  # < 24 hours
                 # Normal signal: every 5 minutes
-                return SMART_POLLING_INTERVALS['normal']
+                return 'normal'
             elif age_minutes < 2880:  # < 2 days
                 # Mature signal: every 15 minutes
-                return SMART_POLLING_INTERVALS['mature']
+                return 'mature'
             else:
                 # Old signal (2-3 days): every 30 minutes
-                return SMART_POLLING_INTERVALS['old']
+                return 'old'
         
         except Exception as e:
-            logger.debug(f"Error calculating smart interval: {e}")
-            return SMART_POLLING_INTERVALS['normal']
+            logger.debug(f"Error calculating polling tier: {e}")
+            return 'normal'
+    
+    def check_signal_expiry(self, signal):
+        """Return elapsed minutes if the signal should still be tracked, else None
+        
+        Signals past TRACKING_DURATION are marked 'stopped' here.
+        """
+        row_index = signal['row_index']
+        ca = signal.get('ca', '')
+        token_name = signal.get('token_name', 'Unknown')
+        
+        if not ca:
+            logger.warning(f"No CA found for signal: {token_name}")
+            return None
+        
+        # Check if tracking duration exceeded (3 days)
+        timestamp_str = signal.get('timestamp_received', '')
+        if not timestamp_str:
+            logger.warning(f"No timestamp for signal: {token_name}")
+            return None
+        
+        timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
+        elapsed_minutes = (datetime.now() - timestamp).total_seconds() / 60
+        
+        if elapsed_minutes > TRACKING_DURATION:
+            self.sheets.update_status(row_index, 'stopped')
+            logger.stopped_tracking(token_name)
+            return None
+        
+        return elapsed_minutes
     
     async def process_signal_smart(self, signal):
-        """Process signal with smart polling intervals"""
+        """Process one signal right away, outside the scheduler (fetches its own price)"""
         try:
-            row_index = signal['row_index']
-            ca = signal.get('ca', '')
-            token_name = signal.get('token_name', 'Unknown')
-            
-            if not ca:
-                logger.warning(f"No CA found for signal: {token_name}")
+            elapsed_minutes = self.check_signal_expiry(signal)
+            if elapsed_minutes is None:
                 return
             
-            # Check if tracking duration exceeded (3 days)
-            timestamp_str = signal.get('timestamp_received', '')
-            if not timestamp_str:
-                logger.warning(f"No timestamp for signal: {token_name}")
-                return
-            
-            timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-            elapsed_minutes = (datetime.now() - timestamp).total_seconds() / 60
-            
-            if elapsed_minutes > TRACKING_DURATION:
-                self.sheets.update_status(row_index, 'stopped')
-                logger.stopped_tracking(token_name)
-                return
-            
-            # Get dynamic interval
-            update_interval = self.get_smart_interval(signal)
-            
-            # Check if enough time has passed since last update
-            signal_key = f"{row_index}_{ca}"
-            last_update = self.signal_last_update.get(signal_key)
-            
-            if last_update:
-                seconds_since_update = (datetime.now() - last_update).total_seconds()
-                if seconds_since_update < update_interval:
-                    # Too soon to update
-                    return
-            
-            # Time to update! Fetch fresh data
-            await self.update_live_price(signal, row_index, ca)
-            
-            # Record this update time
-            self.signal_last_update[signal_key] = datetime.now()
-            
-            # Also process traditional interval tracking
-            await self.process_traditional_intervals(signal, row_index, ca, elapsed_minutes)
+            ca = signal.get('ca', '')
+            prices = await self.fetch_dexscreener_prices([ca])
+            if ca not in prices and len(ca) >= 32:
+                return  # Request failed; the signal stays due for the next attempt
+            await self.process_due_signal(signal, elapsed_minutes, prices.get(ca))
         
         except Exception as e:
             error_msg = f"Error processing signal {signal.get('token_name', 'Unknown')}: {e}"
@@ -159,132 +341,83 @@ class PriceTracker:
             if row_index:
                 self.sheets.update_error_log(row_index, str(e))
     
-    async def update_live_price(self, signal, row_index, ca):
-        """Update realtime live price data"""
+    async def process_due_signal(self, signal, elapsed_minutes, price_data):
+        """Apply an already fetched price to a due signal"""
         try:
-            token_name = signal.get('token_name', 'Unknown')
-            
-            # Validate CA
-            if not ca or len(ca) < 32:
-                return
-            
-            # Fetch from DexScreener
-            price_data = await self.fetch_dexscreener_price(ca)
-            
-            if not price_data:
-                return
-            
-            current_price = price_data.get('price', 0)
-            current_mc = price_data.get('market_cap', 0)
-            
-            # Calculate gain
-            entry_mc = self.clean_numeric_value(signal.get('mc_entry', 0))
-            if entry_mc > 0:
-                gain_percent = ((current_mc - entry_mc) / entry_mc) * 100
-                multiplier = current_mc / entry_mc
-            else:
-                gain_percent = 0
-                multiplier = 0
-            
-            # Get current update count
-            update_count = int(self.clean_numeric_value(signal.get('update_count', 0))) + 1
-            
-            # Update live columns
-            self.sheets.update_live_data(row_index, current_price, current_mc, gain_percent, update_count)
-            
-            # Check pump milestones (50% and 100%)
-            await self.check_pump_milestones(signal, row_index, gain_percent, token_name)
-            
-            # Update ATH tracking
-            await self.update_ath_tracking(signal, row_index, current_price, current_mc, gain_percent, token_name)
-            
-            # Update peak if higher
-            peak_mc = self.clean_numeric_value(signal.get('peak_mc', entry_mc))
-            peak_mult = self.clean_numeric_value(signal.get('peak_multiplier', 1.0))
-            alert_history_last = int(self.clean_numeric_value(signal.get('alert_history_last', 0)))
-            alert_times = {}
+            row_index = signal['row_index']
+            ca = signal.get('ca', '')
             
-            if current_mc > peak_mc:
-                peak_mc = current_mc
-                peak_mult = multiplier
-                
-                logger.info(f"🚀 New peak for {token_name}: {peak_mult:.2f}x (${current_mc:,.0f})")
-                
-                # Check for alert achievements
-                for alert_mult in ALERT_MULTIPLIERS:
-                    if multiplier >= alert_mult and alert_history_last < alert_mult:
-                        alert_history_last = alert_mult
-                        alert_times[alert_mult] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        logger.alert_triggered(f"{alert_mult}x", token_name)
-                
-                self.sheets.update_peak_and_alerts(
-                    row_index, peak_mc, peak_mult, alert_history_last, alert_times
-                )
+            # Time to update! Apply fresh data
+            await self.update_live_price(signal, row_index, ca, price_data)
             
-            logger.debug(f"Live update #{update_count} for {token_name}: {multiplier:.2f}x ({gain_percent:+.1f}%)")
+            # Also process traditional interval tracking
+            await self.process_traditional_intervals(signal, row_index, ca, elapsed_minutes, price_data)
         
         except Exception as e:
-            logger.debug(f"Error updating live price: {e}")
-    
-    async def check_pump_milestones(self, signal, row_index, gain_percent, token_name):
-        """Check and record pump milestones (10%, 20%, 30%...100% gains)"""
-        try:
-            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            # Define all milestones (10% to 100% in 10% increments)
-            milestones = [10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
-            
-            # Track which milestones need to be updated
-            new_milestones = {}
-            
-            for milestone in milestones:
-                # Check if this milestone already triggered
-                existing_time = signal.get(f'pump_{milestone}_time', '')
-                
-                # If not triggered yet and gain reached this milestone
-                if not existing_time and gain_percent >= milestone:
-                    new_milestones[milestone] = current_time
-                    
-                    # Log with appropriate emoji
-                    if milestone == 100:
-                        logger.info(f"🚀🚀 {token_name} reached {milestone}% pump milestone! (+{gain_percent:.1f}%)")
-                    elif milestone >= 50:
-                        logger.info(f"🎯 {token_name} reached {milestone}% pump milestone! (+{gain_percent:.1f}%)")
-                    else:
-                        logger.info(f"� {token_name} reached {milestone}% pump milestone! (+{gain_percent:.1f}%)")
+            error_msg = f"Error processing signal {signal.get('token_name', 'Unknown')}: {e}"
+            logger.error(error_msg, exc_info=True)
             
-            # Update sheet if any new milestones reached
-            if new_milestones:
-                self.sheets.update_pump_milestones(row_index, new_milestones)
+            row_index = signal.get('row_index')
+            if row_index:
+                self.sheets.update_error_log(row_index, str(e))
+    
+    async def update_live_price(self, signal, row_index, ca, price_data):
+        """Update realtime live price data from a fetched DexScreener result"""
+        await self.update_live_prices([(signal, price_data)])
+    
+    @profiler.profiled()
+    async def update_live_prices(self, batch):
+        """Update live price, pump milestones, ATH, peak and alerts for many signals at once
+        
+        Every (signal, price_data) pair of a tick is evaluated in one NumPy pass
+        and each signal's cell changes are written as one merged update.
+        """
+        items = []
+        for signal, price_data in batch:
+            ca = signal.get('ca', '')
+            # Validate CA
+            if not ca or len(ca) < 32 or not price_data:
+                continue
+            # Keep every polled tick, not just the latest and the interval snapshots
+            get_tick_history().append(ca, price_data)
+            items.append((signal, price_data))
         
+        if not items:
+            return
+        
+        try:
+            with profiler.stage('PriceTracker.evaluate_live_updates'):
+                changes, events = evaluate_live_updates(items)
+            self.sheets.apply_changes(changes)
+            self.log_live_events(events)
+            logger.debug("Live update evaluated for %d signals", len(items))
         except Exception as e:
-            logger.debug(f"Error checking pump milestones: {e}")
+            logger.error(f"Error updating live prices: {e}", exc_info=True)
     
-    async def update_ath_tracking(self, signal, row_index, current_price, current_mc, current_gain_percent, token_name):
-        """Update All Time High tracking"""
-        try:
-            entry_mc = self.clean_numeric_value(signal.get('mc_entry', 0))
-            ath_mc = self.clean_numeric_value(signal.get('ath_mc', entry_mc))
-            
-            # Check if current MC is new ATH
-            if current_mc > ath_mc:
-                current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                
-                # Calculate ATH gain from entry
-                if entry_mc > 0:
-                    ath_gain_percent = ((current_mc - entry_mc) / entry_mc) * 100
+    @staticmethod
+    def log_live_events(events):
+        """Log milestones, ATHs, peaks and alerts found by the batch evaluator"""
+        for event in events:
+            token_name = event['token_name']
+            if event['type'] == 'milestone':
+                milestone = event['milestone']
+                gain_percent = event['gain_percent']
+                # Log with appropriate emoji
+                if milestone == 100:
+                    logger.info(f"🚀🚀 {token_name} reached {milestone}% pump milestone! (+{gain_percent:.1f}%)")
+                elif milestone >= 50:
+                    logger.info(f"🎯 {token_name} reached {milestone}% pump milestone! (+{gain_percent:.1f}%)")
                 else:
-                    ath_gain_percent = 0
-                
-                # Update ATH data
-                self.sheets.update_ath(row_index, current_price, current_mc, ath_gain_percent, current_time)
-                
-                logger.info(f"📈 New ATH for {token_name}: ${current_mc:,.0f} MC (+{ath_gain_percent:.1f}%)")
-        
-        except Exception as e:
-            logger.debug(f"Error updating ATH: {e}")
+                    logger.info(f"� {token_name} reached {milestone}% pump milestone! (+{gain_percent:.1f}%)")
+            elif event['type'] == 'ath':
+                logger.info(f"📈 New ATH for {token_name}: ${event['market_cap']:,.0f} MC (+{event['gain_percent']:.1f}%)")
+            elif event['type'] == 'peak':
+                logger.info(f"🚀 New peak for {token_name}: {event['multiplier']:.2f}x (${event['market_cap']:,.0f})")
+            elif event['type'] == 'alert':
+                logger.alert_triggered(f"{event['multiplier']}x", token_name)
     
-    async def process_traditional_intervals(self, signal, row_index, ca, elapsed_minutes):
+    @profiler.profiled()
+    async def process_traditional_intervals(self, signal, row_index, ca, elapsed_minutes, price_data):
         """Process traditional 5/10/15/30/60 min interval tracking"""
         try:
             token_name = signal.get('token_name', 'Unknown')
@@ -295,57 +428,15 @@ class PriceTracker:
                     # Check if this interval is already filled
                     existing_price = signal.get(f'price_{interval}min', '')
                     if existing_price == '' or existing_price is None:
-                        # Fetch and update
-                        await self.update_interval(signal, row_index, ca, interval)
+                        # Reuse this tick's price for every missing interval
+                        await self.update_interval(signal, row_index, ca, interval, price_data)
         
         except Exception as e:
             logger.debug(f"Error processing traditional intervals: {e}")
     
-    async def process_signal(self, signal):
-        """Process individual signal tracking"""
-        try:
-            row_index = signal['row_index']
-            ca = signal.get('ca', '')
-            token_name = signal.get('token_name', 'Unknown')
-            
-            if not ca:
-                logger.warning(f"No CA found for signal: {token_name}")
-                return
-            
-            # Calculate elapsed time
-            timestamp_str = signal.get('timestamp_received', '')
-            if not timestamp_str:
-                logger.warning(f"No timestamp for signal: {token_name}")
-                return
-            
-            timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-            elapsed_minutes = (datetime.now() - timestamp).total_seconds() / 60
-            
-            # Check if we need to stop tracking (after 60 minutes)
-            if elapsed_minutes > 60:
-                self.sheets.update_status(row_index, 'stopped')
-                logger.stopped_tracking(token_name)
-                return
-            
-            # Check which intervals need updating
-            for interval in TRACKING_INTERVALS:
-                if elapsed_minutes >= interval:
-                    # Check if this interval is already filled
-                    existing_price = signal.get(f'price_{interval}min', '')
-                    if existing_price == '' or existing_price is None:
-                        # Fetch and update
-                        await self.update_interval(signal, row_index, ca, interval)
-        
-        except Exception as e:
-            error_msg = f"Error processing signal {signal.get('token_name', 'Unknown')}: {e}"
-            logger.error(error_msg, exc_info=True)
-            
-            row_index = signal.get('row_index')
-            if row_index:
-                self.sheets.update_error_log(row_index, str(e))
-    
-    async def update_interval(self, signal, row_index, ca, interval):
-        """Fetch price and update specific interval"""
+    @profiler.profiled()
+    async def update_interval(self, signal, row_index, ca, interval, price_data):
+        """Update specific interval from a fetched DexScreener result"""
         token_name = signal.get('token_name', 'Unknown')
         
         try:
@@ -357,9 +448,6 @@ class PriceTracker:
                 self.sheets.update_error_log(row_index, error_msg)
                 return
             
-            # Fetch from DexScreener
-            price_data = await self.fetch_dexscreener_price(ca)
-            
             if not price_data:
                 # Check if this is the first attempt (5min interval)
                 if interval == 5:
@@ -418,55 +506,27 @@ class PriceTracker:
             self.sheets.update_error_log(row_index, str(e))
     
     async def fetch_dexscreener_price(self, ca):
-        """Fetch price from DexScreener API"""
-        try:
-            # Validate CA before making request
-            if not ca or len(ca) < 32:
-                logger.warning(f"Invalid CA format: {ca}")
-                return None
-            
-            # DexScreener API: /tokens/{address} - will auto-detect chain
-            url = f"{DEXSCREENER_API_BASE}/tokens/{ca}"
-            logger.debug(f"Fetching from DexScreener: {url}")
-            
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 404:
-                # Token not found - endpoint doesn't recognize the address
-                logger.debug(f"DexScreener 404 for CA: {ca[:8]}...")
-                return None
-            elif response.status_code != 200:
-                logger.api_error("DexScreener", f"HTTP {response.status_code} for CA: {ca[:8]}...")
-                return None
-            
-            data = response.json()
-            
-            # Check if we got pairs data
-            if not data.get('pairs') or len(data['pairs']) == 0:
-                # API returned OK but no trading pairs exist
-                logger.debug(f"No trading pairs found for CA: {ca[:8]}... (token exists but not listed/traded)")
-                return None
-            
-            # Get the first pair (usually the most liquid)
-            pair = data['pairs'][0]
-            
-            result = {
-                'price': float(pair.get('priceUsd', 0)),
-                'market_cap': float(pair.get('fdv', 0)),  # Fully Diluted Valuation
-                'liquidity': float(pair.get('liquidity', {}).get('usd', 0)),
-                'volume_24h': float(pair.get('volume', {}).get('h24', 0))
-            }
-            
-            logger.debug(f"DexScreener data fetched for {ca[:8]}...: ${result['market_cap']:,.0f} MC")
-            return result
-        
-        except requests.RequestException as e:
-            logger.debug(f"DexScreener request failed: {e}")
-            return None
-        except (KeyError, ValueError, TypeError) as e:
-            logger.debug(f"DexScreener data parsing error: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"DexScreener unexpected error: {e}", exc_info=True)
+        """Fetch price from DexScreener API for a single CA"""
+        # Validate CA before making request
+        if not ca or len(ca) < 32:
+            logger.warning(f"Invalid CA format: {ca}")
             return None
-
+        
+        prices = await self.fetch_dexscreener_prices([ca])
+        return prices.get(ca)
+    
+    @profiler.profiled()
+    async def fetch_dexscreener_prices(self, cas):
+        """Fetch prices for many CAs at once ({ca: price_data or None}; failed CAs left out)
+        
+        DexScreener accepts up to 30 comma-separated addresses per /tokens
+        request, so a tick costs one request per 30 distinct CAs.
+        """
+        unique_cas = list(dict.fromkeys(ca for ca in cas if ca and len(ca) >= 32))
+        if not unique_cas:
+            return {}
+        
+        prices = await dexscreener_api.fetch_tokens(unique_cas)
+        logger.debug("Fetched %d CAs in %d DexScreener request(s)",
+                     len(unique_cas), -(-len(unique_cas) // DEXSCREENER_BATCH_SIZE))
+        return prices
@@ -0,0 +1,242 @@
+import asyncio
+import contextvars
+import cProfile
+import functools
+import signal
+import threading
+import time
+from config import PROFILING_ENABLED, PROFILING_REPORT_INTERVAL, PROFILING_TOP_N, PROFILING_CPROFILE_PATH
+from logger import logger
+
+# Signal being processed in the current task/thread (set by the tracker per due signal)
+_current_signal = contextvars.ContextVar('profiled_signal', default=None)
+
+# Per-signal entries kept before new (stage, signal) pairs are dropped
+MAX_SIGNAL_ENTRIES = 20000
+
+
+class _NullStage:
+    """Shared no-op context manager used while profiling is off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class StageProfiler:
+    """Opt-in wall-time profiler for named stages of the tracking hot path
+
+    Records call count, total and max time per stage and per (stage, signal).
+    While disabled, profiled() wrappers cost one attribute check per call.
+    Toggle at runtime with toggle() (SIGUSR1 in main.py); report() lists the
+    slowest stages, and an optional cProfile snapshot is written on each report.
+    """
+
+    def __init__(self, enabled=PROFILING_ENABLED, cprofile_path=PROFILING_CPROFILE_PATH):
+        self.enabled = False
+        self.cprofile_path = cprofile_path
+        self._cprofile = None
+        self._lock = threading.Lock()
+        self._stages = {}  # stage -> [calls, total, max]
+        self._signals = {}  # (stage, signal) -> [calls, total, max]
+        self.dropped = 0
+        self.started_at = None
+        if enabled:
+            self.enable()
+
+    # ----- switching -----
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.reset()
+        self.started_at = time.monotonic()
+        if self.cprofile_path:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self.enabled = True
+        logger.info(f"🔬 Stage profiling enabled{' (with cProfile)' if self._cprofile else ''}")
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.report()
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile = None
+        logger.info("🔬 Stage profiling disabled")
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+            self._signals = {}
+            self.dropped = 0
+
+    # ----- recording -----
+
+    def stage(self, name):
+        """Context manager timing a block as `name` (no-op while disabled)"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, elapsed):
+        signal_key = _current_signal.get()
+        with self._lock:
+            entry = self._stages.get(name)
+            if entry is None:
+                entry = self._stages[name] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], elapsed)
+
+            if signal_key is None:
+                return
+            key = (name, signal_key)
+            entry = self._signals.get(key)
+            if entry is None:
+                if len(self._signals) >= MAX_SIGNAL_ENTRIES:
+                    self.dropped += 1
+                    return
+                entry = self._signals[key] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], elapsed)
+
+    @staticmethod
+    def set_signal(signal_key):
+        """Attribute stages in this task/thread to a signal; returns a token for reset_signal()"""
+        return _current_signal.set(signal_key)
+
+    @staticmethod
+    def reset_signal(token):
+        _current_signal.reset(token)
+
+    def profiled(self, name=None):
+        """Decorator for sync or async functions; stage name defaults to Class.method"""
+        def decorator(func):
+            stage_name = name or func.__qualname__
+
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    start = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self.record(stage_name, time.perf_counter() - start)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(stage_name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    # ----- reporting -----
+
+    @staticmethod
+    def _rows(entries, limit):
+        rows = [(key, calls, total, peak) for key, (calls, total, peak) in entries.items()]
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return rows[:limit]
+
+    def top_stages(self, limit=PROFILING_TOP_N):
+        """[(stage, calls, total_seconds, max_seconds)] by total time"""
+        with self._lock:
+            return self._rows(self._stages, limit)
+
+    def top_signals(self, limit=PROFILING_TOP_N):
+        """[((stage, signal), calls, total_seconds, max_seconds)] by total time"""
+        with self._lock:
+            return self._rows(self._signals, limit)
+
+    def stats(self, limit=PROFILING_TOP_N):
+        return {
+            'enabled': self.enabled,
+            'stages': [{'stage': stage, 'calls': calls, 'total': round(total, 6), 'max': round(peak, 6),
+                        'avg': round(total / calls, 6) if calls else 0}
+                       for stage, calls, total, peak in self.top_stages(limit)],
+            'signals': [{'stage': stage, 'signal': str(signal_key), 'calls': calls, 'total': round(total, 6),
+                         'max': round(peak, 6)}
+                        for (stage, signal_key), calls, total, peak in self.top_signals(limit)],
+            'dropped_signal_entries': self.dropped
+        }
+
+    def report(self, limit=PROFILING_TOP_N):
+        """Log the slowest stages and signals; write the cProfile snapshot if configured"""
+        stages = self.top_stages(limit)
+        if not stages:
+            logger.info("🔬 Profiling report: no stages recorded yet")
+        else:
+            window = time.monotonic() - self.started_at if self.started_at else 0
+            logger.info(f"🔬 Profiling report: top {len(stages)} stages by total time (last {window:.0f}s)")
+            for stage, calls, total, peak in stages:
+                logger.info(f"   • {stage}: {total * 1000:.1f}ms total, {calls} calls, "
+                            f"avg {total / calls * 1000:.2f}ms, max {peak * 1000:.1f}ms")
+            for (stage, signal_key), calls, total, peak in self.top_signals(min(limit, 5)):
+                logger.info(f"   • signal {signal_key} in {stage}: {total * 1000:.1f}ms over {calls} calls")
+
+        if self._cprofile is not None:
+            try:
+                self._cprofile.dump_stats(self.cprofile_path)
+                logger.info(f"🔬 cProfile snapshot written to {self.cprofile_path} (open with pstats)")
+            except Exception as e:
+                logger.error(f"Error writing cProfile snapshot: {e}", exc_info=True)
+
+    async def report_loop(self, interval=PROFILING_REPORT_INTERVAL):
+        """Log a top-N report every interval seconds while profiling is on"""
+        while True:
+            await asyncio.sleep(interval)
+            if self.enabled:
+                self.report()
+
+    def install_signal_handlers(self, loop):
+        """SIGUSR1 toggles profiling, SIGUSR2 logs a report now (POSIX only)"""
+        if not hasattr(signal, 'SIGUSR1'):
+            return False
+        try:
+            loop.add_signal_handler(signal.SIGUSR1, self.toggle)
+            loop.add_signal_handler(signal.SIGUSR2, self.report)
+        except (NotImplementedError, RuntimeError):
+            return False
+        return True
+
+
+# Global instance
+profiler = StageProfiler()
@@ -0,0 +1,172 @@
+import asyncio
+import threading
+import time
+from config import (DEXSCREENER_RATE_LIMIT, DEXSCREENER_RATE_BURST,
+                    SHEETS_READ_RATE_LIMIT, SHEETS_READ_RATE_BURST,
+                    SHEETS_WRITE_RATE_LIMIT, SHEETS_WRITE_RATE_BURST,
+                    RATE_LIMIT_BACKOFF, RATE_LIMIT_MAX_RETRIES)
+from logger import logger
+from metrics import metrics
+
+# Waits longer than this are logged, so throttling is visible without metrics
+SLOW_WAIT_LOG_THRESHOLD = 1.0  # seconds
+
+
+class TokenBucket:
+    """Token bucket that makes callers wait for capacity instead of failing
+
+    Tokens are reserved immediately and may go negative; a caller then waits
+    for the deficit to refill. That keeps callers in arrival order and lets
+    penalize() push everyone back after an upstream 429.
+    """
+
+    def __init__(self, name, rate_per_minute, burst):
+        self.name = name
+        self.rate = rate_per_minute / 60.0  # tokens per second
+        self.capacity = float(max(1, burst))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        # Stats
+        self.acquired = 0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+        self.throttled = 0  # upstream 429s reported via penalize()
+
+    def _reserve(self, tokens):
+        """Take tokens now and return how long the caller must wait for them"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+            self.acquired += tokens
+            self.last_wait = wait
+            if wait > 0:
+                self.waits += 1
+                self.wait_seconds_total += wait
+                self.max_wait = max(self.max_wait, wait)
+
+        if wait >= SLOW_WAIT_LOG_THRESHOLD:
+            logger.info(f"⏳ Rate limit '{self.name}': waiting {wait:.1f}s (bucket {self.fill():.1f}/{self.capacity:.0f})")
+        return wait
+
+    async def acquire(self, tokens=1):
+        """Wait (without blocking the event loop) until tokens are available"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self, tokens=1):
+        """Blocking variant for synchronous gspread calls running in worker threads"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    def penalize(self, seconds):
+        """Upstream returned 429: drain the bucket so nobody calls for `seconds`"""
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+            self.throttled += 1
+        logger.warning(f"Rate limit '{self.name}': upstream throttled us, backing off {seconds:.0f}s")
+
+    def fill(self):
+        """Current token count (negative while callers are queued)"""
+        with self._lock:
+            now = time.monotonic()
+            return min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'tokens': round(self.fill(), 2),
+            'capacity': self.capacity,
+            'rate_per_minute': round(self.rate * 60, 2),
+            'acquired': self.acquired,
+            'waits': self.waits,
+            'wait_seconds_total': round(self.wait_seconds_total, 3),
+            'max_wait': round(self.max_wait, 3),
+            'last_wait': round(self.last_wait, 3),
+            'throttled': self.throttled
+        }
+
+    def summary(self):
+        return (f"{self.name}: {self.fill():.1f}/{self.capacity:.0f} tokens, "
+                f"{self.waits} waits ({self.wait_seconds_total:.1f}s total, max {self.max_wait:.1f}s), "
+                f"{self.throttled} throttled")
+
+
+# One bucket per upstream quota (name -> rate per minute, burst); every outbound call
+# path acquires from these. Buckets are created on first use.
+BUCKET_LIMITS = {
+    'dexscreener': (DEXSCREENER_RATE_LIMIT, DEXSCREENER_RATE_BURST),
+    'sheets_read': (SHEETS_READ_RATE_LIMIT, SHEETS_READ_RATE_BURST),
+    'sheets_write': (SHEETS_WRITE_RATE_LIMIT, SHEETS_WRITE_RATE_BURST),
+}
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(name):
+    """The shared bucket for an upstream quota in BUCKET_LIMITS"""
+    bucket = _buckets.get(name)
+    if bucket is not None:
+        return bucket
+    with _buckets_lock:
+        if name not in _buckets:
+            rate_per_minute, burst = BUCKET_LIMITS[name]
+            if not _buckets:
+                metrics.add_collector(_collect_bucket_metrics)
+            _buckets[name] = TokenBucket(name, rate_per_minute, burst)
+        return _buckets[name]
+
+
+def all_buckets():
+    return [get_bucket(name) for name in BUCKET_LIMITS]
+
+
+API_CALLS = metrics.counter('api_calls_total', 'Rate-limited blocking API calls (gspread) by result')
+API_CALL_SECONDS = metrics.histogram('api_call_seconds', 'Rate-limited blocking API call latency (excluding bucket waits)')
+
+
+def is_rate_limited_error(error):
+    """True for upstream 429 errors (gspread APIError or anything with a .code/.response)"""
+    code = getattr(error, 'code', None)
+    if code is None:
+        response = getattr(error, 'response', None)
+        code = getattr(response, 'status_code', None)
+    return code == 429
+
+
+def call_blocking(bucket, func, *args, **kwargs):
+    """Run a synchronous API call through a bucket (or bucket name), backing off and retrying on 429"""
+    if isinstance(bucket, str):
+        bucket = get_bucket(bucket)
+    call = getattr(func, '__name__', 'call')
+    for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+        bucket.acquire_blocking()
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+            API_CALLS.inc(bucket=bucket.name, call=call, result='ok')
+            return result
+        except Exception as e:
+            rate_limited = is_rate_limited_error(e)
+            API_CALLS.inc(bucket=bucket.name, call=call, result='429' if rate_limited else 'error')
+            if attempt < RATE_LIMIT_MAX_RETRIES and rate_limited:
+                bucket.penalize(RATE_LIMIT_BACKOFF)
+                continue
+            raise
+        finally:
+            API_CALL_SECONDS.observe(time.perf_counter() - start, bucket=bucket.name, call=call)
+
+
+def _collect_bucket_metrics():
+    for bucket in list(_buckets.values()):
+        metrics.export_stats('rate_limit', bucket.stats(), bucket=bucket.name)
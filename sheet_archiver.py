@@ -0,0 +1,227 @@
+import asyncio
+import itertools
+import time
+from datetime import datetime
+import gspread
+from config import (ARCHIVE_INTERVAL, ARCHIVE_STATUSES, ARCHIVE_MIN_AGE_HOURS, ARCHIVE_MIN_ROWS,
+                    ARCHIVE_MAX_ROWS, ARCHIVE_SPREADSHEET_ID, ARCHIVE_WORKSHEET_PREFIX)
+from logger import logger
+from rate_limiter import call_blocking
+from batch_evaluator import clean_numeric_value
+from metrics import metrics
+from profiling import profiler
+
+ARCHIVED_ROWS = metrics.counter('sheet_archived_rows_total', 'Finished rows moved from the hot sheet to archive worksheets')
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class SheetArchiver:
+    """Background compaction that keeps the hot sheet limited to live rows
+
+    Finished rows are copied to dated archive worksheets, then deleted from the
+    hot sheet in one atomic batchUpdate while sheet flushes, reconciles, appends
+    and threaded row lookups are held back and no tracker tick runs. The new
+    layout is noted in the write-ahead log before the delete is sent; afterwards
+    every in-memory row index (store, write buffer, write-ahead log, append
+    cursor, tracker schedule) is shifted before anything is released.
+    """
+
+    def __init__(self, sheets_handler, price_tracker=None, interval=ARCHIVE_INTERVAL,
+                 statuses=ARCHIVE_STATUSES, min_age_hours=ARCHIVE_MIN_AGE_HOURS,
+                 min_rows=ARCHIVE_MIN_ROWS, max_rows=ARCHIVE_MAX_ROWS,
+                 spreadsheet_id=ARCHIVE_SPREADSHEET_ID, prefix=ARCHIVE_WORKSHEET_PREFIX):
+        self.sheets = sheets_handler
+        self.tracker = price_tracker
+        self.interval = interval
+        self.statuses = set(statuses)
+        self.min_age = min_age_hours * 3600
+        self.min_rows = max(1, min_rows)
+        self.max_rows = max(1, max_rows)
+        self.spreadsheet_id = spreadsheet_id
+        self.prefix = prefix
+        self._spreadsheet = None
+
+        # Stats
+        self.runs = 0
+        self.archived = 0
+        self.dropped_writes = 0
+        self.errors = 0
+        self.last_run_seconds = None
+
+    @property
+    def enabled(self):
+        return self.interval > 0 and getattr(self.sheets, 'supports_archiving', False)
+
+    def select_rows(self, now=None):
+        """Rows to archive now: finished, idle for min_age, oldest first (at most max_rows)"""
+        now = now or datetime.now()
+        records = self.sheets.store.records()
+        if not records:
+            return []
+        # The newest signal number must stay in the hot sheet to keep numbering going after a restart
+        newest = max(records, key=lambda record: clean_numeric_value(record.get('nomor')))
+
+        candidates = []
+        for record in records:
+            if record is newest or record.get('current_status') not in self.statuses:
+                continue
+            last_seen = self._parse_time(record.get('last_update_time')) or self._parse_time(record.get('timestamp_received'))
+            if last_seen is not None and (now - last_seen).total_seconds() < self.min_age:
+                continue
+            candidates.append(record)
+            if len(candidates) >= self.max_rows:
+                break
+        return candidates
+
+    @staticmethod
+    def _parse_time(value):
+        try:
+            return datetime.strptime(str(value).strip(), TIME_FORMAT)
+        except (TypeError, ValueError):
+            return None
+
+    def worksheet_title(self, record):
+        """Dated archive worksheet for a row, by the month the signal was received"""
+        received = self._parse_time(record.get('timestamp_received')) or datetime.now()
+        return f"{self.prefix}{received.strftime('%Y_%m')}"
+
+    def _archive_spreadsheet(self):
+        if self._spreadsheet is None:
+            if self.spreadsheet_id:
+                self._spreadsheet = call_blocking('sheets_read', self.sheets.client.open_by_key, self.spreadsheet_id)
+            else:
+                self._spreadsheet = self.sheets.sheet.spreadsheet
+        return self._spreadsheet
+
+    def _worksheet(self, title, headers, rows_needed):
+        spreadsheet = self._archive_spreadsheet()
+        try:
+            return call_blocking('sheets_read', spreadsheet.worksheet, title)
+        except gspread.WorksheetNotFound:
+            worksheet = call_blocking('sheets_write', spreadsheet.add_worksheet,
+                                      title=title, rows=rows_needed + 1, cols=len(headers))
+            call_blocking('sheets_write', worksheet.update, values=[headers], range_name='A1')
+            logger.info(f"🗃️ Created archive worksheet '{title}'")
+            return worksheet
+
+    @profiler.profiled()
+    def write_archive(self, records):
+        """Copy rows into their archive worksheets (blocking); raises if any write fails
+
+        Rows already in the archive (same nomor and CA, e.g. from a run that
+        was interrupted before the delete) are not written twice.
+        """
+        headers = self.sheets._get_expected_headers()
+        records = sorted(records, key=lambda record: (self.worksheet_title(record), record['row_index']))
+        for title, group in itertools.groupby(records, key=self.worksheet_title):
+            group = list(group)
+            worksheet = self._worksheet(title, headers, len(group))
+
+            numbers, cas = call_blocking('sheets_read', worksheet.batch_get, ['A2:A', 'F2:F'])
+            existing = {
+                (str(number[0]).strip() if number else '', ca[0].strip() if ca else '')
+                for number, ca in itertools.zip_longest(numbers, cas)
+                if number or ca
+            }
+            rows = [
+                [record.get(header, '') for header in headers] for record in group
+                if (str(record.get('nomor', '')).strip(), str(record.get('ca', '')).strip()) not in existing
+            ]
+            if not rows:
+                continue
+
+            first_row = max(len(numbers), len(cas)) + 2
+            missing = first_row + len(rows) - 1 - worksheet.row_count
+            if missing > 0:
+                call_blocking('sheets_write', worksheet.add_rows, missing)
+            # Explicit range instead of append_rows(): rows are deleted from the hot sheet
+            # right after, so the write has to be confirmed
+            response = call_blocking('sheets_write', worksheet.update, values=rows,
+                                     range_name=f"A{first_row}", value_input_option='RAW')
+            if (response or {}).get('updatedRows') != len(rows):
+                raise RuntimeError(f"Archive write to '{title}' not confirmed: {response}")
+            logger.debug(f"Archived {len(rows)} rows to '{title}' (from row {first_row})")
+
+    def _full_records(self, records):
+        """Complete rows for archiving: the store only holds some columns of finished rows"""
+        sheet_rows = self.sheets.read_rows([record['row_index'] for record in records])
+        full_records = []
+        for record in records:
+            full = sheet_rows.get(record['row_index'], {})
+            full.update(record)  # the store is write-through, so at least as new as the sheet
+            full_records.append(full)
+        return full_records
+
+    def _delete_rows(self, records):
+        """Delete archived rows from the hot sheet and shift every row index (worker thread)
+
+        Reconciles, appends, threaded row lookups and sheet flushes are held for
+        the whole step, so nothing reaches the sheet with an index from the old layout.
+        """
+        with self.sheets.layout_change():
+            # Skip rows that changed since they were selected (e.g. reactivated by hand)
+            row_indexes = [
+                record['row_index'] for record in records
+                if self.sheets.store.get_field(record['row_index'], 'current_status') in self.statuses
+                and self.sheets.store.get_field(record['row_index'], 'ca') == record.get('ca')
+            ]
+            if not row_indexes:
+                return [], {}, 0
+            mapping, dropped = self.sheets.delete_rows(row_indexes)
+            return row_indexes, mapping, dropped
+
+    async def _delete_and_remap(self, records):
+        """Delete archived rows; tracker ticks are held until the tracker schedule is remapped too"""
+        if self.tracker is None:
+            row_indexes, _, dropped = await asyncio.to_thread(self._delete_rows, records)
+            return row_indexes, dropped
+        async with self.tracker.hold_ticks():
+            row_indexes, mapping, dropped = await asyncio.to_thread(self._delete_rows, records)
+            self.tracker.remap_rows(mapping)
+        return row_indexes, dropped
+
+    @profiler.profiled()
+    async def compact(self):
+        """One archive run; returns the number of rows moved out of the hot sheet"""
+        records = self.select_rows()
+        if len(records) < self.min_rows:
+            logger.debug(f"Archive: {len(records)} finished rows, waiting for {self.min_rows}")
+            return 0
+
+        start = time.perf_counter()
+        self.runs += 1
+        # Send buffered writes first: the full rows are read back from the sheet, and
+        # few writes should be pending while row indexes shift
+        await asyncio.to_thread(self.sheets.flush_writes)
+        records = await asyncio.to_thread(self._full_records, records)
+        await asyncio.to_thread(self.write_archive, records)
+        row_indexes, dropped = await self._delete_and_remap(records)
+
+        self.archived += len(row_indexes)
+        self.dropped_writes += dropped
+        self.last_run_seconds = time.perf_counter() - start
+        ARCHIVED_ROWS.inc(len(row_indexes))
+        logger.info(f"🗃️ Archived {len(row_indexes)} finished rows in {self.last_run_seconds:.1f}s, "
+                    f"{len(self.sheets.store)} rows left in the hot sheet"
+                    + (f" ({dropped} late cell writes to archived rows dropped)" if dropped else ""))
+        return len(row_indexes)
+
+    async def run(self):
+        """Background task: compact every interval seconds"""
+        if not self.enabled:
+            return
+        logger.info(f"🗃️ Archive rotation every {self.interval:.0f}s for {', '.join(sorted(self.statuses))} rows "
+                    f"idle {self.min_age / 3600:.0f}h+")
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.compact()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error archiving finished rows: {e}", exc_info=True)
+
+    def summary(self):
+        if not self.enabled:
+            return "disabled"
+        return f"{self.archived} rows archived in {self.runs} runs, {self.errors} errors"
@@ -0,0 +1,245 @@
+import asyncio
+import threading
+import time
+from gspread.utils import rowcol_to_a1
+from logger import logger
+from rate_limiter import call_blocking
+
+
+class SheetWriteBuffer:
+    """Coalesces cell writes across all rows and flushes them as one batch
+
+    Every update_* call in SheetsHandler lands here as (row, column) -> value.
+    A later write to the same cell replaces the earlier one, and a flush sends
+    everything pending in a single values_batch_update request (split only when
+    it exceeds max_batch cells).
+
+    With a write-ahead log, every queued cell is logged (group-committed by the
+    log's writer thread, so queue() never waits for the disk) and durable before
+    it is sent, and only dropped from the log after the sheet accepted it, so a
+    Sheets outage or a restart delays writes instead of losing them.
+    """
+
+    # Retry delay after failed flushes doubles up to this many seconds
+    MAX_RETRY_DELAY = 60.0
+
+    def __init__(self, sheet, headers, max_latency=2.0, max_batch=5000, bucket=None, wal=None):
+        self.sheet = sheet
+        self.bucket = bucket  # rate_limiter bucket (or bucket name) for Sheets writes
+        self.wal = wal  # write_log.WriteAheadLog (optional)
+        self.max_latency = max_latency
+        self.max_batch = max_batch
+        self._col_index = {header: idx for idx, header in enumerate(headers, start=1)}
+        self._pending = {}  # (row_index, col_index) -> value
+        self._seqs = {}  # (row_index, col_index) -> write-ahead log sequence
+        self._oldest = None  # time.monotonic() of the oldest pending write
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = None
+        self._loop = None
+        self.flush_count = 0
+        self.cells_written = 0
+        self.consecutive_failures = 0
+
+    def queue(self, row_index, fields):
+        """Queue cell values for a row, keyed by header name"""
+        cells = {}
+        for field, value in fields.items():
+            col = self._col_index.get(field)
+            if col is None:
+                logger.warning(f"Unknown sheet column '{field}' - write skipped")
+                continue
+            cells[(row_index, col)] = value
+
+        with self._lock:
+            if self.wal is not None:
+                # Hand to the write-ahead log (under the lock so the log and the buffer
+                # agree on which value is newest); flush() waits for the commit
+                self._seqs.update(self.wal.record(cells))
+            self._pending.update(cells)
+            if self._oldest is None and self._pending:
+                self._oldest = time.monotonic()
+            pending = len(self._pending)
+
+        if pending >= self.max_batch:
+            if self._loop is not None:
+                self.request_flush()
+            else:
+                # No background flusher running (e.g. standalone scripts): flush inline
+                self.flush()
+
+    def request_flush(self):
+        """Wake the background flusher so pending writes go out now (False if none is running)"""
+        if self._loop is None or self._wakeup is None:
+            return False
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+        return True
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def pending_fields(self):
+        """Return pending writes grouped as {row_index: {header: value}}"""
+        headers = {idx: header for header, idx in self._col_index.items()}
+        rows = {}
+        with self._lock:
+            for (row_index, col), value in self._pending.items():
+                rows.setdefault(row_index, {})[headers[col]] = value
+        return rows
+
+    def remap(self, mapping):
+        """Move pending writes to new row indexes after rows were deleted from the sheet
+
+        Args:
+            mapping: {old_row_index: new_row_index}; writes to other rows are dropped
+
+        Returns:
+            Number of pending cells dropped
+        """
+        with self._lock:
+            pending = {}
+            seqs = {}
+            for (row_index, col), value in self._pending.items():
+                new_row_index = mapping.get(row_index)
+                if new_row_index is None:
+                    continue
+                pending[(new_row_index, col)] = value
+                if (row_index, col) in self._seqs:
+                    seqs[(new_row_index, col)] = self._seqs[(row_index, col)]
+            dropped = len(self._pending) - len(pending)
+            self._pending = pending
+            self._seqs = seqs
+            if not self._pending:
+                self._oldest = None
+            if self.wal is not None:
+                self.wal.remap(mapping)
+        return dropped
+
+    def hold_flushes(self):
+        """Lock that keeps flush() from sending anything while held (e.g. during row deletion)"""
+        return self._flush_lock
+
+    def flush(self):
+        """Send every pending cell to the sheet (blocking). Returns cells written."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch = self._pending
+                seqs = self._seqs
+                self._pending = {}
+                self._seqs = {}
+                self._oldest = None
+
+            cells = sorted(batch.items())
+            written = 0
+            try:
+                if self.wal is not None:
+                    # Nothing goes to the sheet before it is durable in the log
+                    self.wal.sync()
+                for start in range(0, len(cells), self.max_batch):
+                    chunk = cells[start:start + self.max_batch]
+                    data = self._build_ranges(chunk)
+                    if self.bucket is not None:
+                        call_blocking(self.bucket, self.sheet.batch_update, data)
+                    else:
+                        self.sheet.batch_update(data)
+                    if self.wal is not None:
+                        self.wal.acknowledge({key: seqs[key] for key, _ in chunk if key in seqs})
+                    written += len(chunk)
+                self.flush_count += 1
+                self.cells_written += written
+                self.consecutive_failures = 0
+                logger.debug("Flushed %d cells to sheet in one batch", written)
+                return written
+            except Exception as e:
+                self.consecutive_failures += 1
+                logger.error(f"Error flushing sheet writes ({len(cells) - written} cells requeued): {e}", exc_info=True)
+                self._requeue(dict(cells[written:]), seqs)
+                return written
+
+    def replay_log(self):
+        """Load writes left in the write-ahead log (after a crash/outage) into the buffer"""
+        if self.wal is None:
+            return 0
+        pending = self.wal.pending()
+        with self._lock:
+            for key, (value, seq) in pending.items():
+                if key not in self._pending:
+                    self._pending[key] = value
+                    self._seqs[key] = seq
+            if self._oldest is None and self._pending:
+                self._oldest = time.monotonic()
+        if pending:
+            logger.info(f"♻️ Replaying {len(pending)} sheet cell writes from the write-ahead log")
+        return len(pending)
+
+    async def run(self):
+        """Background flusher: flush at most max_latency after the first pending write"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        logger.info(f"🧾 Sheet write buffer started (max latency {self.max_latency}s, max batch {self.max_batch} cells)")
+
+        while True:
+            try:
+                with self._lock:
+                    oldest = self._oldest
+                timeout = self.max_latency if oldest is None else max(0.0, oldest + self.max_latency - time.monotonic())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+                if self.pending_count():
+                    await asyncio.to_thread(self.flush)
+                    if self.consecutive_failures:
+                        # Sheets is failing: back off instead of retrying every max_latency
+                        delay = min(self.MAX_RETRY_DELAY, self.max_latency * 2 ** self.consecutive_failures)
+                        logger.warning(f"Sheet writes failing ({self.consecutive_failures}x), "
+                                       f"{self.pending_count()} cells buffered - retrying in {delay:.0f}s")
+                        await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in sheet write flusher: {e}", exc_info=True)
+                await asyncio.sleep(self.max_latency)
+
+    def _requeue(self, cells, seqs):
+        """Put failed cells back without overwriting newer values queued meanwhile"""
+        with self._lock:
+            for key, value in cells.items():
+                if key not in self._pending:
+                    self._pending[key] = value
+                    if key in seqs:
+                        self._seqs[key] = seqs[key]
+            if self._oldest is None and self._pending:
+                self._oldest = time.monotonic()
+
+    @staticmethod
+    def _build_ranges(cells):
+        """Merge sorted (row, col) cells into contiguous per-row ranges"""
+        data = []
+        run_row = run_start = run_end = None
+        run_values = []
+
+        for (row_index, col), value in cells:
+            if row_index == run_row and col == run_end + 1:
+                run_end = col
+                run_values.append(value)
+                continue
+            if run_row is not None:
+                data.append(SheetWriteBuffer._range_entry(run_row, run_start, run_end, run_values))
+            run_row, run_start, run_end, run_values = row_index, col, col, [value]
+
+        if run_row is not None:
+            data.append(SheetWriteBuffer._range_entry(run_row, run_start, run_end, run_values))
+        return data
+
+    @staticmethod
+    def _range_entry(row_index, start_col, end_col, values):
+        range_name = rowcol_to_a1(row_index, start_col)
+        if end_col != start_col:
+            range_name = f"{range_name}:{rowcol_to_a1(row_index, end_col)}"
+        return {'range': range_name, 'values': [values]}
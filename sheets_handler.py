@@ -1,24 +1,88 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
 import gspread
+from gspread.utils import rowcol_to_a1, numericise_all
 from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime
-from config import GOOGLE_SHEET_ID, GOOGLE_SERVICE_ACCOUNT_JSON
+from config import (GOOGLE_SHEET_ID, GOOGLE_SERVICE_ACCOUNT_JSON, SIGNAL_STORE_RECONCILE_INTERVAL,
+                    SHEETS_WRITE_MAX_LATENCY, SHEETS_WRITE_MAX_BATCH, SHEETS_WAL_PATH, SHEETS_WAL_SYNC,
+                    SHEETS_PROJECTED_READS, SIGNAL_STORE_SYNC_INTERVAL)
 from logger import logger
+from signal_store import SignalStore
+from sheet_writer import SheetWriteBuffer
+from write_log import open_write_log
+from rate_limiter import call_blocking
+from metrics import metrics
+from profiling import profiler
+from batch_evaluator import clean_numeric_value
+
+SHEETS_METHOD_SECONDS = metrics.histogram('sheets_handler_seconds', 'Time spent in SheetsHandler methods')
+STORAGE_ROWS = metrics.gauge('storage_rows', 'Signal rows held in the in-memory store')
+WRITE_BUFFER_CELLS = metrics.gauge('sheet_write_buffer_cells', 'Cell writes waiting in the sheet write buffer')
+WRITE_LOG_CELLS = metrics.gauge('sheet_write_log_cells', 'Cell writes not yet acknowledged in the write-ahead log')
+
+# Read for every row on reconcile: status plus the lookup columns (CA, message ids, archive age)
+INDEX_COLUMNS = ('nomor', 'timestamp_received', 'channel_id', 'channel_name', 'message_id', 'ca',
+                 'current_status', 'last_update_time')
+# Large text columns never loaded by a reconcile; read on demand by _read_cell()
+COLD_COLUMNS = ('update_history', 'error_log')
+# Compared on every incremental sync; a hand edit to one of these re-reads the row
+FINGERPRINT_COLUMNS = ('nomor', 'ca', 'mc_entry', 'current_status', 'last_update_time')
+# Ranges per batch_get request (ranges travel in the GET query string)
+MAX_RANGES_PER_READ = 100
+# Lookup-and-write attempts when rows are deleted between a row lookup and its write
+LAYOUT_RETRIES = 3
 
 class SheetsHandler:
+    # Finished rows can be moved to archive worksheets (see sheet_archiver.py)
+    supports_archiving = True
+    # Seconds between incremental syncs of the store with the sheet (0 = full reconciles only)
+    store_sync_interval = SIGNAL_STORE_SYNC_INTERVAL
+    
     def __init__(self):
         try:
-            scope = ['https://spreadsheets.google.com/feeds',
-                     'https://www.googleapis.com/auth/drive']
-            creds = ServiceAccountCredentials.from_json_keyfile_name(
-                GOOGLE_SERVICE_ACCOUNT_JSON, scope)
-            self.client = gspread.authorize(creds)
-            self.sheet = self.client.open_by_key(GOOGLE_SHEET_ID).sheet1
+            self.sheet = self._open_sheet()
             self._ensure_headers()
+            
+            # Coalescing writer: all update_* cell writes go out in one batch per flush window,
+            # logged durably first so a Sheets outage or restart doesn't lose them
+            self.writer = SheetWriteBuffer(
+                self.sheet, self._get_expected_headers(),
+                max_latency=SHEETS_WRITE_MAX_LATENCY, max_batch=SHEETS_WRITE_MAX_BATCH,
+                bucket='sheets_write', wal=open_write_log(SHEETS_WAL_PATH, SHEETS_WAL_SYNC))
+            self._finish_layout_change()
+            self.writer.replay_log()
+            
+            # Append cursor (next free row) and next signal number, refreshed on every reconcile.
+            # Threaded writers look a row up without it, then write under it only if
+            # _layout_generation (bumped by every row deletion) hasn't moved meanwhile.
+            self._append_lock = threading.Lock()
+            self._layout_generation = 0
+            self._next_row_index = 2
+            self._next_number = 1
+            # Held while rows are deleted from the sheet so a reconcile can't read a shifting layout
+            self._layout_lock = threading.Lock()
+            
+            # Write-through cache of every row; loaded once, reconciled periodically
+            self.store = SignalStore()
+            self.reconcile_store()
+            metrics.add_collector(self._collect_metrics)
             logger.success("Google Sheets connection established")
         except Exception as e:
             logger.error(f"Failed to initialize Google Sheets: {e}", exc_info=True)
             raise
     
+    def _open_sheet(self):
+        """Authorize with the service account and return the first worksheet"""
+        scope = ['https://spreadsheets.google.com/feeds',
+                 'https://www.googleapis.com/auth/drive']
+        creds = ServiceAccountCredentials.from_json_keyfile_name(
+            GOOGLE_SERVICE_ACCOUNT_JSON, scope)
+        self.client = gspread.authorize(creds)
+        return self.client.open_by_key(GOOGLE_SHEET_ID).sheet1
+    
     def _get_expected_headers(self):
         """Return list of expected headers for the sheet"""
         return [
@@ -43,194 +107,621 @@ class SheetsHandler:
         try:
             headers = self._get_expected_headers()
             
-            existing_headers = self.sheet.row_values(1)
+            existing_headers = call_blocking('sheets_read', self.sheet.row_values, 1)
             if not existing_headers or existing_headers != headers:
-                self.sheet.insert_row(headers, 1)
+                call_blocking('sheets_write', self.sheet.insert_row, headers, 1)
                 logger.info("📊 Headers updated in spreadsheet")
         except Exception as e:
             logger.error(f"Error ensuring headers: {e}", exc_info=True)
     
     def append_signal(self, data):
         """Append new signal to sheet"""
+        numbers = self.append_signals([data])
+        return numbers[0]
+    
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
+    def append_signals(self, signals):
+        """Append several signals as full-row writes, sent together in one batch
+        
+        The next free row comes from an in-memory cursor (set on every reconcile)
+        instead of downloading the whole sheet per signal. Rows go through the
+        write buffer (and its write-ahead log), so a Sheets outage delays them
+        rather than losing them. Returns the signal numbers in input order, or
+        None for each signal if the rows could not be queued.
+        """
+        if not signals:
+            return []
         try:
-            all_values = self.sheet.get_all_values()
-            next_number = len(all_values)  # Header is row 1, so this gives correct number
-            
-            row = [
-                next_number,
-                data.get('timestamp_received', ''),
-                data.get('channel_id', ''),
-                data.get('channel_name', ''),
-                data.get('message_id', ''),
-                data.get('ca', ''),
-                data.get('token_name', ''),
-                data.get('chain', ''),
-                data.get('price_entry', ''),
-                data.get('mc_entry', ''),
-                data.get('liquidity', ''),
-                data.get('volume_24h', ''),
-                data.get('bundles_percent', ''),
-                data.get('snipers_percent', ''),
-                data.get('dev_percent', ''),
-                data.get('confidence_score', ''),
-                data.get('price_5min', ''),
-                data.get('mc_5min', ''),
-                data.get('change_5min', ''),
-                data.get('price_10min', ''),
-                data.get('mc_10min', ''),
-                data.get('change_10min', ''),
-                data.get('price_15min', ''),
-                data.get('mc_15min', ''),
-                data.get('change_15min', ''),
-                data.get('price_30min', ''),
-                data.get('mc_30min', ''),
-                data.get('change_30min', ''),
-                data.get('price_60min', ''),
-                data.get('mc_60min', ''),
-                data.get('change_60min', ''),
-                data.get('peak_mc', ''),
-                data.get('peak_multiplier', ''),
-                data.get('current_status', ''),
-                data.get('alert_2x_time', ''),
-                data.get('alert_3x_time', ''),
-                data.get('alert_5x_time', ''),
-                data.get('alert_10x_time', ''),
-                data.get('alert_history_last', ''),
-                data.get('update_history', ''),
-                data.get('error_log', ''),
-                data.get('link_dexscreener', ''),
-                data.get('link_pump', ''),
-                data.get('timestamp_received', ''),  # last_update_time
-                '0',  # update_count
-                data.get('price_entry', ''),  # current_price_live
-                data.get('mc_entry', ''),  # current_mc_live
-                '0%',  # current_gain_live
-                '',  # pump_10_time
-                '',  # pump_20_time
-                '',  # pump_30_time
-                '',  # pump_40_time
-                '',  # pump_50_time
-                '',  # pump_60_time
-                '',  # pump_70_time
-                '',  # pump_80_time
-                '',  # pump_90_time
-                '',  # pump_100_time
-                data.get('price_entry', ''),  # ath_price (start with entry)
-                data.get('mc_entry', ''),  # ath_mc (start with entry)
-                '0%',  # ath_gain_percent
-                data.get('timestamp_received', '')  # ath_time (start with signal time)
-            ]
-            
-            # Use update() instead of append_row() for better reliability
-            # append_row() sometimes fails silently, update() works consistently
-            next_row_index = len(all_values) + 1
-            range_name = f'A{next_row_index}:BJ{next_row_index}'  # A to BJ (62 columns)
-            self.sheet.update(values=[row], range_name=range_name)
-            
-            logger.success(f"Signal saved to sheet row {next_row_index}: {data.get('token_name')} ({data.get('ca', '')[:8]}...)")
-            return next_number
+            with self._append_lock:
+                if not self.store.loaded:
+                    # No successful reconcile yet, so the cursor is unknown: count rows once
+                    all_values = call_blocking('sheets_read', self.sheet.get_all_values)
+                    self._next_row_index = max(len(all_values) + 1, self._next_pending_row())
+                    self._next_number = max(self._next_number, self._next_row_index - 1)
+                first_row_index = self._next_row_index
+                # Numbers keep counting after archived rows leave the sheet, so they can differ from row - 1
+                rows = [self._build_row(self._next_number + offset, data)
+                        for offset, data in enumerate(signals)]
+                last_row_index = first_row_index + len(rows) - 1
+                
+                # Written as explicit A..BJ cells instead of append_row()/append_rows():
+                # append_row() sometimes fails silently, and explicit rows replay idempotently
+                headers = self._get_expected_headers()
+                for offset, row in enumerate(rows):
+                    record = dict(zip(headers, row))
+                    self.writer.queue(first_row_index + offset, record)
+                    self.store.add(first_row_index + offset, record)
+                self._next_row_index = last_row_index + 1
+                self._next_number += len(rows)
+            
+            # New rows shouldn't wait for the flush window; flush inline if no flusher is running
+            if not self.writer.request_flush():
+                self.writer.flush()
+            
+            for offset, data in enumerate(signals):
+                logger.success(f"Signal queued for sheet row {first_row_index + offset}: {data.get('token_name')} ({data.get('ca', '')[:8]}...)")
+            if len(rows) > 1:
+                logger.info(f"🧾 {len(rows)} signals appended in one batch (rows {first_row_index}-{last_row_index})")
+            return [row[0] for row in rows]
             
         except Exception as e:
             logger.error(f"Error appending signal to sheet: {e}", exc_info=True)
-            return None
+            return [None] * len(signals)
+    
+    def _build_row(self, number, data):
+        """Build the full sheet row (A..BJ) for a new signal"""
+        return [
+            number,
+            data.get('timestamp_received', ''),
+            data.get('channel_id', ''),
+            data.get('channel_name', ''),
+            data.get('message_id', ''),
+            data.get('ca', ''),
+            data.get('token_name', ''),
+            data.get('chain', ''),
+            data.get('price_entry', ''),
+            data.get('mc_entry', ''),
+            data.get('liquidity', ''),
+            data.get('volume_24h', ''),
+            data.get('bundles_percent', ''),
+            data.get('snipers_percent', ''),
+            data.get('dev_percent', ''),
+            data.get('confidence_score', ''),
+            data.get('price_5min', ''),
+            data.get('mc_5min', ''),
+            data.get('change_5min', ''),
+            data.get('price_10min', ''),
+            data.get('mc_10min', ''),
+            data.get('change_10min', ''),
+            data.get('price_15min', ''),
+            data.get('mc_15min', ''),
+            data.get('change_15min', ''),
+            data.get('price_30min', ''),
+            data.get('mc_30min', ''),
+            data.get('change_30min', ''),
+            data.get('price_60min', ''),
+            data.get('mc_60min', ''),
+            data.get('change_60min', ''),
+            data.get('peak_mc', ''),
+            data.get('peak_multiplier', ''),
+            data.get('current_status', ''),
+            data.get('alert_2x_time', ''),
+            data.get('alert_3x_time', ''),
+            data.get('alert_5x_time', ''),
+            data.get('alert_10x_time', ''),
+            data.get('alert_history_last', ''),
+            data.get('update_history', ''),
+            data.get('error_log', ''),
+            data.get('link_dexscreener', ''),
+            data.get('link_pump', ''),
+            data.get('timestamp_received', ''),  # last_update_time
+            '0',  # update_count
+            data.get('price_entry', ''),  # current_price_live
+            data.get('mc_entry', ''),  # current_mc_live
+            '0%',  # current_gain_live
+            '',  # pump_10_time
+            '',  # pump_20_time
+            '',  # pump_30_time
+            '',  # pump_40_time
+            '',  # pump_50_time
+            '',  # pump_60_time
+            '',  # pump_70_time
+            '',  # pump_80_time
+            '',  # pump_90_time
+            '',  # pump_100_time
+            data.get('price_entry', ''),  # ath_price (start with entry)
+            data.get('mc_entry', ''),  # ath_mc (start with entry)
+            '0%',  # ath_gain_percent
+            data.get('timestamp_received', '')  # ath_time (start with signal time)
+        ]
     
     def get_active_signals(self):
-        """Get all active signals for tracking"""
+        """Get all active signals for tracking (served from the in-memory store)"""
+        return self.store.active_signals()
+    
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
+    def reconcile_store(self):
+        """Re-read the sheet into the in-memory store (picks up manual edits)
+        
+        With projected reads, inactive rows only carry INDEX_COLUMNS and active
+        rows everything except COLD_COLUMNS.
+        """
+        # Count failed attempts too, so a Sheets outage doesn't turn into a retry storm
+        self._last_reconcile_attempt = self._last_sync_attempt = time.monotonic()
         try:
             # Use expected_headers to avoid duplicate column error
             expected_headers = self._get_expected_headers()
-            all_records = self.sheet.get_all_records(expected_headers=expected_headers)
-            active_signals = []
-            
-            for idx, record in enumerate(all_records, start=2):  # Start at 2 (skip header)
-                if record.get('current_status') == 'active':
+            # Hold the append lock so a concurrent append can't be lost between read and load,
+            # and hold flushes so no buffered write reaches the sheet after the read but is
+            # gone from pending_fields() by the time it is overlaid
+            with self._layout_lock, self._append_lock, self.writer.hold_flushes():
+                if SHEETS_PROJECTED_READS:
+                    all_records = self._read_projected_records()
+                else:
+                    all_records = call_blocking('sheets_read', self.sheet.get_all_records,
+                                                expected_headers=expected_headers)
+                
+                for idx, record in enumerate(all_records, start=2):  # Start at 2 (skip header)
                     record['row_index'] = idx
-                    active_signals.append(record)
-            
-            return active_signals
+                
+                self.store.load(all_records)
+                # Rows deleted by hand in the sheet may have shifted under earlier lookups
+                self._layout_generation += 1
+                
+                # Writes still waiting in the buffer are newer than what we just read;
+                # rows whose append hasn't reached the sheet yet are re-added
+                for row_index, fields in self.writer.pending_fields().items():
+                    if not self.store.update(row_index, fields):
+                        self.store.add(row_index, fields)
+                self._next_row_index = max(len(all_records) + 2, self._next_pending_row())
+                self._next_number = max(self._next_row_index - 1, self._max_signal_number() + 1)
+            logger.debug(f"Signal store reconciled: {len(all_records)} rows")
+            return True
         except Exception as e:
-            logger.error(f"Error getting active signals: {e}", exc_info=True)
-            return []
+            logger.error(f"Error reconciling signal store: {e}", exc_info=True)
+            return False
+    
+    def _read_projected_records(self):
+        """Two-step reconcile read: index columns of every row, then the hot columns of active rows
+        
+        Returns records in sheet order like get_all_records(), with values numericised the same way.
+        """
+        headers = self._get_expected_headers()
+        groups = self._column_groups(INDEX_COLUMNS)
+        # Open-ended ranges (e.g. A2:F) so the row count comes with the first read
+        ranges = [f"{rowcol_to_a1(2, first)}:{rowcol_to_a1(1, last)[:-1]}" for first, last in groups]
+        results = call_blocking('sheets_read', self.sheet.batch_get, ranges)
+        
+        row_count = max((len(values) for values in results), default=0)
+        records = [dict.fromkeys(INDEX_COLUMNS, '') for _ in range(row_count)]
+        for (first, last), values in zip(groups, results):
+            fields = headers[first - 1:last]
+            for record, row in zip(records, values):
+                record.update(zip(fields, numericise_all(list(row) + [''] * (len(fields) - len(row)))))
+        
+        hot_fields = [field for field in headers if field not in INDEX_COLUMNS and field not in COLD_COLUMNS]
+        active_rows = [idx for idx, record in enumerate(records, start=2) if record['current_status'] == 'active']
+        for row_index, fields in self.read_rows(active_rows, hot_fields).items():
+            records[row_index - 2].update(fields)
+        logger.debug(f"Projected read: {row_count} rows, {len(active_rows)} active")
+        return records
+    
+    def read_rows(self, row_indexes, fields=None):
+        """Read some columns (default: all) of specific rows with batched range reads (blocking)
+        
+        Returns:
+            {row_index: {field: value}}, values numericised like get_all_records()
+        """
+        headers = self._get_expected_headers()
+        fields = headers if fields is None else fields
+        rows = {row_index: dict.fromkeys(fields, '') for row_index in row_indexes}
+        
+        # One range per (contiguous row run, contiguous column group)
+        runs = []
+        for row_index in sorted(rows):
+            if runs and runs[-1][1] == row_index - 1:
+                runs[-1][1] = row_index
+            else:
+                runs.append([row_index, row_index])
+        ranges = [(start, first, last, f"{rowcol_to_a1(start, first)}:{rowcol_to_a1(end, last)}")
+                  for start, end in runs for first, last in self._column_groups(fields)]
+        
+        for offset in range(0, len(ranges), MAX_RANGES_PER_READ):
+            chunk = ranges[offset:offset + MAX_RANGES_PER_READ]
+            results = call_blocking('sheets_read', self.sheet.batch_get, [entry[3] for entry in chunk])
+            for (start, first, last, _), values in zip(chunk, results):
+                group_fields = headers[first - 1:last]
+                for row_offset, row in enumerate(values):
+                    padded = list(row) + [''] * (len(group_fields) - len(row))
+                    rows[start + row_offset].update(zip(group_fields, numericise_all(padded)))
+        return rows
+    
+    def _column_groups(self, fields):
+        """Contiguous (first_col, last_col) runs covering the given header fields"""
+        headers = self._get_expected_headers()
+        groups = []
+        for col in sorted(headers.index(field) + 1 for field in fields):
+            if groups and groups[-1][1] == col - 1:
+                groups[-1][1] = col
+            else:
+                groups.append([col, col])
+        return [tuple(group) for group in groups]
+    
+    def _max_signal_number(self):
+        """Highest signal number ('nomor') in the store, 0 if none"""
+        numbers = [int(clean_numeric_value(record.get('nomor'))) for record in self.store.records()]
+        return max(numbers, default=0)
+    
+    def _next_pending_row(self):
+        """First row after any row still waiting in the write buffer"""
+        pending_rows = self.writer.pending_fields()
+        return max(pending_rows) + 1 if pending_rows else 2
+    
+    def get_signal(self, row_index):
+        """Get a single signal row from the in-memory store (or None)"""
+        return self.store.get(row_index)
+    
+    def signals_version(self):
+        """Counter that changes whenever signals are added or change status/CA"""
+        return self.store.version
+    
+    def on_signals_changed(self, callback):
+        """Register callback() for new signals and status/CA changes"""
+        self.store.add_listener(callback)
+    
+    def seconds_until_reconcile(self):
+        """Seconds left until the next periodic store reconcile or incremental sync is due"""
+        now = time.monotonic()
+        remaining = SIGNAL_STORE_RECONCILE_INTERVAL - (now - self._last_reconcile_attempt)
+        if self.store_sync_interval > 0:
+            remaining = min(remaining, self.store_sync_interval - (now - self._last_sync_attempt))
+        return max(0.0, remaining)
+    
+    def maybe_reconcile_store(self):
+        """Reconcile the store with the sheet if the reconcile interval has passed,
+        otherwise sync changed rows if the sync interval has"""
+        now = time.monotonic()
+        if now - self._last_reconcile_attempt >= SIGNAL_STORE_RECONCILE_INTERVAL:
+            return self.reconcile_store()
+        if self.store_sync_interval > 0 and now - self._last_sync_attempt >= self.store_sync_interval:
+            return self.sync_store()
+        return False
+    
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
+    def sync_store(self):
+        """Pick up hand edits without a full reload
+        
+        Reads only FINGERPRINT_COLUMNS of every row, compares them with the
+        store and re-reads the rows that differ. Rows with writes still in the
+        buffer are skipped (ours are newer). Inserted or deleted rows shift the
+        layout, so those fall back to a full reconcile_store(). Edits to other
+        columns are picked up by the next full reconcile.
+        """
+        self._last_sync_attempt = time.monotonic()
+        if not self.store.loaded:
+            return self.reconcile_store()
+        try:
+            # No flush may land between the read and the store update, and no rows may be deleted
+            with self._layout_lock, self.writer.hold_flushes():
+                changed = self._changed_rows()
+                if changed is None:
+                    layout_changed = True
+                else:
+                    layout_changed = False
+                    self._refresh_rows(changed)
+            if layout_changed:
+                logger.info("🔄 Sheet rows were inserted or deleted by hand - reloading the store")
+                return self.reconcile_store()
+            if changed:
+                logger.info(f"🔄 Picked up hand edits in {len(changed)} rows: {', '.join(map(str, changed[:10]))}"
+                            + ("..." if len(changed) > 10 else ""))
+            return True
+        except Exception as e:
+            logger.error(f"Error syncing signal store: {e}", exc_info=True)
+            return False
+    
+    def _changed_rows(self):
+        """Row indexes whose fingerprint differs from the store, or None if the row layout changed"""
+        headers = self._get_expected_headers()
+        groups = self._column_groups(FINGERPRINT_COLUMNS)
+        ranges = [f"{rowcol_to_a1(2, first)}:{rowcol_to_a1(1, last)[:-1]}" for first, last in groups]
+        results = call_blocking('sheets_read', self.sheet.batch_get, ranges)
+        
+        row_count = max((len(values) for values in results), default=0)
+        sheet_rows = [dict.fromkeys(FINGERPRINT_COLUMNS, '') for _ in range(row_count)]
+        for (first, last), values in zip(groups, results):
+            fields = headers[first - 1:last]
+            for sheet_row, row in zip(sheet_rows, values):
+                sheet_row.update(zip(fields, numericise_all(list(row) + [''] * (len(fields) - len(row)))))
+        
+        pending = self.writer.pending_fields()
+        stored = {record['row_index']: record for record in self.store.records()}
+        changed = []
+        for row_index, sheet_row in enumerate(sheet_rows, start=2):
+            if row_index in pending:
+                continue
+            record = stored.pop(row_index, None)
+            if record is None:
+                changed.append(row_index)  # added by hand below the last row
+                continue
+            if any(self._fingerprint_value(record.get(field, '')) != self._fingerprint_value(sheet_row[field])
+                   for field in ('nomor', 'ca')):
+                return None
+            if any(self._fingerprint_value(record.get(field, '')) != self._fingerprint_value(sheet_row[field])
+                   for field in FINGERPRINT_COLUMNS):
+                changed.append(row_index)
+        
+        # Stored rows missing from the sheet were deleted by hand (unless their append is still pending)
+        if any(row_index not in pending for row_index in stored):
+            return None
+        return changed
+    
+    def _refresh_rows(self, row_indexes):
+        """Re-read rows into the store with the columns a reconcile would load for them"""
+        if not row_indexes:
+            return
+        headers = self._get_expected_headers()
+        rows = self.read_rows(row_indexes, INDEX_COLUMNS)
+        active = [row_index for row_index, fields in rows.items() if fields['current_status'] == 'active']
+        if SHEETS_PROJECTED_READS:
+            hot_fields = [field for field in headers if field not in INDEX_COLUMNS and field not in COLD_COLUMNS]
+        else:
+            hot_fields = [field for field in headers if field not in INDEX_COLUMNS]
+        for row_index, fields in self.read_rows(active, hot_fields).items():
+            rows[row_index].update(fields)
+        
+        # Writes queued while reading are newer than the sheet
+        pending = self.writer.pending_fields()
+        for row_index, fields in rows.items():
+            fields.update(pending.get(row_index, {}))
+            if not self.store.update(row_index, fields):
+                self.store.add(row_index, fields)
     
+    @staticmethod
+    def _fingerprint_value(value):
+        """Comparable form of a cell value (store floats vs. numericised sheet text)"""
+        if isinstance(value, bool):
+            return str(value)
+        if isinstance(value, (int, float)):
+            return float(value)
+        return str(value).strip()
+    
+    @contextmanager
+    def layout_change(self):
+        """Hold reconciles, appends, threaded row lookups and sheet flushes while rows are deleted"""
+        with self._layout_lock, self._append_lock, self.writer.hold_flushes():
+            yield
+    
+    def delete_rows(self, row_indexes):
+        """Delete rows from the sheet and shift every in-memory row index (store, write
+        buffer, write-ahead log, append cursor) up past them (blocking)
+        
+        Call with layout_change() held. The new layout is noted in the write-ahead
+        log before the deletion is sent, so after a crash in between the logged
+        cells are replayed onto the rows they belong to.
+        
+        Returns:
+            ({old_row_index: new_row_index} for the rows kept, pending cells dropped)
+        """
+        deleted = sorted(set(row_indexes))
+        deleted_set = set(deleted)
+        pending = self.writer.pending_fields()
+        rows = {record['row_index'] for record in self.store.records()}
+        rows.update(pending)
+        mapping = {row_index: row_index - bisect.bisect_left(deleted, row_index)
+                   for row_index in rows if row_index not in deleted_set}
+        
+        wal = self.writer.wal
+        probe = self._layout_probe(mapping, pending, deleted)
+        if wal is not None:
+            wal.begin_layout_change(mapping, probe)
+        try:
+            self.delete_sheet_rows(deleted)
+        except Exception:
+            # The request may have reached the sheet even though it failed here;
+            # only a re-read showing the new layout lets the remap go ahead
+            try:
+                applied = self._layout_change_applied(probe)
+            except Exception as e:
+                logger.error(f"Could not check whether the row deletion reached the sheet: {e}")
+                applied = False
+            if not applied:
+                if wal is not None:
+                    wal.abort_layout_change()
+                raise
+            logger.warning("Row deletion reported an error but reached the sheet")
+        
+        self.store.remap(mapping)
+        dropped = self.writer.remap(mapping)
+        self._next_row_index -= bisect.bisect_left(deleted, self._next_row_index)
+        self._layout_generation += 1
+        return mapping, dropped
+    
+    def _layout_probe(self, mapping, pending, deleted):
+        """One row that tells whether a deletion reached the sheet (None if no row can)
+        
+        Either a kept row that moves, as it will read after the deletion, or when
+        no kept row moves, a deleted row as it reads now (marked 'deleted').
+        """
+        # Rows whose append is still buffered aren't in the sheet, so they can't tell
+        moved = sorted((old, new) for old, new in mapping.items()
+                       if old != new and 'nomor' not in pending.get(old, {}))
+        if moved:
+            old, new = moved[0]
+            return {'row': new, 'nomor': self.store.get_field(old, 'nomor', ''), 'ca': self.store.get_field(old, 'ca', '')}
+        for row_index in deleted:
+            nomor = self.store.get_field(row_index, 'nomor', '')
+            ca = self.store.get_field(row_index, 'ca', '')
+            if nomor != '' or ca:
+                return {'row': row_index, 'nomor': nomor, 'ca': ca, 'deleted': True}
+        return None
+    
+    def _layout_change_applied(self, probe):
+        """True if the sheet already shows the layout a noted row deletion leads to
+        
+        A deletion without a probe can't be confirmed and counts as not applied.
+        """
+        if probe is None:
+            return False
+        values = call_blocking('sheets_read', self.sheet.row_values, probe['row'])
+        row = dict(zip(self._get_expected_headers(), numericise_all(list(values))))
+        matches = all(self._fingerprint_value(row.get(field, '')) == self._fingerprint_value(probe[field])
+                      for field in ('nomor', 'ca'))
+        # A deleted row is gone once its index holds anything else (a later row or nothing)
+        return not matches if probe.get('deleted') else matches
+    
+    def _finish_layout_change(self):
+        """Settle a row deletion interrupted by a restart, before the write-ahead log is replayed"""
+        wal = self.writer.wal
+        change = wal.pending_layout_change() if wal is not None else None
+        if change is None:
+            return
+        mapping, probe = change
+        if self._layout_change_applied(probe):
+            wal.remap(mapping)
+            logger.info("♻️ Interrupted row deletion reached the sheet - logged writes moved to the new rows")
+        else:
+            wal.abort_layout_change()
+            logger.info("♻️ Interrupted row deletion not found on the sheet - logged writes kept")
+    
+    def delete_sheet_rows(self, row_indexes):
+        """Delete rows from the worksheet in one atomic batchUpdate (blocking)
+        
+        Contiguous rows become one deleteDimension request; requests run bottom-up
+        so earlier deletions don't shift later ones. Use delete_rows() to keep the
+        in-memory row indexes in step.
+        """
+        runs = []
+        for row_index in sorted(row_indexes, reverse=True):
+            if runs and runs[-1][0] == row_index + 1:
+                runs[-1][0] = row_index
+            else:
+                runs.append([row_index, row_index])
+        requests = [{
+            'deleteDimension': {
+                'range': {'sheetId': self.sheet.id, 'dimension': 'ROWS',
+                          'startIndex': start - 1, 'endIndex': end}
+            }
+        } for start, end in runs]
+        call_blocking('sheets_write', self.sheet.spreadsheet.batch_update, {'requests': requests})
+        return len(runs)
+    
+    def _write_fields(self, row_index, fields):
+        """Queue cell writes for a row in the write buffer and apply them to the store"""
+        self.writer.queue(row_index, fields)
+        self.store.update(row_index, fields)
+    
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
+    def apply_changes(self, changes):
+        """Apply [(row_index, fields)] cell changes, e.g. a whole tracker tick"""
+        for row_index, fields in changes:
+            try:
+                self._write_fields(row_index, fields)
+            except Exception as e:
+                logger.error(f"Error applying changes to row {row_index}: {e}", exc_info=True)
+    
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
+    def flush_writes(self):
+        """Flush buffered cell writes to the sheet now (blocking)"""
+        return self.writer.flush()
+    
+    def request_flush(self):
+        """Ask the background flusher to send pending writes as one batch"""
+        return self.writer.request_flush()
+    
+    async def run_write_flusher(self):
+        """Background task that flushes the write buffer every flush window"""
+        await self.writer.run()
+    
+    def describe_storage(self):
+        """One-line storage status for the hourly report"""
+        text = f"Google Sheets, {len(self.store)} rows, {self.writer.pending_count()} cells buffered"
+        if self.writer.wal is not None:
+            text += f" (write-ahead log: {self.writer.wal.summary()})"
+        return text
+    
+    def _collect_metrics(self):
+        STORAGE_ROWS.set(len(self.store))
+        WRITE_BUFFER_CELLS.set(self.writer.pending_count())
+        if self.writer.wal is not None:
+            WRITE_LOG_CELLS.set(self.writer.wal.count())
+    
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
     def update_tracking_data(self, row_index, interval, price, mc, change):
         """Update tracking columns for specific interval"""
         try:
-            # Column mapping (adjusted after adding message_id column - all shifted by 1)
-            col_mapping = {
-                5: {'price': 'Q', 'mc': 'R', 'change': 'S'},
-                10: {'price': 'T', 'mc': 'U', 'change': 'V'},
-                15: {'price': 'W', 'mc': 'X', 'change': 'Y'},
-                30: {'price': 'Z', 'mc': 'AA', 'change': 'AB'},
-                60: {'price': 'AC', 'mc': 'AD', 'change': 'AE'}
-            }
-            
-            cols = col_mapping.get(interval)
-            if not cols:
+            if interval not in (5, 10, 15, 30, 60):
                 return
             
-            updates = [
-                {'range': f"{cols['price']}{row_index}", 'values': [[price]]},
-                {'range': f"{cols['mc']}{row_index}", 'values': [[mc]]},
-                {'range': f"{cols['change']}{row_index}", 'values': [[change]]}
-            ]
-            
-            self.sheet.batch_update(updates)
-            logger.debug(f"Updated {interval}min data for row {row_index}")
+            self._write_fields(row_index, {
+                f'price_{interval}min': price,
+                f'mc_{interval}min': mc,
+                f'change_{interval}min': change
+            })
+            logger.debug("Updated %smin data for row %s", interval, row_index)
             
         except Exception as e:
             logger.error(f"Error updating tracking data: {e}", exc_info=True)
     
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
     def update_peak_and_alerts(self, row_index, peak_mc, peak_mult, alert_history_last, alert_times):
         """Update peak MC, multiplier, and alert data"""
         try:
-            updates = [
-                {'range': f"AF{row_index}", 'values': [[peak_mc]]},  # peak_mc (shifted)
-                {'range': f"AG{row_index}", 'values': [[peak_mult]]},  # peak_multiplier (shifted)
-                {'range': f"AM{row_index}", 'values': [[alert_history_last]]}  # alert_history_last (shifted)
-            ]
-            
-            # Update alert timestamp columns (all shifted by 1)
-            alert_col_mapping = {2: 'AI', 3: 'AJ', 5: 'AK', 10: 'AL'}
+            fields = {
+                'peak_mc': peak_mc,
+                'peak_multiplier': peak_mult,
+                'alert_history_last': alert_history_last
+            }
+            
+            # Update alert timestamp columns
             for mult, timestamp in alert_times.items():
-                if mult in alert_col_mapping and timestamp:
-                    updates.append({
-                        'range': f"{alert_col_mapping[mult]}{row_index}",
-                        'values': [[timestamp]]
-                    })
+                if mult in (2, 3, 5, 10) and timestamp:
+                    fields[f'alert_{mult}x_time'] = timestamp
             
-            self.sheet.batch_update(updates)
-            logger.debug(f"Updated peak/alerts for row {row_index}")
+            self._write_fields(row_index, fields)
+            logger.debug("Updated peak/alerts for row %s", row_index)
             
         except Exception as e:
             logger.error(f"Error updating peak/alerts: {e}", exc_info=True)
     
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
     def update_status(self, row_index, status):
         """Update signal status"""
         try:
-            self.sheet.update(f"AH{row_index}", [[status]])  # current_status column (shifted)
-            logger.debug(f"Status updated to '{status}' for row {row_index}")
+            self._write_fields(row_index, {'current_status': status})
+            logger.debug("Status updated to '%s' for row %s", status, row_index)
         except Exception as e:
             logger.error(f"Error updating status: {e}", exc_info=True)
     
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
     def update_live_data(self, row_index, price, mc, gain_percent, update_count):
         """Update realtime live data columns"""
         try:
             current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
-            updates = [
-                {'range': f"AR{row_index}", 'values': [[current_time]]},  # last_update_time
-                {'range': f"AS{row_index}", 'values': [[update_count]]},  # update_count
-                {'range': f"AT{row_index}", 'values': [[price]]},  # current_price_live
-                {'range': f"AU{row_index}", 'values': [[mc]]},  # current_mc_live
-                {'range': f"AV{row_index}", 'values': [[f"{gain_percent:.2f}%"]]}  # current_gain_live
-            ]
-            
-            self.sheet.batch_update(updates)
-            logger.debug(f"Live data updated for row {row_index}: {gain_percent:.2f}% gain")
+            self._write_fields(row_index, {
+                'last_update_time': current_time,
+                'update_count': update_count,
+                'current_price_live': price,
+                'current_mc_live': mc,
+                'current_gain_live': f"{gain_percent:.2f}%"
+            })
+            logger.debug("Live data updated for row %s: %.2f%% gain", row_index, gain_percent)
             
         except Exception as e:
             logger.error(f"Error updating live data: {e}", exc_info=True)
     
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
     def update_pump_milestones(self, row_index, milestones_dict):
         """Update pump milestone timestamps
         
@@ -243,69 +734,95 @@ class SheetsHandler:
             if not milestones_dict:
                 return
             
-            # Column mapping for pump milestones (AW to BF)
-            milestone_columns = {
-                10: 'AW',   # pump_10_time
-                20: 'AX',   # pump_20_time
-                30: 'AY',   # pump_30_time
-                40: 'AZ',   # pump_40_time
-                50: 'BA',   # pump_50_time
-                60: 'BB',   # pump_60_time
-                70: 'BC',   # pump_70_time
-                80: 'BD',   # pump_80_time
-                90: 'BE',   # pump_90_time
-                100: 'BF'   # pump_100_time
+            # Pump milestone columns pump_10_time .. pump_100_time (AW to BF)
+            fields = {
+                f'pump_{milestone_percent}_time': timestamp
+                for milestone_percent, timestamp in milestones_dict.items()
+                if milestone_percent in (10, 20, 30, 40, 50, 60, 70, 80, 90, 100)
             }
             
-            updates = []
-            
-            for milestone_percent, timestamp in milestones_dict.items():
-                if milestone_percent in milestone_columns:
-                    updates.append({
-                        'range': f"{milestone_columns[milestone_percent]}{row_index}",
-                        'values': [[timestamp]]
-                    })
-            
-            if updates:
-                self.sheet.batch_update(updates)
+            if fields:
+                self._write_fields(row_index, fields)
                 logger.info(f"Pump milestones updated for row {row_index}: {list(milestones_dict.keys())}")
             
         except Exception as e:
             logger.error(f"Error updating pump milestones: {e}", exc_info=True)
     
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
     def update_ath(self, row_index, ath_price, ath_mc, ath_gain_percent, ath_time):
         """Update ATH (All Time High) tracking data"""
         try:
-            updates = [
-                {'range': f"BG{row_index}", 'values': [[ath_price]]},  # ath_price
-                {'range': f"BH{row_index}", 'values': [[ath_mc]]},  # ath_mc
-                {'range': f"BI{row_index}", 'values': [[f"{ath_gain_percent:.2f}%"]]},  # ath_gain_percent
-                {'range': f"BJ{row_index}", 'values': [[ath_time]]}  # ath_time
-            ]
-            
-            self.sheet.batch_update(updates)
-            logger.debug(f"ATH updated for row {row_index}: {ath_gain_percent:.2f}% gain")
+            self._write_fields(row_index, {
+                'ath_price': ath_price,
+                'ath_mc': ath_mc,
+                'ath_gain_percent': f"{ath_gain_percent:.2f}%",
+                'ath_time': ath_time
+            })
+            logger.debug("ATH updated for row %s: %.2f%% gain", row_index, ath_gain_percent)
             
         except Exception as e:
             logger.error(f"Error updating ATH: {e}", exc_info=True)
     
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
     def update_error_log(self, row_index, error_msg):
         """Update error log column"""
         try:
             # Truncate error message if too long
             truncated_error = error_msg[:500] + "..." if len(error_msg) > 500 else error_msg
-            self.sheet.update(f"AO{row_index}", [[truncated_error]])  # error_log column (shifted +2)
-            logger.debug(f"Error logged for row {row_index}: {error_msg[:50]}...")
+            self._write_fields(row_index, {'error_log': truncated_error})
+            logger.debug("Error logged for row %s: %.50s...", row_index, error_msg)
         except Exception as e:
             logger.error(f"Error updating error log: {e}")
     
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
+    def backfill_entry_data(self, channel_id, message_id, fields):
+        """Apply late DexScreener enrichment (entry price/MC etc.) to an already written signal row"""
+        try:
+            for _ in range(LAYOUT_RETRIES):
+                generation = self._layout_generation
+                row_index = self.find_row_by_message_id(message_id, channel_id)
+                if not row_index:
+                    logger.warning(f"Cannot backfill entry data - message_id {message_id} not found")
+                    return False
+            
+                row_fields = dict(fields)
+                record = self.store.get(row_index) or {}
+                # Live/ATH columns start as copies of the entry values; only fill them if the tracker hasn't yet
+                for live_field, entry_field in (('current_price_live', 'price_entry'), ('current_mc_live', 'mc_entry'),
+                                                ('ath_price', 'price_entry'), ('ath_mc', 'mc_entry')):
+                    if entry_field in row_fields and record.get(live_field) in ('', 0, '0', None):
+                        row_fields[live_field] = row_fields[entry_field]
+            
+                if self._write_if_layout_unchanged(generation, row_index, row_fields):
+                    logger.debug("Entry data backfilled for row %s: %s", row_index, ', '.join(row_fields))
+                    return True
+            logger.warning(f"Cannot backfill entry data - rows kept moving for message_id {message_id}")
+            return False
+        except Exception as e:
+            logger.error(f"Error backfilling entry data: {e}", exc_info=True)
+            return False
+    
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
     def find_row_by_ca(self, ca):
-        """Find row index by contract address"""
+        """Find row index by contract address (first matching row)"""
         try:
-            ca_column = self.sheet.col_values(6)  # Column F (ca) - shifted from E to F
+            if self.store.loaded:
+                # O(1) hash lookup in the store index, no sheet read
+                rows = self.store.rows_for_ca(ca)
+                if rows:
+                    logger.debug("Found CA %s at row %s", ca, rows[0])
+                    return rows[0]
+                logger.warning(f"CA {ca} not found in sheet")
+                return None
+            
+            ca_column = call_blocking('sheets_read', self.sheet.col_values, self._column('ca'))
             if ca in ca_column:
                 row_index = ca_column.index(ca) + 1
-                logger.debug(f"Found CA {ca} at row {row_index}")
+                logger.debug("Found CA %s at row %s", ca, row_index)
                 return row_index
             logger.warning(f"CA {ca} not found in sheet")
             return None
@@ -313,76 +830,113 @@ class SheetsHandler:
             logger.error(f"Error finding row by CA: {e}", exc_info=True)
             return None
     
-    def update_alert_from_message(self, reply_to_message_id, alert_data):
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
+    def update_alert_from_message(self, reply_to_message_id, alert_data, channel_id=None):
         """Update row when alert message is received (using reply_to_message_id)"""
         try:
-            # Find row by message_id (column E)
-            row_index = self.find_row_by_message_id(reply_to_message_id)
-            if not row_index:
-                # Fallback: try to find by CA
-                ca = alert_data.get('ca', '')
-                if ca:
-                    row_index = self.find_row_by_ca(ca)
-                
-                if not row_index:
-                    logger.warning(f"Cannot update alert - message_id {reply_to_message_id} not found")
-                    return
-            
             multiplier = alert_data.get('multiplier', 0)
             peak = alert_data.get('peak', multiplier)
             alert_time = alert_data.get('alert_time', '')
             time_elapsed = alert_data.get('time_elapsed', '')
             gain = alert_data.get('gain', multiplier)
             current_mc = alert_data.get('current_mc', 0)
+            update_msg = f"{alert_time} | {multiplier}x alert | Gain: {gain}x | MC: ${current_mc:,.0f} | Time: {time_elapsed}"
             
-            # Update peak if higher
-            current_peak = self.sheet.cell(row_index, 33).value  # peak_multiplier column (shifted by 1)
-            current_peak = float(current_peak) if current_peak else 1.0
+            # Lookups and cell reads may hit the sheet (and the rate limiter), so they run
+            # unlocked; the write is dropped and redone if rows were deleted meanwhile
+            for _ in range(LAYOUT_RETRIES):
+                generation = self._layout_generation
+                # Find row by message_id (column E), scoped to the channel when known
+                row_index = self.find_row_by_message_id(reply_to_message_id, channel_id) if reply_to_message_id else None
+                if not row_index:
+                    # Fallback: try to find by CA
+                    ca = alert_data.get('ca', '')
+                    if ca:
+                        row_index = self.find_row_by_ca(ca)
+                
+                    if not row_index:
+                        logger.warning(f"Cannot update alert - message_id {reply_to_message_id} not found")
+                        return
             
-            if peak > current_peak:
-                self.sheet.update(f"AG{row_index}", [[peak]])  # peak_multiplier (shifted)
-                logger.info(f"📈 Peak updated to {peak}x for message_id {reply_to_message_id}")
+                # Update peak if higher (read from the store, fall back to the sheet)
+                current_peak = self._read_cell(row_index, 'peak_multiplier')
+                current_peak = float(current_peak) if current_peak else 1.0
+            
+                fields = {}
+                if peak > current_peak:
+                    fields['peak_multiplier'] = peak
                 
-                if current_mc:
-                    self.sheet.update(f"AF{row_index}", [[current_mc]])  # peak_mc (shifted)
+                    if current_mc:
+                        fields['peak_mc'] = current_mc
             
-            # Update alert_history_last
-            self.sheet.update(f"AM{row_index}", [[multiplier]])
+                # Update alert_history_last
+                fields['alert_history_last'] = multiplier
             
-            # Update specific alert timestamp
-            alert_col_mapping = {2: 'AI', 3: 'AJ', 5: 'AK', 10: 'AL'}  # Shifted columns
-            if multiplier in alert_col_mapping:
-                self.sheet.update(f"{alert_col_mapping[multiplier]}{row_index}", [[alert_time]])
+                # Update specific alert timestamp
+                if multiplier in (2, 3, 5, 10):
+                    fields[f'alert_{multiplier}x_time'] = alert_time
             
-            # Update update_history column with new alert info
-            update_msg = f"{alert_time} | {multiplier}x alert | Gain: {gain}x | MC: ${current_mc:,.0f} | Time: {time_elapsed}"
-            self.append_update_history(row_index, update_msg)
+                # Update update_history column with new alert info
+                existing_history = self._read_cell(row_index, 'update_history')
+                fields['update_history'] = f"{existing_history}\n{update_msg}" if existing_history else update_msg
             
-            logger.success(f"Alert updated: {multiplier}x for message_id {reply_to_message_id}")
+                if self._write_if_layout_unchanged(generation, row_index, fields):
+                    if 'peak_multiplier' in fields:
+                        logger.info(f"📈 Peak updated to {peak}x for message_id {reply_to_message_id}")
+                    logger.success(f"Alert updated: {multiplier}x for message_id {reply_to_message_id}")
+                    return
+            logger.warning(f"Cannot update alert - rows kept moving for message_id {reply_to_message_id}")
             
         except Exception as e:
             logger.error(f"Error updating alert from message: {e}", exc_info=True)
     
-    def find_row_by_message_id(self, message_id):
-        """Find row index by message_id"""
+    def _write_if_layout_unchanged(self, generation, row_index, fields):
+        """Write a row's fields unless rows were deleted since generation was read"""
+        with self._append_lock:
+            if self._layout_generation != generation:
+                return False
+            self._write_fields(row_index, fields)
+            return True
+    
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
+    def find_row_by_message_id(self, message_id, channel_id=None):
+        """Find row index by message_id (message ids are only unique per channel)"""
         try:
-            message_id_column = self.sheet.col_values(5)  # Column E (message_id)
+            if self.store.loaded:
+                # O(1) hash lookup in the store indexes, no sheet read
+                row_index = None
+                if channel_id is not None:
+                    row_index = self.store.row_for_message(channel_id, message_id)
+                if row_index is None:
+                    rows = self.store.rows_for_message_id(message_id)
+                    row_index = rows[0] if rows else None
+                if row_index is not None:
+                    logger.debug("Found message_id %s at row %s", message_id, row_index)
+                    return row_index
+                logger.debug("message_id %s not found in sheet", message_id)
+                return None
+            
+            message_id_column = call_blocking('sheets_read', self.sheet.col_values, self._column('message_id'))
             message_id_str = str(message_id)
             if message_id_str in message_id_column:
                 row_index = message_id_column.index(message_id_str) + 1
-                logger.debug(f"Found message_id {message_id} at row {row_index}")
+                logger.debug("Found message_id %s at row %s", message_id, row_index)
                 return row_index
-            logger.debug(f"message_id {message_id} not found in sheet")
+            logger.debug("message_id %s not found in sheet", message_id)
             return None
         except Exception as e:
             logger.error(f"Error finding row by message_id: {e}", exc_info=True)
             return None
     
+    @profiler.profiled()
+    @SHEETS_METHOD_SECONDS.timed
     def append_update_history(self, row_index, update_msg):
         """Append update to update_history column"""
         try:
             # Get existing history
-            existing_history = self.sheet.cell(row_index, 39).value  # Column AN (update_history, shifted)
+            existing_history = self._read_cell(row_index, 'update_history')
             
             if existing_history:
                 new_history = f"{existing_history}\n{update_msg}"
@@ -390,8 +944,27 @@ class SheetsHandler:
                 new_history = update_msg
             
             # Update the cell
-            self.sheet.update(f"AN{row_index}", [[new_history]])
-            logger.debug(f"Update history appended for row {row_index}")
+            self._write_fields(row_index, {'update_history': new_history})
+            logger.debug("Update history appended for row %s", row_index)
             
         except Exception as e:
             logger.error(f"Error appending update history: {e}", exc_info=True)
+    
+    def _column(self, field):
+        """1-based sheet column of a header"""
+        return self._get_expected_headers().index(field) + 1
+    
+    def _read_cell(self, row_index, field):
+        """Read a cell value from the store, falling back to the sheet for unknown rows"""
+        record = self.store.get(row_index)
+        # Rows loaded by a projected reconcile don't carry every column (e.g. COLD_COLUMNS)
+        if record is not None and field in record:
+            return record[field]
+        generation = self._layout_generation
+        value = call_blocking('sheets_read', self.sheet.cell, row_index, self._column(field)).value
+        # Keep it, so the next read of this cell (e.g. the next alert) needs no sheet request,
+        # unless a row deletion may have moved another row under this index meanwhile
+        with self._append_lock:
+            if self._layout_generation == generation:
+                self.store.update(row_index, {field: value})
+        return value
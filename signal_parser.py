@@ -1,14 +1,140 @@
 import re
+import time
 from datetime import datetime
 from logger import logger
-from channel_formats import get_format_for_channel
+from metrics import metrics
+from channel_formats import get_compiled_format_for_channel
+import dexscreener_api
 
-def parse_new_signal(message_text, channel_id, channel_name, message_id):
-    """Parse new signal message from Telegram channel - supports multiple formats"""
+SIGNAL_PARSE_SECONDS = metrics.histogram('signal_parse_seconds', 'Signal message parse time per channel format')
+
+# K/M/B suffixes used by market cap, liquidity and volume fields
+UNIT_MULTIPLIERS = {'K': 1000, 'M': 1000000, 'B': 1000000000}
+
+# Characters stripped from extracted token names
+NON_NAME_CHARS = re.compile(r'[^\w\s\-]')
+
+# Keywords that disqualify a line from the token-name fallback
+TOKEN_NAME_SKIP_KEYWORDS = ['CONTRACT', 'CHAIN', 'PRICE', 'MARKET', 'LIQUIDITY', 'VOLUME', 'BUNDLES', 'SNIPERS', 'DEX', 'CONFIDENCE']
+
+# Keywords that mark a message as a new signal (plain substring checks)
+SIGNAL_KEYWORDS = ('Contract:', 'Market Cap:', 'Chain:', 'Confidence:')
+
+# Alert message fields
+ALERT_MULTIPLIER_PATTERN = re.compile(r'(\d+)x\s+ALERT', re.IGNORECASE)
+ALERT_TOKEN_PATTERN = re.compile(r'🪙\s*(.+)')
+ALERT_TIME_PATTERN = re.compile(r'⏱️\s*Time:\s*(.+)', re.IGNORECASE)
+ALERT_CA_PATTERN = re.compile(r'([A-Za-z0-9]{30,})')
+ALERT_ENTRY_MC_PATTERN = re.compile(r'Entry MC:\s*\$?([\d.]+)([KMB]?)', re.IGNORECASE)
+ALERT_CURRENT_MC_PATTERN = re.compile(r'Current MC:\s*\$?([\d.]+)([KMB]?)', re.IGNORECASE)
+ALERT_GAIN_PATTERN = re.compile(r'Gain:\s*([\d.]+)x', re.IGNORECASE)
+ALERT_PEAK_PATTERN = re.compile(r'Peak:\s*([\d.]+)x', re.IGNORECASE)
+
+
+def _scaled_value(match):
+    """Turn a (number, K/M/B unit) match into a float"""
+    value = float(match.group(1))
+    unit = match.group(2).upper() if len(match.groups()) > 1 else ''
+    return value * UNIT_MULTIPLIERS.get(unit, 1)
+
+
+def extract_signal_fields(message_text, compiled_format):
+    """Extract the signal fields with a format's precompiled patterns (no network)
+    
+    Runs one search per field pattern. A single alternation over a format's
+    labelled fields measured 0.4-0.8x as fast on the standard, compact,
+    detailed and list examples, and token_name would still need its own search.
+    """
+    patterns = compiled_format.patterns
+    data = {}
+    
+    def search(field):
+        pattern = patterns.get(field)
+        return pattern.search(message_text) if pattern else None
+    
+    # Token name, with a line-by-line fallback
+    token_match = search('token_name')
+    if token_match:
+        data['token_name'] = NON_NAME_CHARS.sub('', token_match.group(1)).strip()
+    else:
+        data['token_name'] = 'Unknown'
+        for line in message_text.strip().split('\n'):
+            cleaned_line = NON_NAME_CHARS.sub('', line).strip()
+            upper_line = line.upper()
+            if cleaned_line and cleaned_line.upper() != 'SPONSORED' and not any(
+                keyword in upper_line for keyword in TOKEN_NAME_SKIP_KEYWORDS
+            ):
+                data['token_name'] = cleaned_line
+                break
+    
+    chain_match = search('chain')
+    data['chain'] = chain_match.group(1) if chain_match else ''
+    
+    price_match = search('price')
+    data['price_entry'] = float(price_match.group(1)) if price_match else 0
+    
+    # Market cap / liquidity / volume carry K/M/B multipliers
+    for field, key in (('market_cap', 'mc_entry'), ('liquidity', 'liquidity'), ('volume_24h', 'volume_24h')):
+        match = search(field)
+        data[key] = _scaled_value(match) if match else 0
+    
+    for field, key in (('bundles', 'bundles_percent'), ('snipers', 'snipers_percent'),
+                       ('dev', 'dev_percent'), ('confidence', 'confidence_score')):
+        match = search(field)
+        data[key] = int(match.group(1)) if match else 0
+    
+    ca_match = search('ca')
+    data['ca'] = ca_match.group(1) if ca_match else ''
+    
+    # Validate CA format (basic validation)
+    if data['ca'] and len(data['ca']) < 32:
+        logger.warning(f"Invalid CA length for {data['token_name']}: {data['ca']}")
+        data['ca'] = ''  # Reset if invalid
+    
+    return data
+
+
+def classify_message(message_text):
+    """Route a message: 'alert', 'signal' or None (alerts win, as before)
+    
+    Only decides which parser to run; fields are extracted separately by
+    parse_signal_message / parse_alert_update. One precompiled alert search
+    plus substring keyword checks.
+    """
+    if ALERT_MULTIPLIER_PATTERN.search(message_text):
+        return 'alert'
+    if any(keyword in message_text for keyword in SIGNAL_KEYWORDS):
+        return 'signal'
+    return None
+
+
+async def parse_new_signal(message_text, channel_id, channel_name, message_id):
+    """Parse new signal message from Telegram channel - supports multiple formats
+    
+    Awaits DexScreener enrichment (auto-fetch formats / SPONSORED) before returning.
+    """
+    parsed = parse_signal_message(message_text, channel_id, channel_name, message_id)
+    if parsed is None:
+        return None
+    
+    data, enrichment = parsed
+    if enrichment:
+        await enrich_signal(data, enrichment)
+    return data
+
+
+def parse_signal_message(message_text, channel_id, channel_name, message_id):
+    """Parse a signal without any network calls
+    
+    Returns (data, enrichment) or None on error. enrichment is None, or a dict
+    for enrich_signal() saying whether to auto-fetch and/or fill a SPONSORED post.
+    """
+    start = time.perf_counter()
     try:
-        # Get the appropriate format for this channel
-        format_config = get_format_for_channel(channel_id)
-        logger.debug(f"Using format '{format_config['name']}' for channel {channel_name}")
+        # Get the appropriate (precompiled) format for this channel
+        compiled_format = get_compiled_format_for_channel(channel_id)
+        format_config = compiled_format.config
+        logger.debug("Using format '%s' for channel %s", format_config['name'], channel_name)
         
         data = {
             'timestamp_received': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
@@ -20,150 +146,12 @@ def parse_new_signal(message_text, channel_id, channel_name, message_id):
             'update_history': ''
         }
         
-        # Use format-specific patterns
-        patterns = format_config['patterns']
-        
-        # Extract token name using format-specific pattern
-        token_match = re.search(patterns.get('token_name', r'([A-Z][A-Za-z0-9\s\-]+)'), message_text, re.MULTILINE)
-        if token_match:
-            data['token_name'] = re.sub(r'[^\w\s\-]', '', token_match.group(1)).strip()
-        else:
-            # Fallback to line-by-line extraction
-            lines = message_text.strip().split('\n')
-            token_name_found = False
-            raw_token_name = ''
-            
-            for line in lines:
-                cleaned_line = re.sub(r'[^\w\s\-]', '', line).strip()
-                if cleaned_line and cleaned_line.upper() != 'SPONSORED' and not any(
-                    keyword in line.upper() for keyword in ['CONTRACT', 'CHAIN', 'PRICE', 'MARKET', 'LIQUIDITY', 'VOLUME', 'BUNDLES', 'SNIPERS', 'DEX', 'CONFIDENCE']
-                ):
-                    raw_token_name = cleaned_line
-                    token_name_found = True
-                    break
-            
-            data['token_name'] = raw_token_name if token_name_found else 'Unknown'
+        data.update(extract_signal_fields(message_text, compiled_format))
         
         # If sponsored message, mark it
-        if 'SPONSORED' in message_text.upper()[:50]:
-            logger.debug(f"Sponsored signal detected: {data['token_name']}")
-        
-        # Extract chain
-        if 'chain' in patterns:
-            chain_match = re.search(patterns['chain'], message_text, re.IGNORECASE | re.MULTILINE)
-            data['chain'] = chain_match.group(1) if chain_match else ''
-        else:
-            data['chain'] = ''
-        
-        # Extract price
-        if 'price' in patterns:
-            price_match = re.search(patterns['price'], message_text, re.IGNORECASE)
-            data['price_entry'] = float(price_match.group(1)) if price_match else 0
-        else:
-            data['price_entry'] = 0
-        
-        # Extract Market Cap with K/M/B multipliers
-        if 'market_cap' in patterns:
-            mc_match = re.search(patterns['market_cap'], message_text, re.IGNORECASE)
-            if mc_match:
-                mc_value = float(mc_match.group(1))
-                mc_unit = mc_match.group(2).upper() if len(mc_match.groups()) > 1 else ''
-                multipliers = {'K': 1000, 'M': 1000000, 'B': 1000000000}
-                data['mc_entry'] = mc_value * multipliers.get(mc_unit, 1)
-            else:
-                data['mc_entry'] = 0
-        else:
-            data['mc_entry'] = 0
-        
-        # Extract Liquidity
-        if 'liquidity' in patterns:
-            liq_match = re.search(patterns['liquidity'], message_text, re.IGNORECASE)
-            if liq_match:
-                liq_value = float(liq_match.group(1))
-                liq_unit = liq_match.group(2).upper() if len(liq_match.groups()) > 1 else ''
-                multipliers = {'K': 1000, 'M': 1000000, 'B': 1000000000}
-                data['liquidity'] = liq_value * multipliers.get(liq_unit, 1)
-            else:
-                data['liquidity'] = 0
-        else:
-            data['liquidity'] = 0
-        
-        # Extract Volume 24h
-        if 'volume_24h' in patterns:
-            vol_match = re.search(patterns['volume_24h'], message_text, re.IGNORECASE)
-            if vol_match:
-                vol_value = float(vol_match.group(1))
-                vol_unit = vol_match.group(2).upper() if len(vol_match.groups()) > 1 else ''
-                multipliers = {'K': 1000, 'M': 1000000, 'B': 1000000000}
-                data['volume_24h'] = vol_value * multipliers.get(vol_unit, 1)
-            else:
-                data['volume_24h'] = 0
-        else:
-            data['volume_24h'] = 0
-        
-        # Extract Bundles
-        if 'bundles' in patterns:
-            bundles_match = re.search(patterns['bundles'], message_text, re.IGNORECASE)
-            data['bundles_percent'] = int(bundles_match.group(1)) if bundles_match else 0
-        else:
-            data['bundles_percent'] = 0
-        
-        # Extract Snipers
-        if 'snipers' in patterns:
-            snipers_match = re.search(patterns['snipers'], message_text, re.IGNORECASE)
-            data['snipers_percent'] = int(snipers_match.group(1)) if snipers_match else 0
-        else:
-            data['snipers_percent'] = 0
-        
-        # Extract Dev %
-        if 'dev' in patterns:
-            dev_match = re.search(patterns['dev'], message_text, re.IGNORECASE)
-            data['dev_percent'] = int(dev_match.group(1)) if dev_match else 0
-        else:
-            data['dev_percent'] = 0
-        
-        # Extract Confidence
-        if 'confidence' in patterns:
-            conf_match = re.search(patterns['confidence'], message_text, re.IGNORECASE)
-            data['confidence_score'] = int(conf_match.group(1)) if conf_match else 0
-        else:
-            data['confidence_score'] = 0
-        
-        # Extract Contract Address (CA)
-        if 'ca' in patterns:
-            ca_match = re.search(patterns['ca'], message_text, re.IGNORECASE)
-            data['ca'] = ca_match.group(1) if ca_match else ''
-        else:
-            data['ca'] = ''
-        
-        # Validate CA format (basic validation)
-        if data['ca'] and len(data['ca']) < 32:
-            logger.warning(f"Invalid CA length for {data['token_name']}: {data['ca']}")
-            data['ca'] = ''  # Reset if invalid
-        
-        # Auto-fetch from API if format requires it
-        auto_fetch = format_config.get('auto_fetch', False)
-        if auto_fetch and data['ca']:
-            logger.info(f"🔍 Auto-fetch mode for {format_config['name']} - fetching all data from API...")
-            dex_data = fetch_dexscreener_data_sync(data['ca'])
-            
-            if dex_data:
-                # ALWAYS use token name from API for auto-fetch formats (more reliable)
-                api_token_name = dex_data.get('token_name', 'Unknown')
-                if api_token_name and api_token_name != 'Unknown':
-                    data['token_name'] = api_token_name
-                
-                # Override/fill all technical data from API
-                data['chain'] = dex_data.get('chain', 'Solana')
-                data['price_entry'] = dex_data.get('price', 0)
-                data['mc_entry'] = dex_data.get('market_cap', 0)
-                data['liquidity'] = dex_data.get('liquidity', 0)
-                data['volume_24h'] = dex_data.get('volume_24h', 0)
-                data['peak_mc'] = data['mc_entry']
-                
-                logger.success(f"✅ Auto-fetched: {data['token_name']} | Price=${data['price_entry']} | MC=${data['mc_entry']:,.0f}")
-            else:
-                logger.warning(f"⚠️ Could not auto-fetch data for CA: {data['ca'][:8]}...")
+        is_sponsored = 'SPONSORED' in message_text.upper()[:50]
+        if is_sponsored:
+            logger.debug("Sponsored signal detected: %s", data['token_name'])
         
         # Generate links
         if data['ca']:
@@ -188,69 +176,84 @@ def parse_new_signal(message_text, channel_id, channel_name, message_id):
         data['alert_10x_time'] = ''
         data['error_log'] = ''
         
+        # DexScreener enrichment is left to enrich_signal() so parsing never waits on the network
+        enrichment = None
+        if data['ca'] and (compiled_format.auto_fetch or is_sponsored):
+            enrichment = {
+                'format_name': format_config['name'],
+                'auto_fetch': compiled_format.auto_fetch,
+                'sponsored': is_sponsored
+            }
+        
+        logger.debug("Parsed signal: %s | CA: %.8s...", data['token_name'], data['ca'] or 'None')
+        SIGNAL_PARSE_SECONDS.observe(time.perf_counter() - start, format=compiled_format.name)
+        return data, enrichment
+        
+    except Exception as e:
+        logger.error(f"Error parsing signal from {channel_name}: {e}", exc_info=True)
+        return None
+
+
+async def enrich_signal(data, enrichment):
+    """Fill a parsed signal with DexScreener data; returns the fields that changed"""
+    changed = {}
+    try:
+        # Auto-fetch from API if format requires it
+        if enrichment.get('auto_fetch'):
+            logger.info(f"🔍 Auto-fetch mode for {enrichment.get('format_name')} - fetching all data from API...")
+            dex_data = await fetch_dexscreener_data(data['ca'])
+            
+            if dex_data:
+                # ALWAYS use token name from API for auto-fetch formats (more reliable)
+                api_token_name = dex_data.get('token_name', 'Unknown')
+                if api_token_name and api_token_name != 'Unknown':
+                    changed['token_name'] = api_token_name
+                
+                # Override/fill all technical data from API
+                changed['chain'] = dex_data.get('chain', 'Solana')
+                changed.update(_entry_fields(dex_data))
+                data.update(changed)
+                
+                logger.success(f"✅ Auto-fetched: {data['token_name']} | Price=${data['price_entry']} | MC=${data['mc_entry']:,.0f}")
+            else:
+                logger.warning(f"⚠️ Could not auto-fetch data for CA: {data['ca'][:8]}...")
+        
         # If SPONSORED message (missing price/mc data), fetch from DexScreener
-        is_sponsored = 'SPONSORED' in message_text.upper()[:50]
-        if is_sponsored and data['ca'] and (data['price_entry'] == 0 or data['mc_entry'] == 0):
+        if enrichment.get('sponsored') and (data['price_entry'] == 0 or data['mc_entry'] == 0):
             logger.info(f"📢 Sponsored signal detected for {data['token_name']}, fetching live data from DexScreener...")
-            dex_data = fetch_dexscreener_data_sync(data['ca'])
+            dex_data = await fetch_dexscreener_data(data['ca'])
             if dex_data:
-                data['price_entry'] = dex_data.get('price', 0)
-                data['mc_entry'] = dex_data.get('market_cap', 0)
-                data['liquidity'] = dex_data.get('liquidity', 0)
-                data['volume_24h'] = dex_data.get('volume_24h', 0)
-                data['peak_mc'] = data['mc_entry']
+                fields = _entry_fields(dex_data)
+                changed.update(fields)
+                data.update(fields)
                 logger.success(f"✅ Fetched live data: Price=${data['price_entry']}, MC=${data['mc_entry']:,.0f}")
             else:
                 logger.warning(f"⚠️ Could not fetch live data for {data['token_name']}")
-        
-        logger.debug(f"Parsed signal: {data['token_name']} | CA: {data['ca'][:8] if data['ca'] else 'None'}...")
-        return data
-        
+    
     except Exception as e:
-        logger.error(f"Error parsing signal from {channel_name}: {e}", exc_info=True)
-        return None
+        logger.error(f"Error enriching signal {data.get('ca', '')[:8]}...: {e}", exc_info=True)
+    return changed
+
 
+def _entry_fields(dex_data):
+    """Entry columns taken from a DexScreener price lookup"""
+    mc_entry = dex_data.get('market_cap', 0)
+    return {
+        'price_entry': dex_data.get('price', 0),
+        'mc_entry': mc_entry,
+        'liquidity': dex_data.get('liquidity', 0),
+        'volume_24h': dex_data.get('volume_24h', 0),
+        'peak_mc': mc_entry
+    }
 
-def fetch_dexscreener_data_sync(ca):
-    """Fetch price data from DexScreener synchronously (for signal parsing)"""
+
+async def fetch_dexscreener_data(ca):
+    """Fetch price data from DexScreener (for signal parsing) via the shared async client"""
     try:
-        import requests
-        from config import DEXSCREENER_API_BASE
-        
         if not ca or len(ca) < 32:
             return None
         
-        url = f"{DEXSCREENER_API_BASE}/tokens/{ca}"
-        response = requests.get(url, timeout=10)
-        
-        if response.status_code != 200:
-            logger.debug(f"DexScreener API returned {response.status_code} for {ca[:8]}...")
-            return None
-        
-        data = response.json()
-        
-        if not data.get('pairs'):
-            logger.debug(f"No trading pairs found for {ca[:8]}...")
-            return None
-        
-        # Get the first pair (usually the most liquid)
-        pair = data['pairs'][0]
-        
-        # Extract token info
-        base_token = pair.get('baseToken', {})
-        chain_id = pair.get('chainId', 'solana')
-        
-        result = {
-            'token_name': base_token.get('name', 'Unknown'),
-            'token_symbol': base_token.get('symbol', ''),
-            'chain': chain_id.capitalize(),
-            'price': float(pair.get('priceUsd', 0)),
-            'market_cap': float(pair.get('fdv', 0)),
-            'liquidity': float(pair.get('liquidity', {}).get('usd', 0)),
-            'volume_24h': float(pair.get('volume', {}).get('h24', 0))
-        }
-        
-        return result
+        return await dexscreener_api.fetch_token(ca)
         
     except Exception as e:
         logger.debug(f"Error fetching DexScreener data: {e}")
@@ -263,51 +266,46 @@ def parse_alert_update(message_text):
         data = {}
         
         # Extract multiplier
-        mult_match = re.search(r'(\d+)x\s+ALERT', message_text, re.IGNORECASE)
+        mult_match = ALERT_MULTIPLIER_PATTERN.search(message_text)
         if not mult_match:
             return None
         
         data['multiplier'] = int(mult_match.group(1))
         
         # Extract token name
-        token_match = re.search(r'🪙\s*(.+)', message_text)
+        token_match = ALERT_TOKEN_PATTERN.search(message_text)
         data['token_name'] = token_match.group(1).strip() if token_match else ''
         
         # Extract Time elapsed
-        time_match = re.search(r'⏱️\s*Time:\s*(.+)', message_text, re.IGNORECASE)
+        time_match = ALERT_TIME_PATTERN.search(message_text)
         data['time_elapsed'] = time_match.group(1).strip() if time_match else ''
         
         # Extract CA (if present)
-        ca_match = re.search(r'([A-Za-z0-9]{30,})', message_text)
+        ca_match = ALERT_CA_PATTERN.search(message_text)
         data['ca'] = ca_match.group(1) if ca_match else ''
         
         # Extract Entry MC
-        entry_mc_match = re.search(r'Entry MC:\s*\$?([\d.]+)([KMB]?)', message_text, re.IGNORECASE)
+        entry_mc_match = ALERT_ENTRY_MC_PATTERN.search(message_text)
         if entry_mc_match:
-            mc_value = float(entry_mc_match.group(1))
-            mc_unit = entry_mc_match.group(2).upper()
-            multipliers = {'K': 1000, 'M': 1000000, 'B': 1000000000}
-            data['entry_mc'] = mc_value * multipliers.get(mc_unit, 1)
+            data['entry_mc'] = _scaled_value(entry_mc_match)
         
         # Extract Current MC
-        current_mc_match = re.search(r'Current MC:\s*\$?([\d.]+)([KMB]?)', message_text, re.IGNORECASE)
+        current_mc_match = ALERT_CURRENT_MC_PATTERN.search(message_text)
         if current_mc_match:
-            mc_value = float(current_mc_match.group(1))
-            mc_unit = current_mc_match.group(2).upper()
-            multipliers = {'K': 1000, 'M': 1000000, 'B': 1000000000}
-            data['current_mc'] = mc_value * multipliers.get(mc_unit, 1)
+            data['current_mc'] = _scaled_value(current_mc_match)
         
         # Extract Gain
-        gain_match = re.search(r'Gain:\s*([\d.]+)x', message_text, re.IGNORECASE)
+        gain_match = ALERT_GAIN_PATTERN.search(message_text)
         data['gain'] = float(gain_match.group(1)) if gain_match else data['multiplier']
         
         # Extract Peak
-        peak_match = re.search(r'Peak:\s*([\d.]+)x', message_text, re.IGNORECASE)
+        peak_match = ALERT_PEAK_PATTERN.search(message_text)
         data['peak'] = float(peak_match.group(1)) if peak_match else data['multiplier']
         
         data['alert_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        logger.debug(f"Parsed alert: {data['multiplier']}x for {data.get('token_name', 'Unknown')} (Time: {data.get('time_elapsed', 'N/A')})")
+        logger.debug("Parsed alert: %sx for %s (Time: %s)",
+                     data['multiplier'], data.get('token_name', 'Unknown'), data.get('time_elapsed', 'N/A'))
         return data
         
     except Exception as e:
@@ -317,8 +315,7 @@ def parse_alert_update(message_text):
 
 def is_signal_message(message_text):
     """Check if message is a new signal"""
-    keywords = ['Contract:', 'Market Cap:', 'Chain:', 'Confidence:']
-    is_signal = any(keyword in message_text for keyword in keywords)
+    is_signal = any(keyword in message_text for keyword in SIGNAL_KEYWORDS)
     if is_signal:
         logger.debug("Message identified as signal")
     return is_signal
@@ -326,7 +323,7 @@ def is_signal_message(message_text):
 
 def is_alert_message(message_text):
     """Check if message is an alert update"""
-    is_alert = re.search(r'\d+x\s+ALERT', message_text, re.IGNORECASE) is not None
+    is_alert = ALERT_MULTIPLIER_PATTERN.search(message_text) is not None
     if is_alert:
         logger.debug("Message identified as alert")
     return is_alert
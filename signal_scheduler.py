@@ -0,0 +1,99 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class SignalScheduler:
+    """Min-heap of per-signal deadlines (time.monotonic() seconds)
+
+    Rescheduling or removing a key leaves its old heap entry in place; stale
+    entries are skipped when popped (lazy deletion), so every operation stays
+    O(log n).
+    """
+
+    def __init__(self):
+        self._heap = []  # (due, seq, key)
+        self._due = {}  # key -> currently valid due time
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._loop = None
+
+    def schedule(self, key, due):
+        """Set (or move) the deadline for a key"""
+        earliest = self.next_deadline()
+        self._due[key] = due
+        heapq.heappush(self._heap, (due, next(self._seq), key))
+
+        # A sleeping wait() must re-arm if this deadline comes first
+        if earliest is None or due < earliest:
+            self.wake()
+
+    def remove(self, key):
+        self._due.pop(key, None)
+
+    def keys(self):
+        return set(self._due)
+
+    def rekey(self, mapping):
+        """Rename keys ({old_key: new_key}) keeping their deadlines; unmapped keys are dropped"""
+        self._due = {mapping[key]: due for key, due in self._due.items() if key in mapping}
+        self._heap = [(due, next(self._seq), key) for key, due in self._due.items()]
+        heapq.heapify(self._heap)
+
+    def __contains__(self, key):
+        return key in self._due
+
+    def __len__(self):
+        return len(self._due)
+
+    def next_deadline(self):
+        """Earliest valid deadline, or None if nothing is scheduled"""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None):
+        """Remove and return [(key, due)] for every key whose deadline has passed"""
+        now = time.monotonic() if now is None else now
+        due_items = []
+        while self._heap and self._heap[0][0] <= now:
+            due, _, key = heapq.heappop(self._heap)
+            if self._due.get(key) != due:
+                continue  # stale entry (rescheduled or removed)
+            del self._due[key]
+            due_items.append((key, due))
+        return due_items
+
+    def wake(self):
+        """Interrupt wait() early (safe to call from any thread)"""
+        if self._loop is None or self._wakeup is None:
+            return
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def wait(self, max_sleep=None, deadlines=True):
+        """Sleep until the earliest deadline, wake(), or max_sleep seconds
+
+        With deadlines=False only wake() or max_sleep end the sleep (used while
+        due signals can't be started anyway).
+        """
+        if self._wakeup is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+
+        deadline = self.next_deadline() if deadlines else None
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if max_sleep is not None:
+            timeout = max_sleep if timeout is None else min(timeout, max_sleep)
+
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    def _drop_stale(self):
+        while self._heap:
+            due, _, key = self._heap[0]
+            if self._due.get(key) == due:
+                return
+            heapq.heappop(self._heap)
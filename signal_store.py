@@ -0,0 +1,209 @@
+import threading
+import time
+from logger import logger
+
+
+class SignalStore:
+    """In-memory copy of the signal rows, kept current by SheetsHandler writes
+
+    Rows are keyed by their sheet row index, with secondary hash indexes
+    (CA -> rows, message_id -> rows, (channel_id, message_id) -> row) so the
+    tracker, heartbeat and alert routing never have to re-read the worksheet.
+    """
+
+    # Fields that feed the secondary indexes
+    INDEXED_FIELDS = ('ca', 'channel_id', 'message_id')
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rows = {}  # row_index -> record dict (same keys as sheet headers)
+        self._rows_by_ca = {}  # ca -> set of row indexes
+        self._rows_by_message_id = {}  # str(message_id) -> set of row indexes
+        self._row_by_message = {}  # (str(channel_id), str(message_id)) -> row index
+        self.last_reconcile = None  # time.monotonic() of last full load
+        self.loaded = False
+        self.version = 0  # bumped whenever the set of active signals may have changed
+        self._listeners = []
+
+    def load(self, records):
+        """Replace the whole store with freshly read sheet records
+
+        Args:
+            records: List of dicts that already carry their 'row_index'
+        """
+        with self._lock:
+            self._rows = {}
+            self._rows_by_ca = {}
+            self._rows_by_message_id = {}
+            self._row_by_message = {}
+            for record in records:
+                self._rows[record['row_index']] = record
+                self._index_row(record['row_index'], record)
+            self.last_reconcile = time.monotonic()
+            self.loaded = True
+            self.version += 1
+
+        self._notify()
+        logger.debug(f"Signal store loaded with {len(records)} rows")
+
+    def add(self, row_index, record):
+        """Insert a newly appended row"""
+        record = dict(record)
+        record['row_index'] = row_index
+        with self._lock:
+            self._unindex_row(row_index)
+            self._rows[row_index] = record
+            self._index_row(row_index, record)
+            self.version += 1
+
+        self._notify()
+
+    def update(self, row_index, fields):
+        """Apply written cell values to a stored row (no-op if row unknown)"""
+        with self._lock:
+            record = self._rows.get(row_index)
+            if record is None:
+                return False
+            reindex = any(
+                field in fields and fields[field] != record.get(field)
+                for field in self.INDEXED_FIELDS
+            )
+            membership_changed = any(
+                field in fields and fields[field] != record.get(field)
+                for field in ('current_status', 'ca')
+            )
+            if reindex:
+                self._unindex_row(row_index)
+            record.update(fields)
+            if reindex:
+                self._index_row(row_index, record)
+            if membership_changed:
+                self.version += 1
+
+        if membership_changed:
+            self._notify()
+        return True
+
+    def get(self, row_index):
+        """Return a copy of a stored row, or None"""
+        with self._lock:
+            record = self._rows.get(row_index)
+            return dict(record) if record is not None else None
+
+    def get_field(self, row_index, field, default=None):
+        """Return a single stored value without copying the row"""
+        with self._lock:
+            record = self._rows.get(row_index)
+            if record is None:
+                return default
+            return record.get(field, default)
+
+    def rows_for_ca(self, ca):
+        """Return sorted row indexes that hold this CA"""
+        with self._lock:
+            return sorted(self._rows_by_ca.get(ca, ()))
+
+    def rows_for_message_id(self, message_id):
+        """Return sorted row indexes whose message_id matches (any channel)"""
+        with self._lock:
+            return sorted(self._rows_by_message_id.get(str(message_id), ()))
+
+    def row_for_message(self, channel_id, message_id):
+        """Return the row for a (channel_id, message_id) pair, or None"""
+        with self._lock:
+            return self._row_by_message.get((str(channel_id), str(message_id)))
+
+    def active_signals(self):
+        """Return copies of all rows whose status is 'active', in sheet order"""
+        with self._lock:
+            return [
+                dict(self._rows[row_index])
+                for row_index in sorted(self._rows)
+                if self._rows[row_index].get('current_status') == 'active'
+            ]
+
+    def records(self):
+        """Return copies of all rows, in sheet order"""
+        with self._lock:
+            return [dict(self._rows[row_index]) for row_index in sorted(self._rows)]
+
+    def remap(self, mapping):
+        """Move rows to new row indexes after rows were deleted from the sheet
+
+        Args:
+            mapping: {old_row_index: new_row_index}; rows not in it are dropped
+        """
+        with self._lock:
+            rows = self._rows
+            self._rows = {}
+            self._rows_by_ca = {}
+            self._rows_by_message_id = {}
+            self._row_by_message = {}
+            for old_row_index, record in rows.items():
+                new_row_index = mapping.get(old_row_index)
+                if new_row_index is None:
+                    continue
+                record['row_index'] = new_row_index
+                self._rows[new_row_index] = record
+                self._index_row(new_row_index, record)
+            self.version += 1
+
+        self._notify()
+
+    def max_row_index(self):
+        """Highest occupied row index (1 = header only)"""
+        with self._lock:
+            return max(self._rows) if self._rows else 1
+
+    def add_listener(self, callback):
+        """Call callback() whenever rows are added or a status/CA changes"""
+        self._listeners.append(callback)
+
+    def seconds_since_reconcile(self):
+        if self.last_reconcile is None:
+            return float('inf')
+        return time.monotonic() - self.last_reconcile
+
+    def __len__(self):
+        with self._lock:
+            return len(self._rows)
+
+    def _notify(self):
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception as e:
+                logger.debug(f"Signal store listener failed: {e}")
+
+    def _index_row(self, row_index, record):
+        """Add a row to the secondary indexes (caller holds the lock)"""
+        ca = record.get('ca', '')
+        if ca:
+            self._rows_by_ca.setdefault(ca, set()).add(row_index)
+        message_id = str(record.get('message_id', '') or '')
+        if message_id:
+            self._rows_by_message_id.setdefault(message_id, set()).add(row_index)
+            key = (str(record.get('channel_id', '') or ''), message_id)
+            # Keep the first row if a message was (wrongly) appended twice
+            if self._row_by_message.get(key, row_index) >= row_index:
+                self._row_by_message[key] = row_index
+
+    def _unindex_row(self, row_index):
+        """Remove a row from the secondary indexes (caller holds the lock)"""
+        old = self._rows.get(row_index)
+        if not old:
+            return
+        self._discard(self._rows_by_ca, old.get('ca', ''), row_index)
+        message_id = str(old.get('message_id', '') or '')
+        self._discard(self._rows_by_message_id, message_id, row_index)
+        key = (str(old.get('channel_id', '') or ''), message_id)
+        if self._row_by_message.get(key) == row_index:
+            del self._row_by_message[key]
+
+    @staticmethod
+    def _discard(index, key, row_index):
+        rows = index.get(key)
+        if rows:
+            rows.discard(row_index)
+            if not rows:
+                del index[key]
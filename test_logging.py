@@ -7,7 +7,7 @@ Gunakan ini untuk test logging tanpa menjalankan bot utama
 import sys
 import time
 import asyncio
-from logger import logger
+from logger import logger, setup_logging
 
 async def test_logging():
     """Test semua fungsi logging"""
@@ -97,6 +97,7 @@ async def test_logging():
         logger.info("👋 Test completed successfully")
 
 if __name__ == "__main__":
+    setup_logging()
     try:
         asyncio.run(test_logging())
     except KeyboardInterrupt:
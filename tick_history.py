@@ -0,0 +1,242 @@
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+from config import TICK_HISTORY_DIR, TICK_HISTORY_RETENTION_HOURS, TICK_HISTORY_OPEN_FILES
+from logger import logger
+from metrics import metrics
+
+# One tick = unix seconds + price, MC, liquidity, 24h volume as float32 (20 bytes).
+# float32 keeps ~7 significant digits, plenty for prices and MCs read off DexScreener.
+TICK_FORMAT = '<I4f'
+TICK_SIZE = struct.calcsize(TICK_FORMAT)
+TICK_FIELDS = ('timestamp', 'price', 'market_cap', 'liquidity', 'volume_24h')
+
+SAFE_CA_PATTERN = re.compile(r'^[A-Za-z0-9]{20,64}$')
+
+
+class TickHistory:
+    """Append-only per-CA price history in fixed-width binary files
+
+    Every polled tick is appended to <directory>/<ca>.ticks as one packed
+    record, so 3 days at 30-second resolution is ~170 KB per token. Reads
+    memory-map the file; records are in time order, so range queries are a
+    binary search. Ticks for the same CA from several rows are stored once.
+    """
+
+    def __init__(self, directory=TICK_HISTORY_DIR, retention_hours=TICK_HISTORY_RETENTION_HOURS,
+                 max_open_files=TICK_HISTORY_OPEN_FILES):
+        self.directory = directory
+        self.retention = retention_hours * 3600
+        self.max_open_files = max(1, max_open_files)
+        self._files = OrderedDict()  # ca -> open append handle (LRU)
+        self._last_timestamp = {}  # ca -> timestamp of the last stored tick
+        self._lock = threading.Lock()
+
+        # Stats
+        self.appended = 0
+        self.duplicates = 0
+        self.errors = 0
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    def _path(self, ca):
+        return os.path.join(self.directory, f"{ca}.ticks")
+
+    def append(self, ca, price_data, timestamp=None):
+        """Store one tick for a CA from a DexScreener price dict; returns True if written"""
+        if not self.enabled or not price_data or not SAFE_CA_PATTERN.match(ca or ''):
+            return False
+        timestamp = int(timestamp if timestamp is not None else time.time())
+        record = struct.pack(
+            TICK_FORMAT, timestamp,
+            price_data.get('price', 0) or 0, price_data.get('market_cap', 0) or 0,
+            price_data.get('liquidity', 0) or 0, price_data.get('volume_24h', 0) or 0)
+        try:
+            with self._lock:
+                handle = self._handle(ca)
+                # Several rows can track the same CA off one price fetch
+                if timestamp <= self._last_timestamp.get(ca, -1):
+                    self.duplicates += 1
+                    return False
+                handle.write(record)
+                handle.flush()
+                self._last_timestamp[ca] = timestamp
+                self.appended += 1
+            return True
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error appending tick for {ca[:8]}...: {e}", exc_info=True)
+            return False
+
+    def _handle(self, ca):
+        handle = self._files.get(ca)
+        if handle is not None:
+            self._files.move_to_end(ca)
+            return handle
+
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        path = self._path(ca)
+        if ca not in self._last_timestamp:
+            last = self._read_last(path)
+            if last is not None:
+                self._last_timestamp[ca] = last[0]
+        handle = open(path, 'ab')
+        # Drop a record torn by a crash mid-write so later appends stay aligned
+        torn = handle.tell() % TICK_SIZE
+        if torn:
+            handle.truncate(handle.tell() - torn)
+        self._files[ca] = handle
+        while len(self._files) > self.max_open_files:
+            _, oldest = self._files.popitem(last=False)
+            oldest.close()
+        return handle
+
+    @staticmethod
+    def _read_last(path):
+        """Last complete record in a file, or None"""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        size -= size % TICK_SIZE  # ignore a torn trailing record
+        if size <= 0:
+            return None
+        with open(path, 'rb') as f:
+            f.seek(size - TICK_SIZE)
+            return struct.unpack(TICK_FORMAT, f.read(TICK_SIZE))
+
+    def view(self, ca):
+        """Memory-mapped read-only buffer of a CA's complete records (or None)
+
+        The buffer is a whole number of TICK_SIZE records and stays valid after
+        later appends (they are simply not included).
+        """
+        if not self.enabled or not SAFE_CA_PATTERN.match(ca or ''):
+            return None
+        path = self._path(ca)
+        try:
+            with open(path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                size -= size % TICK_SIZE
+                if size <= 0:
+                    return None
+                mapped = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+        return memoryview(mapped)
+
+    def ticks(self, ca, since=None, until=None):
+        """List of tick tuples (see TICK_FIELDS) for a CA, optionally within [since, until]"""
+        buffer = self.view(ca)
+        if buffer is None:
+            return []
+        count = len(buffer) // TICK_SIZE
+        start = self._bisect(buffer, count, since) if since is not None else 0
+        end = self._bisect(buffer, count, until + 1) if until is not None else count
+        return list(struct.iter_unpack(TICK_FORMAT, buffer[start * TICK_SIZE:end * TICK_SIZE]))
+
+    def latest(self, ca):
+        """Most recent tick tuple for a CA, or None"""
+        if not self.enabled or not SAFE_CA_PATTERN.match(ca or ''):
+            return None
+        return self._read_last(self._path(ca))
+
+    def count(self, ca):
+        """Number of stored ticks for a CA"""
+        try:
+            return os.path.getsize(self._path(ca)) // TICK_SIZE
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _bisect(buffer, count, timestamp):
+        """Index of the first record with timestamp >= `timestamp`"""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if struct.unpack_from('<I', buffer, middle * TICK_SIZE)[0] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def prune(self):
+        """Delete histories not appended to within the retention window; returns files removed"""
+        if not self.enabled or not os.path.isdir(self.directory):
+            return 0
+        cutoff = time.time() - self.retention
+        removed = 0
+        with self._lock:
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith('.ticks') or entry.stat().st_mtime >= cutoff:
+                    continue
+                ca = entry.name[:-len('.ticks')]
+                handle = self._files.pop(ca, None)
+                if handle is not None:
+                    handle.close()
+                self._last_timestamp.pop(ca, None)
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError as e:
+                    logger.warning(f"Could not remove old tick history {entry.name}: {e}")
+        if removed:
+            logger.info(f"🧹 Removed {removed} expired tick histories")
+        return removed
+
+    def close(self):
+        with self._lock:
+            for handle in self._files.values():
+                handle.close()
+            self._files.clear()
+
+    def disk_usage(self):
+        """(files, bytes) currently on disk"""
+        if not self.enabled or not os.path.isdir(self.directory):
+            return 0, 0
+        files = total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.ticks'):
+                files += 1
+                total += entry.stat().st_size
+        return files, total
+
+    def stats(self):
+        files, total = self.disk_usage()
+        return {
+            'tokens': files,
+            'bytes': total,
+            'ticks': total // TICK_SIZE,
+            'appended': self.appended,
+            'duplicates': self.duplicates,
+            'errors': self.errors
+        }
+
+    def summary(self):
+        if not self.enabled:
+            return "disabled"
+        files, total = self.disk_usage()
+        return (f"{files} tokens, {total // TICK_SIZE} ticks, {total / 1024:.0f} KB on disk, "
+                f"{self.appended} appended, {self.duplicates} duplicates skipped")
+
+
+# Global instance, created on first use
+_tick_history = None
+_tick_history_lock = threading.Lock()
+
+
+def get_tick_history():
+    """The shared TickHistory (its stats are exported as metrics from then on)"""
+    global _tick_history
+    with _tick_history_lock:
+        if _tick_history is None:
+            _tick_history = TickHistory()
+            metrics.add_collector(lambda: metrics.export_stats('tick_history', _tick_history.stats()))
+        return _tick_history
@@ -0,0 +1,230 @@
+import json
+import os
+import sqlite3
+import threading
+from logger import logger
+
+
+class WriteAheadLog:
+    """Durable log of pending sheet cell writes (SQLite in WAL mode)
+
+    Every cell write is committed here before it is sent to Google Sheets and
+    deleted once the sheet accepted it. Entries are keyed by (row, column), so a
+    newer value replaces an older one and replaying the log is idempotent.
+
+    record() never touches the disk: cells are handed to a writer thread, which
+    commits everything queued since its last commit in one transaction (group
+    commit), so the event loop never waits for an fsync. sync() waits until all
+    recorded cells are committed and is called before any cell is sent.
+    """
+
+    # Seconds to wait before retrying a failed group commit
+    RETRY_DELAY = 1.0
+
+    def __init__(self, path, synchronous='FULL'):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.path = path
+        self._lock = threading.Lock()  # guards the SQLite connection
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # FULL fsyncs every commit; NORMAL survives app crashes but not power loss
+        if synchronous not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+            synchronous = 'FULL'
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pending_cells (
+                row_index INTEGER NOT NULL,
+                col INTEGER NOT NULL,
+                value TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                PRIMARY KEY (row_index, col)
+            )
+        """)
+        # Row layout change (rows being deleted from the sheet) that may or may not have
+        # reached the sheet yet; see begin_layout_change()
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS layout_change (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                mapping TEXT NOT NULL,
+                probe TEXT NOT NULL
+            )
+        """)
+        row = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM pending_cells").fetchone()
+        self._seq = row[0]
+
+        # Cells recorded but not committed yet, drained by the writer thread
+        self._queued = []
+        self._committed_seq = self._seq
+        self._queue_cond = threading.Condition()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name='sheet-wal-writer', daemon=True)
+        self._writer.start()
+
+        # Stats
+        self.recorded = 0
+        self.acknowledged = 0
+        self.commits = 0
+
+    def record(self, cells):
+        """Queue {(row, col): value} for the next group commit; returns {(row, col): seq}"""
+        if not cells:
+            return {}
+        with self._queue_cond:
+            seqs = {}
+            for (row_index, col), value in cells.items():
+                self._seq += 1
+                seqs[(row_index, col)] = self._seq
+                self._queued.append((row_index, col, json.dumps(value), self._seq))
+            self.recorded += len(cells)
+            self._queue_cond.notify_all()
+            return seqs
+
+    def _write_loop(self):
+        while True:
+            with self._queue_cond:
+                while not self._queued and not self._closed:
+                    self._queue_cond.wait()
+                if not self._queued:
+                    return
+                rows = self._queued
+                self._queued = []
+            try:
+                self._commit(rows)
+            except Exception as e:
+                logger.error(f"Error committing {len(rows)} cells to the sheet write-ahead log: {e}", exc_info=True)
+                with self._queue_cond:
+                    self._queued = rows + self._queued
+                    self._queue_cond.wait(self.RETRY_DELAY)
+                continue
+            with self._queue_cond:
+                self._committed_seq = rows[-1][3]
+                self.commits += 1
+                self._queue_cond.notify_all()
+
+    def _commit(self, rows):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("""
+                    INSERT INTO pending_cells (row_index, col, value, seq) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (row_index, col) DO UPDATE SET value = excluded.value, seq = excluded.seq
+                """, rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def sync(self):
+        """Block until every cell recorded so far is committed"""
+        with self._queue_cond:
+            target = self._seq
+            while self._committed_seq < target and not self._closed:
+                self._queue_cond.wait()
+
+    def acknowledge(self, cells):
+        """Forget cells the sheet accepted ({(row, col): seq}); newer writes are kept"""
+        if not cells:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "DELETE FROM pending_cells WHERE row_index = ? AND col = ? AND seq = ?",
+                    [(row_index, col, seq) for (row_index, col), seq in cells.items()]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.acknowledged += len(cells)
+
+    def remap(self, mapping):
+        """Move logged cells to new row indexes ({old: new}); cells of other rows are dropped
+
+        Also completes a layout change marked by begin_layout_change(). The
+        caller must keep new cells from being recorded until this returns.
+        """
+        self.sync()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute("SELECT row_index, col, value, seq FROM pending_cells").fetchall()
+                self._conn.execute("DELETE FROM pending_cells")
+                self._conn.executemany(
+                    "INSERT INTO pending_cells (row_index, col, value, seq) VALUES (?, ?, ?, ?)",
+                    [(mapping[row_index], col, value, seq)
+                     for row_index, col, value, seq in rows if row_index in mapping]
+                )
+                self._conn.execute("DELETE FROM layout_change")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def begin_layout_change(self, mapping, probe=None):
+        """Durably note a row deletion about to be sent to the sheet
+
+        Until remap() or abort_layout_change() clears it, a restart can't tell
+        from the log alone whether the deletion reached the sheet, so the note
+        carries a probe: {'row', 'nomor', 'ca'} of a kept row as it will read
+        after the deletion, or of a deleted row as it reads before it (marked
+        'deleted'). Without a probe the deletion counts as not applied.
+        """
+        self.sync()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO layout_change (id, mapping, probe) VALUES (1, ?, ?)",
+                (json.dumps(sorted(mapping.items())), json.dumps(probe))
+            )
+
+    def abort_layout_change(self):
+        """Forget a noted layout change that was not applied to the sheet"""
+        with self._lock:
+            self._conn.execute("DELETE FROM layout_change")
+
+    def pending_layout_change(self):
+        """Return (mapping, probe) of an unfinished layout change, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT mapping, probe FROM layout_change").fetchone()
+        if row is None:
+            return None
+        return dict(json.loads(row[0])), json.loads(row[1])
+
+    def pending(self):
+        """Return every unacknowledged cell as {(row, col): (value, seq)}"""
+        self.sync()
+        with self._lock:
+            rows = self._conn.execute("SELECT row_index, col, value, seq FROM pending_cells").fetchall()
+        return {(row_index, col): (json.loads(value), seq) for row_index, col, value, seq in rows}
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pending_cells").fetchone()[0]
+
+    def close(self):
+        """Commit whatever is still queued, then close the log"""
+        self.sync()
+        with self._queue_cond:
+            self._closed = True
+            self._queue_cond.notify_all()
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
+
+    def summary(self):
+        return (f"{self.count()} cells pending, {self.recorded} recorded in {self.commits} commits, "
+                f"{self.acknowledged} acknowledged")
+
+
+def open_write_log(path, synchronous='FULL'):
+    """Open the write-ahead log, or return None when disabled / unavailable"""
+    if not path:
+        return None
+    try:
+        return WriteAheadLog(path, synchronous)
+    except Exception as e:
+        logger.error(f"Could not open sheet write-ahead log at {path}: {e}", exc_info=True)
+        return None